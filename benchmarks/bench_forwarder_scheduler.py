@@ -0,0 +1,83 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Simulate pairing exposures with a pool of Forwarders of different speeds
+under each pairing policy, and compare how long exposures wait.
+
+Each exposure is paired with a Forwarder the way PICK_SCRIPT would pick it,
+using its policy's preference and the Forwarders' published backlog as the
+score.  Some Forwarders drop out of the pool for a while, as if their alive
+key had expired.
+
+Run with:  python benchmarks/bench_forwarder_scheduler.py [exposures]
+"""
+
+import random
+import statistics
+import sys
+
+from lsst.dm.csc.base.forwarder_scheduler import POLICIES, pick
+
+FORWARDERS = {"fwdr1": 1.0, "fwdr2": 1.0, "fwdr3": 1.5, "fwdr4": 2.0, "fwdr5": 4.0}
+INTERVAL = 0.5
+OUTAGE = 0.02
+
+
+def simulate(policy, exposures, seed=1):
+    rng = random.Random(seed)
+    free_at = {name: 0.0 for name in FORWARDERS}
+    down_until = {name: 0.0 for name in FORWARDERS}
+    latencies = []
+    counts = {name: 0 for name in FORWARDERS}
+    now = 0.0
+    for i in range(exposures):
+        now += rng.expovariate(1 / INTERVAL)
+        for name in FORWARDERS:
+            if down_until[name] <= now and rng.random() < OUTAGE:
+                down_until[name] = now + 20 * INTERVAL
+        alive = {name for name in FORWARDERS if down_until[name] <= now}
+        # score is the work the Forwarder still has queued
+        pool = {name: max(0.0, free_at[name] - now) for name in FORWARDERS}
+        members = sorted(pool, key=pool.get)
+        name = pick(pool, alive, policy.preferred(members))
+        if name is None:
+            continue
+        policy.paired(name)
+        counts[name] += 1
+        start = max(now, free_at[name])
+        free_at[name] = start + FORWARDERS[name] * rng.uniform(0.8, 1.2)
+        latencies.append(free_at[name] - now)
+    latencies.sort()
+    return statistics.mean(latencies), latencies[int(len(latencies) * 0.99)], counts
+
+
+def main():
+    exposures = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{exposures} exposures every {INTERVAL} s on average; Forwarder seconds per exposure "
+          f"{FORWARDERS}")
+    print(f"{'policy':>14} {'mean s':>8} {'p99 s':>8}  exposures per Forwarder")
+    for name, policy_class in POLICIES.items():
+        mean, p99, counts = simulate(policy_class(), exposures)
+        print(f"{name:>14} {mean:8.3f} {p99:8.3f}  {counts}")
+
+
+if __name__ == "__main__":
+    main()
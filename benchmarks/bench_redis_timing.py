@@ -0,0 +1,95 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Measure Redis command latencies the way the archiver's scoreboards see
+them, and the cost of recording them.
+
+Runs the commands the Beacon, Watcher and Archiveboard send: HSET/HGET of
+the device hash, SET EX/EXISTS of the association key, and a pipelined
+batch, first with a plain client and then with TimedRedis, and prints the
+overhead and the recorded histograms.  It needs a redis-server on the given
+host and port, or fakeredis with --fake.
+
+Run with:  python benchmarks/bench_redis_timing.py [--fake] [host [port [rounds]]]
+"""
+
+import sys
+import time
+import redis
+
+from lsst.dm.csc.base.redis_timing import CommandTimings, TimedRedis
+
+
+def make_pool(fake, host, port):
+    if fake:
+        import fakeredis
+        return redis.ConnectionPool(connection_class=fakeredis.FakeConnection, server=fakeredis.FakeServer(),
+                                    decode_responses=True)
+    return redis.ConnectionPool(host=host, port=port, db=15, decode_responses=True)
+
+
+def workload(conn, rounds):
+    start = time.perf_counter()
+    for i in range(rounds):
+        conn.hset("BENCH_DEVICE", "state", "ENABLE")
+        conn.hget("BENCH_DEVICE", "state")
+        conn.set("BENCH_ASSOCIATION", "fwdr1", ex=3)
+        conn.exists("BENCH_ASSOCIATION")
+        with conn.pipeline() as pipeline:
+            pipeline.hset("BENCH_DEVICE", "session", str(i))
+            pipeline.hset("BENCH_DEVICE", "jobnum", str(i))
+            pipeline.execute()
+    return (time.perf_counter() - start) / (rounds * 5)
+
+
+def main():
+    args = sys.argv[1:]
+    fake = "--fake" in args
+    if fake:
+        args.remove("--fake")
+    host = args[0] if len(args) > 0 else "localhost"
+    port = int(args[1]) if len(args) > 1 else 6379
+    rounds = int(args[2]) if len(args) > 2 else 20000
+
+    pool = make_pool(fake, host, port)
+    plain = redis.StrictRedis(connection_pool=pool)
+    timings = CommandTimings(slow_threshold=0.001)
+    timed = TimedRedis(connection_pool=pool, timings=timings)
+
+    workload(plain, rounds // 10)
+    untimed = workload(plain, rounds)
+    with_timing = workload(timed, rounds)
+    plain.delete("BENCH_DEVICE", "BENCH_ASSOCIATION")
+
+    print(f"{rounds} rounds against {'fakeredis' if fake else f'{host}:{port}'}")
+    print(f"mean per command: plain {untimed * 1e6:.1f} us, timed {with_timing * 1e6:.1f} us, "
+          f"overhead {(with_timing - untimed) * 1e6:.2f} us")
+    snapshot = timings.snapshot()
+    print(f"{'command':>10} {'count':>8} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>9}")
+    for command, stats in snapshot["commands"].items():
+        print(f"{command:>10} {stats['count']:8d} {stats['mean'] * 1e6:9.1f} {stats['p50'] * 1e6:9.1f} "
+              f"{stats['p99'] * 1e6:9.1f} {stats['max'] * 1e6:9.1f}")
+    print(f"{len(snapshot['slow'])} commands over {timings.slow_threshold * 1000:.0f} ms "
+          "kept in the slow log")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Compare ack deadlines driven by one sleeping task per message with
+deadlines scheduled on the shared TimerWheel, at 10k outstanding acks.
+
+Run with:  python benchmarks/bench_timer_wheel.py [outstanding]
+"""
+
+import asyncio
+import sys
+import time
+import tracemalloc
+
+from lsst.dm.csc.base.waiter import TimerWheel
+
+TIMEOUT = 5.0
+
+
+async def per_task_sleeps(n):
+    events = [asyncio.Event() for i in range(n)]
+
+    async def pause(evt):
+        await asyncio.sleep(TIMEOUT)
+        return evt.is_set()
+
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(pause(evt)) for evt in events]
+    await asyncio.sleep(0)
+    scheduled = time.perf_counter() - start
+
+    # every ack arrives; the sleeping tasks can only be cancelled
+    start = time.perf_counter()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    resolved = time.perf_counter() - start
+    return scheduled, resolved
+
+
+async def timer_wheel(n):
+    wheel = TimerWheel(asyncio.get_running_loop())
+    fired = []
+
+    start = time.perf_counter()
+    entries = [wheel.call_later(TIMEOUT, fired.append, i) for i in range(n)]
+    await asyncio.sleep(0)
+    scheduled = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for entry in entries:
+        entry.cancel()
+    await asyncio.sleep(wheel.tick * 2)
+    resolved = time.perf_counter() - start - wheel.tick * 2
+    assert not fired and len(wheel) == 0
+    return scheduled, resolved
+
+
+def measure(name, coro_fn, n):
+    tracemalloc.start()
+    scheduled, resolved = asyncio.run(coro_fn(n))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:>16}: schedule {scheduled * 1e3:8.2f} ms  resolve {resolved * 1e3:8.2f} ms  "
+          f"peak memory {peak / 1024:8.0f} KiB")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print(f"{n} outstanding acks, {TIMEOUT} s timeout")
+    measure("per-task sleeps", per_task_sleeps, n)
+    measure("timer wheel", timer_wheel, n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from collections import deque
+import math
+
+
+class LatencyEstimator:
+    """Running estimate of a round trip time distribution
+
+    Keeps an exponentially weighted moving average and mean deviation of
+    the round trip time, in the same way TCP estimates its retransmission
+    timeout, along with a window of recent samples for percentiles.
+
+    Parameters
+    ----------
+    window : `int`
+        number of recent samples kept for percentiles
+    alpha : `float`
+        weight of a new sample in the moving average
+    beta : `float`
+        weight of a new sample in the moving mean deviation
+    """
+
+    def __init__(self, window=256, alpha=0.125, beta=0.25):
+        self.alpha = alpha
+        self.beta = beta
+        self.count = 0
+        self.average = None
+        self.deviation = 0.0
+        self._samples = deque(maxlen=window)
+        self._sorted = None
+
+    def add(self, rtt):
+        """Add a round trip time sample
+
+        Parameters
+        ----------
+        rtt : `float`
+            round trip time in seconds
+        """
+        self.count += 1
+        self._samples.append(rtt)
+        self._sorted = None
+        if self.average is None:
+            self.average = rtt
+            self.deviation = rtt / 2
+        else:
+            self.deviation += self.beta * (abs(rtt - self.average) - self.deviation)
+            self.average += self.alpha * (rtt - self.average)
+
+    def percentile(self, q):
+        """Get a percentile of the recent samples
+
+        Parameters
+        ----------
+        q : `float`
+            percentile, between 0 and 100
+
+        Returns
+        -------
+        The percentile in seconds, or None if there are no samples
+        """
+        if not self._samples:
+            return None
+        if self._sorted is None:
+            self._sorted = sorted(self._samples)
+        index = max(math.ceil(q / 100 * len(self._sorted)) - 1, 0)
+        return self._sorted[index]
+
+
+class AckTimeoutEstimator:
+    """Ack timeouts derived from the observed round trip times of each
+    message type and destination queue
+
+    Until ``min_samples`` acks have been seen for a message type and queue
+    the static ``default`` is used.  After that, if adaptive timeouts are
+    enabled, the timeout is ``multiplier`` times the larger of the chosen
+    percentile and average + 4 * deviation, clamped to ``minimum`` and
+    ``maximum``.
+
+    Parameters
+    ----------
+    default : `float`
+        static timeout in seconds
+    adaptive : `bool`
+        if False, always use the default timeout, but still keep estimates
+    minimum : `float`
+        smallest adaptive timeout in seconds
+    maximum : `float`
+        largest adaptive timeout in seconds; by default four times the
+        default, so a peer slower than the static timeout allows can still
+        be waited for
+    multiplier : `float`
+        factor applied to the estimated round trip time
+    percentile : `float`
+        percentile of recent round trip times used
+    min_samples : `int`
+        samples needed before the estimate is used
+    window : `int`
+        number of recent samples kept for each message type and queue
+    """
+
+    def __init__(self, default, adaptive=False, minimum=None, maximum=None, multiplier=3,
+                 percentile=99, min_samples=20, window=256):
+        self.default = default
+        self.adaptive = adaptive
+        self.minimum = minimum if minimum is not None else 0
+        self.maximum = maximum if maximum is not None else 4 * default
+        self.multiplier = multiplier
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self._estimators = {}
+
+    def observe(self, msg_type, queue, rtt):
+        """Record a round trip time
+
+        Parameters
+        ----------
+        msg_type : `str`
+            MSG_TYPE of the message which was acked
+        queue : `str`
+            queue the message was sent to
+        rtt : `float`
+            round trip time in seconds
+        """
+        key = (msg_type, queue)
+        estimator = self._estimators.get(key)
+        if estimator is None:
+            estimator = LatencyEstimator(self.window)
+            self._estimators[key] = estimator
+        estimator.add(rtt)
+
+    def timeout(self, msg_type, queue):
+        """Get the ack timeout to use for a message
+
+        Parameters
+        ----------
+        msg_type : `str`
+            MSG_TYPE of the message being sent
+        queue : `str`
+            queue the message is sent to
+
+        Returns
+        -------
+        The timeout in seconds
+        """
+        if not self.adaptive:
+            return self.default
+        estimator = self._estimators.get((msg_type, queue))
+        if estimator is None or estimator.count < self.min_samples:
+            return self.default
+        return self._estimate(estimator)
+
+    def _estimate(self, estimator):
+        rtt = max(estimator.percentile(self.percentile), estimator.average + 4 * estimator.deviation)
+        return min(max(rtt * self.multiplier, self.minimum), self.maximum)
+
+    def snapshot(self):
+        """Get the current estimates
+
+        Returns
+        -------
+        A dict keyed by (msg_type, queue) of dicts with the sample count,
+        average, deviation, percentile and timeout in seconds
+        """
+        result = {}
+        for key, estimator in self._estimators.items():
+            result[key] = {"count": estimator.count, "average": estimator.average,
+                           "deviation": estimator.deviation,
+                           "percentile": estimator.percentile(self.percentile),
+                           "timeout": self.timeout(*key)}
+        return result
@@ -0,0 +1,267 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+from collections import OrderedDict
+import logging
+from lsst.dm.csc.base.waiter import timer_wheel
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AckEntry:
+    """An outstanding ack in an `AckTable`
+
+    Parameters
+    ----------
+    ack_id : `str`
+        id of the ack
+    future : `asyncio.Future`
+        future resolved with the ack message
+    sent : `float`
+        event loop time the entry was registered
+    on_timeout : `callable`
+        called with this entry if the ack doesn't arrive in time
+    data : `object`
+        caller data kept with the entry
+    """
+
+    __slots__ = ('ack_id', 'future', 'sent', 'handle', 'on_timeout', 'data')
+
+    def __init__(self, ack_id, future, sent, on_timeout, data):
+        self.ack_id = ack_id
+        self.future = future
+        self.sent = sent
+        self.handle = None
+        self.on_timeout = on_timeout
+        self.data = data
+
+
+class AckTable:
+    """Correlation table of outstanding acks
+
+    Each ack id maps to a future, which is resolved with the ack message
+    when it arrives.  An entry with a timeout is scheduled on a timer wheel,
+    and cancelled as soon as the ack arrives, so no task sleeps for the
+    whole timeout.
+
+    The table is bounded: entries registered without a timeout expire after
+    ``ttl`` seconds, and once ``max_entries`` are outstanding the oldest
+    entry is evicted to make room.  Acks which arrive after their entry has
+    expired or been evicted are counted as late, and acks which arrive again
+    after their entry was resolved are counted as duplicates.  A timeout
+    whose ``on_timeout`` registers the ack again, to wait for it after
+    resending the message, is counted as a retry rather than an expiry.
+
+    Parameters
+    ----------
+    wheel : `lsst.dm.csc.base.waiter.TimerWheel`
+        wheel used for timeouts; by default the one shared on the event loop
+    ttl : `float`
+        seconds an entry without a timeout is kept; None keeps it forever
+    max_entries : `int`
+        maximum number of outstanding entries; None is unbounded
+    on_resolve : `callable`
+        called with each resolved entry and its round trip time
+    on_forget : `callable`
+        called with each entry which expired or was evicted, and the reason,
+        "expired" or "evicted"
+    """
+
+    def __init__(self, wheel=None, ttl=None, max_entries=None, on_resolve=None, on_forget=None):
+        self._wheel = wheel
+        self._on_resolve = on_resolve
+        self._on_forget = on_forget
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+        # ids of entries which went away, and why, used to tell late and
+        # duplicate acks from unknown ones
+        self._gone = OrderedDict()
+        self._gone_max = max_entries if max_entries is not None else 10000
+
+        self.expired = 0
+        self.evicted = 0
+        self.retried = 0
+        self.late = 0
+        self.duplicate = 0
+        self.unknown = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, ack_id):
+        return ack_id in self._entries
+
+    def register(self, ack_id, timeout=None, on_timeout=None, data=None):
+        """Add an outstanding ack
+
+        Parameters
+        ----------
+        ack_id : `str`
+            id of the ack
+        timeout : `float`
+            seconds to wait for the ack; None waits for the table's ttl
+        on_timeout : `callable`
+            called with the entry if the ack doesn't arrive within timeout
+        data : `object`
+            caller data kept with the entry
+
+        Returns
+        -------
+        entry : `AckEntry`
+        """
+        loop = asyncio.get_running_loop()
+        entry = AckEntry(ack_id, loop.create_future(), loop.time(), on_timeout, data)
+        if timeout is None:
+            timeout = self.ttl
+        if timeout is not None:
+            wheel = self._wheel if self._wheel is not None else timer_wheel()
+            entry.handle = wheel.call_at(entry.sent + timeout, self._expire, ack_id)
+        self._gone.pop(ack_id, None)
+        self._entries[ack_id] = entry
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._evict()
+        return entry
+
+    def stats(self):
+        """Get the table counters
+
+        Returns
+        -------
+        A dict with the number of outstanding, expired, evicted, late,
+        duplicate and unknown acks, and of timeouts after which the ack was
+        registered again to wait for a resend
+        """
+        return {"outstanding": len(self._entries), "expired": self.expired, "evicted": self.evicted,
+                "retried": self.retried, "late": self.late, "duplicate": self.duplicate,
+                "unknown": self.unknown}
+
+    def resolve(self, ack_id, msg):
+        """Resolve an outstanding ack
+
+        Parameters
+        ----------
+        ack_id : `str`
+            id of the ack
+        msg : `dict`
+            the ack message
+
+        Returns
+        -------
+        The round trip time in seconds, or None if the ack wasn't outstanding
+        """
+        entry = self.pop(ack_id)
+        if entry is None:
+            reason = self._gone.get(ack_id)
+            if reason == "resolved":
+                self.duplicate += 1
+                LOGGER.info(f"ack {ack_id} arrived again")
+            elif reason is not None:
+                # a later copy of it is a duplicate
+                self._remember(ack_id, "resolved")
+                self.late += 1
+                LOGGER.info(f"ack {ack_id} arrived after its entry was {reason}")
+            else:
+                self._remember(ack_id, "resolved")
+                self.unknown += 1
+            return None
+        self._remember(ack_id, "resolved")
+        rtt = asyncio.get_running_loop().time() - entry.sent
+        entry.future.set_result(msg)
+        if self._on_resolve is not None:
+            self._on_resolve(entry, rtt)
+        return rtt
+
+    def resolved(self, ack_id):
+        """Check whether an ack has arrived already, either in time or late,
+        so another copy of it would be a duplicate
+
+        Parameters
+        ----------
+        ack_id : `str`
+            id of the ack
+
+        Returns
+        -------
+        True if the ack was resolved, as far as the table remembers
+        """
+        return self._gone.get(ack_id) == "resolved"
+
+    def pop(self, ack_id):
+        """Remove an outstanding ack without resolving its future
+
+        Parameters
+        ----------
+        ack_id : `str`
+            id of the ack
+
+        Returns
+        -------
+        The removed `AckEntry`, or None if the ack wasn't outstanding
+        """
+        entry = self._entries.pop(ack_id, None)
+        if entry is not None and entry.handle is not None:
+            entry.handle.cancel()
+        return entry
+
+    def _remember(self, ack_id, reason):
+        self._gone[ack_id] = reason
+        if len(self._gone) > self._gone_max:
+            self._gone.popitem(last=False)
+
+    def _forget(self, entry, reason):
+        self._remember(entry.ack_id, reason)
+        self._fail(entry, reason)
+        if self._on_forget is not None:
+            self._on_forget(entry, reason)
+
+    def _fail(self, entry, reason):
+        entry.future.set_exception(asyncio.TimeoutError(f"no ack for {entry.ack_id}: {reason}"))
+        # mark the exception as retrieved; most entries are never awaited
+        entry.future.exception()
+
+    def _expire(self, ack_id):
+        entry = self._entries.pop(ack_id, None)
+        if entry is None:
+            return
+        try:
+            if entry.on_timeout is not None:
+                entry.on_timeout(entry)
+        finally:
+            if ack_id in self._entries:
+                # on_timeout registered the ack again, to wait for it after a resend
+                self.retried += 1
+                self._fail(entry, "retried")
+            else:
+                self.expired += 1
+                self._forget(entry, "expired")
+
+    def _evict(self):
+        ack_id, entry = self._entries.popitem(last=False)
+        if entry.handle is not None:
+            entry.handle.cancel()
+        self.evicted += 1
+        LOGGER.warning(f"ack table full; evicted oldest entry {ack_id}")
+        self._forget(entry, "evicted")
@@ -21,7 +21,6 @@
 
 import asyncio
 from copy import deepcopy
-import datetime
 import logging
 import os
 import os.path
@@ -29,6 +28,9 @@ import sys
 from lsst.dm.csc.base.consumer import Consumer
 from lsst.dm.csc.base.publisher import Publisher
 from lsst.dm.csc.base.base import Base
+from lsst.dm.csc.base.message_log import MessageLogger
+from lsst.dm.csc.base.target_dir import observing_day
+from lsst.dm.csc.base.tracer import Tracer
 
 LOGGER = logging.getLogger(__name__)
 
@@ -50,6 +52,14 @@ class ArchiveController(Base):
         super().__init__(name, config_filename, log_filename)
         self._msg_actions = {}
 
+        # spans of each exposure's hops through the controller, written to
+        # TRACE_FILE, if it is given, when connections stop
+        root = self.getConfiguration()['ROOT']
+        self.tracer = Tracer(root.get('TRACE_BUFFER_SIZE', 4096))
+        self.trace_file = root.get('TRACE_FILE')
+
+        self.msg_log = MessageLogger(LOGGER, debug_sample=root.get('LOG_DEBUG_SAMPLE', 0))
+
     async def configure(self):
         """Configure the archive controller
         """
@@ -160,6 +170,34 @@ class ArchiveController(Base):
         """
         await self.stop_publishers()
         self.stop_consumers()
+        self.dump_trace()
+
+    def dump_trace(self):
+        """Write the recorded spans to TRACE_FILE, if it is configured
+        """
+        if self.trace_file is None:
+            return
+        try:
+            self.tracer.dump(self.trace_file)
+        except OSError as e:
+            LOGGER.warning(f"can't write trace spans to {self.trace_file}: {e}")
+
+    async def publish_message(self, queue, msg, headers=None):
+        """Publish a message
+
+        Parameters
+        ----------
+        queue : `str`
+            RabbitMQ queue to write to
+        msg : `dict`
+            message contents
+        headers : `dict`
+            AMQP message headers; by default, the trace context of the
+            message's image, if it has one
+        """
+        if headers is None:
+            headers = self.tracer.inject_message(msg)
+        await self.publisher.publish_message(queue, msg, headers)
 
     def on_message(self, ch, method, properties, body):
         """Callback method for all incoming messages.
@@ -173,7 +211,7 @@ class ArchiveController(Base):
         method : `Method`
             RabbitMQ Method, used in acknowledgement
         properties : `Properties`
-            This is required by the calling API, but is ignored in this method
+            RabbitMQ message properties; headers carrying trace context are used, if present
         body : `dict`
             Contains the contents of the message that was sent
         """
@@ -187,9 +225,9 @@ class ArchiveController(Base):
             LOGGER.warning(msg)
             raise Exception(msg)
         if msg_type != 'ARCHIVE_HEALTH_CHECK':
-            LOGGER.info("received message")
-            LOGGER.info(body)
+            self.msg_log.received(body)
         ch.basic_ack(method.delivery_tag)
+        self.tracer.extract(getattr(properties, 'headers', None))
         handler = self._msg_actions.get(body['MSG_TYPE'])
 
         loop = asyncio.get_event_loop()
@@ -256,8 +294,7 @@ class ArchiveController(Base):
         -------
         The target directory including the day stamp
         """
-        observing_time = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=12)
-        day_string = str(observing_time.date())
+        day_string = str(observing_day())
 
         final_target_dir = f"{target_dir}/{day_string}/"
 
@@ -289,7 +326,7 @@ class ArchiveController(Base):
             incoming message to respond to
         """
         ack_msg = self.build_health_ack_message(msg)
-        await self.publisher.publish_message(self.forwarder_publish_queue, ack_msg)
+        await self.publish_message(self.forwarder_publish_queue, ack_msg)
 
     async def process_new_archive_item(self, msg):
         """Respond to a new archive item message
@@ -299,14 +336,16 @@ class ArchiveController(Base):
         msg : `dict`
             incoming message to respond to
         """
-        # send this to the archive staging area
-        target_dir = self.construct_send_target_dir(self.forwarder_staging_dir)
+        image_id = msg['IMAGE_ID']
+        with self.tracer.span("process_new_archive_item", image_id):
+            # send this to the archive staging area
+            target_dir = self.construct_send_target_dir(self.forwarder_staging_dir)
 
-        ack_msg = self.build_new_item_ack_message(target_dir, msg)
+            ack_msg = self.build_new_item_ack_message(target_dir, msg)
 
-        reply_queue = msg['REPLY_QUEUE']
-        LOGGER.info(ack_msg)
-        await self.publisher.publish_message(reply_queue, ack_msg)
+            reply_queue = msg['REPLY_QUEUE']
+            await self.publish_message(reply_queue, ack_msg)
+            self.msg_log.sent(reply_queue, ack_msg)
 
     def build_file_transfer_completed_ack(self, incoming_msg):
         """Build a message dictionary to respond to a FILE_TRANSFER_COMPLETED message
@@ -316,7 +355,6 @@ class ArchiveController(Base):
         incoming_msg : `dict`
             incoming message to use to for ACK response
         """
-        LOGGER.info(f"data was: {incoming_msg}")
         d = {}
         d['MSG_TYPE'] = 'FILE_TRANSFER_COMPLETED_ACK'
         d['COMPONENT'] = 'ARCHIVE_CTRL'
@@ -336,26 +374,26 @@ class ArchiveController(Base):
         incoming_msg : `dict`
             incoming message to use to for ACK response
         """
-        msg = deepcopy(incoming_msg)
-        filename = incoming_msg['FILENAME']
-        reply_queue = incoming_msg['REPLY_QUEUE']
-        ack_msg = self.build_file_transfer_completed_ack(incoming_msg)
-        LOGGER.info(f'incoming message is: {incoming_msg}')
-        LOGGER.info(ack_msg)
-        await self.publisher.publish_message(reply_queue, ack_msg)
-
-        # try and create a link to the file
-        try:
-            dbb_file, oods_file = self.create_links_to_file(filename)
-        except Exception as e:
-            LOGGER.info(f'{e}')
-            # send an error that an error occurred trying to set up for the ingest into the OODS
-            err = f"Couldn't create link for OODS: {e}"
-            asyncio.create_task(self.send_oods_failure_message(msg, err))
-            return
-        # send an message to the OODS to ingest the file
-        msg['FILENAME'] = oods_file
-        asyncio.create_task(self.send_ingest_message_to_oods(msg))
+        with self.tracer.span("process_file_transfer_completed", incoming_msg['OBSID']):
+            msg = deepcopy(incoming_msg)
+            filename = incoming_msg['FILENAME']
+            reply_queue = incoming_msg['REPLY_QUEUE']
+            ack_msg = self.build_file_transfer_completed_ack(incoming_msg)
+            await self.publish_message(reply_queue, ack_msg)
+            self.msg_log.sent(reply_queue, ack_msg)
+
+            # try and create a link to the file
+            try:
+                dbb_file, oods_file = self.create_links_to_file(filename)
+            except Exception as e:
+                LOGGER.info(f'{e}')
+                # send an error that an error occurred trying to set up for the ingest into the OODS
+                err = f"Couldn't create link for OODS: {e}"
+                asyncio.create_task(self.send_oods_failure_message(msg, err))
+                return
+            # send an message to the OODS to ingest the file
+            msg['FILENAME'] = oods_file
+            asyncio.create_task(self.send_ingest_message_to_oods(msg))
 
     def create_link_to_file(self, filename, dirname):
         """Create a link from filename to a new file in directory dirname
@@ -425,7 +463,7 @@ class ArchiveController(Base):
             Human-readable status message
         """
         msg = self.build_oods_failure_message(body, description)
-        await self.publisher.publish_message(self.archive_ctrl_publish_queue, msg)
+        await self.publish_message(self.archive_ctrl_publish_queue, msg)
 
     async def send_ingest_message_to_oods(self, body):
         """Send a message to the OODS to perform an ingest, using the incoming message
@@ -435,9 +473,11 @@ class ArchiveController(Base):
         body : `dict`
             incoming message contents
         """
-        msg = self.build_file_ingest_request_message(body)
-        LOGGER.info(f"sending ingest message to oods: {msg}")
-        await self.publisher.publish_message(self.oods_publish_queue, msg)
+        obsid = body['OBSID']
+        with self.tracer.span("send_ingest_message_to_oods", obsid):
+            msg = self.build_file_ingest_request_message(body)
+            await self.publish_message(self.oods_publish_queue, msg)
+            self.msg_log.sent(self.oods_publish_queue, msg)
 
     def build_file_ingest_request_message(self, msg):
         """Create a file ingest request dictionary
@@ -451,7 +491,6 @@ class ArchiveController(Base):
         -------
         Dictionary containing the message contents
         """
-        LOGGER.info(f'building file ingest request message using: {msg}')
         d = {}
         d['MSG_TYPE'] = f'{self.short_name}_FILE_INGEST_REQUEST'
         d['CAMERA'] = self.camera_name
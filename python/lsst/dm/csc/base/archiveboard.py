@@ -40,10 +40,14 @@ class Archiveboard(Scoreboard):
         Redis database service network port number
     key : `str`
         association key
+    cache_ttl : `float`
+        seconds reads of the device's fields are cached for; 0 disables caching
+    failover : `lsst.dm.csc.base.redis_failover.Failover`
+        where to find another Redis server if this one goes away
     """
 
-    def __init__(self, device, db, host, port=6379, key=None):
-        super().__init__(device, db, host, port)
+    def __init__(self, device, db, host, port=6379, key=None, cache_ttl=0, failover=None):
+        super().__init__(device, db, host, port, cache_ttl, failover)
 
         self.association_key = key
         self.JOBNUM = "jobnum"
@@ -53,7 +57,7 @@ class Archiveboard(Scoreboard):
     def get_jobnum(self):
         """retrieve the job number from the redis database
         """
-        return self.conn.hget(self.device, self.JOBNUM)
+        return self._hget(self.JOBNUM)
 
     def set_jobnum(self, jobnum):
         """set the job number in the redis database
@@ -63,6 +67,7 @@ class Archiveboard(Scoreboard):
         jobnum : `int`
             The job number
         """
+        self.cache.invalidate(self.device)
         self.conn.hset(self.device, self.JOBNUM, jobnum)
 
     def pop_forwarder_from_list(self):
@@ -85,7 +90,7 @@ class Archiveboard(Scoreboard):
         ----------
         forwarder_info : `lsst.dm.csc.base.forwarder_info.ForwarderInfo`
         """
-        info = forwarder_info.__dict__
+        info = forwarder_info.to_dict()
         data = json.dumps(info)
         self.conn.lpush(self.FORWARDER_LIST, data)
 
@@ -96,9 +101,10 @@ class Archiveboard(Scoreboard):
         -------
         forwarder_info : `lsst.dm.csc.base.forwarder_info.ForwarderInfo`
         """
-        data = self.conn.hget(self.device, self.PAIRED_FORWARDER)
-        d = json.loads(data)
-        return self.create_forwarder_info(d)
+        return self._hget(self.PAIRED_FORWARDER, self._decode_forwarder_info)
+
+    def _decode_forwarder_info(self, data):
+        return self.create_forwarder_info(json.loads(data))
 
     def create_forwarder_info(self, forwarder):
         """Take the contents of a dictionary and return a Forwarderinfo object
@@ -112,12 +118,7 @@ class Archiveboard(Scoreboard):
         forwarder_info : `lsst.dm.csc.base.forwarder_info.ForwarderInfo`
         """
         try:
-            hostname = forwarder['hostname']
-            ip_address = forwarder['ip_address']
-            consume_queue = forwarder['consume_queue']
-            forwarder_info = ForwarderInfo(hostname=hostname, ip_address=ip_address,
-                                           consume_queue=consume_queue)
-            return forwarder_info
+            return ForwarderInfo.from_dict(forwarder)
         except Exception as e:
             LOGGER.info("Exception: "+str(e))
             return None
@@ -169,6 +170,7 @@ class Archiveboard(Scoreboard):
         timeout : `int`
             timeout value
         """
-        info = forwarder_info.__dict__
+        info = forwarder_info.to_dict()
         data = json.dumps(info)
+        self.cache.invalidate(self.device)
         self.conn.hset(self.device, self.PAIRED_FORWARDER, data)
@@ -0,0 +1,294 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import logging
+import redis
+from lsst.dm.csc.base.archiveboard import Archiveboard
+from lsst.dm.csc.base.async_scoreboard import AsyncScoreboard
+
+LOGGER = logging.getLogger(__name__)
+
+# Pop a Forwarder, record it as the paired one and set the association key,
+# in one step, so a Forwarder can't be popped by one archiver and left
+# without an association.
+#
+# KEYS[1] forwarder list, KEYS[2] device hash, KEYS[3] association key
+# ARGV[1] seconds the association lasts, ARGV[2] paired forwarder field
+PAIR_SCRIPT = """
+local item = redis.call('RPOP', KEYS[1])
+if not item then
+    return nil
+end
+redis.call('HSET', KEYS[2], ARGV[2], item)
+redis.call('SET', KEYS[3], cjson.decode(item)['hostname'], 'EX', ARGV[1])
+return item
+"""
+
+
+class AsyncArchiveboard(AsyncScoreboard):
+    """asyncio version of `lsst.dm.csc.base.archiveboard.Archiveboard`.
+    Create it with `create`, which also checks the connection.
+
+    Parameters
+    ----------
+    device : `str`
+    db : `int`
+    host : `str`
+        host name of the Redis database server
+    port : `int`
+        Redis database service network port number
+    key : `str`
+        association key
+    cache_ttl : `float`
+        seconds reads of the device's fields are cached for; 0 disables caching
+    backend : `lsst.dm.csc.base.scoreboard_backend.ScoreboardBackend`
+        where the data is kept; a Redis server if None
+    """
+
+    def __init__(self, device, db, host, port=6379, key=None, cache_ttl=0, backend=None):
+        super().__init__(device, db, host, port, cache_ttl, backend)
+
+        self.association_key = key
+        self.JOBNUM = "jobnum"
+        self.PAIRED_FORWARDER = "paired_forwarder"
+        self.FORWARDER_LIST = "forwarder_list"
+
+        self._pair_script = None
+
+    async def connect(self):
+        """Check the connection to Redis, and load the pairing script so
+        pairing takes one EVALSHA
+        """
+        await super().connect()
+        try:
+            self._pair_script = self.conn.register_script(PAIR_SCRIPT)
+            await self.conn.script_load(PAIR_SCRIPT)
+        except redis.ResponseError as e:
+            LOGGER.warning(f"can't load the pairing script: {e}; pairing won't be atomic")
+            self._pair_script = None
+
+    async def pair_forwarder(self, seconds_to_expire):
+        """Pop an available forwarder from the list, record it as the paired
+        forwarder, and set the association key, atomically.  If the server
+        can't run scripts, this is done with separate calls as before.
+
+        Parameters
+        ----------
+        seconds_to_expire : `int`
+            seconds the association key lasts unless refreshed
+
+        Returns
+        -------
+        forwarder_info : `lsst.dm.csc.base.forwarder_info.ForwarderInfo`
+
+        Raises
+        ------
+        RuntimeError
+            if no forwarder is on the list
+        """
+        if self._pair_script is None or self.association_key is None:
+            return await self._pair_forwarder_unscripted(seconds_to_expire)
+        self.cache.invalidate(self.device)
+        try:
+            item = await self._pair_script(keys=[self.FORWARDER_LIST, self.device, self.association_key],
+                                           args=[seconds_to_expire, self.PAIRED_FORWARDER])
+        except redis.ResponseError as e:
+            # servers with scripting turned off don't know EVALSHA
+            if "unknown command" not in str(e).lower():
+                raise
+            LOGGER.warning(f"pairing script failed: {e}; pairing won't be atomic")
+            self._pair_script = None
+            return await self._pair_forwarder_unscripted(seconds_to_expire)
+        if item is None:
+            LOGGER.info("No forwarder available on scoreboard list")
+            raise RuntimeError("No forwarder available on scoreboard list")
+        return self.create_forwarder_info(json.loads(item))
+
+    async def _pair_forwarder_unscripted(self, seconds_to_expire):
+        forwarder_info = await self.pop_forwarder_from_list()
+        async with self.batch():
+            await self.set_paired_forwarder_info(forwarder_info, seconds_to_expire)
+            if self.association_key is not None:
+                await self.set_forwarder_association(forwarder_info.hostname, seconds_to_expire)
+        return forwarder_info
+
+    # these don't touch Redis, so they are shared with the synchronous version
+    create_forwarder_info = Archiveboard.create_forwarder_info
+    _decode_forwarder_info = Archiveboard._decode_forwarder_info
+
+    async def get_jobnum(self):
+        """retrieve the job number from the redis database
+        """
+        return await self._hget(self.JOBNUM)
+
+    async def set_jobnum(self, jobnum):
+        """set the job number in the redis database
+
+        Parameters
+        ----------
+        jobnum : `int`
+            The job number
+        """
+        self.cache.invalidate(self.device)
+        await self.conn.hset(self.device, self.JOBNUM, jobnum)
+
+    async def pop_forwarder_from_list(self):
+        """Pop an available forwarder from the redis database list, waiting up to a second
+        for one to be added
+        """
+        LOGGER.info(f"popping from {self.FORWARDER_LIST}")
+        data = await self.conn.brpop(self.FORWARDER_LIST, 1)
+        if data is None:
+            LOGGER.info("No forwarder available on scoreboard list")
+            raise RuntimeError("No forwarder available on scoreboard list")
+        item = data[1]
+        d = json.loads(item)
+
+        return self.create_forwarder_info(d)
+
+    async def push_forwarder_onto_list(self, forwarder_info):
+        """Add the contents of the forwarder_info object to the Forwarder list in the Redis database
+
+        Parameters
+        ----------
+        forwarder_info : `lsst.dm.csc.base.forwarder_info.ForwarderInfo`
+        """
+        info = forwarder_info.to_dict()
+        data = json.dumps(info)
+        await self.conn.lpush(self.FORWARDER_LIST, data)
+
+    async def get_paired_forwarder_info(self):
+        """Retrieve the paired Forwarder as an ForwarderInfo object from the Redis databse
+
+        Returns
+        -------
+        forwarder_info : `lsst.dm.csc.base.forwarder_info.ForwarderInfo`
+        """
+        return await self._hget(self.PAIRED_FORWARDER, self._decode_forwarder_info)
+
+    async def check_forwarder_presence(self, forwarder_key):
+        """Check for the presence of the given key
+
+        This key is updated by the remote service at regular intervals.  If
+        it fails to update, the value is timed out of existence by Redis and
+        will indicate the service has either died or can no longer communicate
+
+        Parameters
+        ----------
+        forwarder_key : `str`
+            Forwarder key used for looking up service existence
+
+        Returns
+        -------
+        The value of the key entry
+        """
+        return await self.conn.get(forwarder_key)
+
+    async def set_forwarder_association(self, forwarder_hostname, timeout):
+        """Set the forwarder hostname to which the Archiver is associated
+
+        Parameters
+        ----------
+        forwarder_hostname : `str`
+            the host name on which the forwarder service is running
+        timeout : `int`
+            timeout value
+        """
+        await self.conn.set(self.association_key, forwarder_hostname, timeout)
+
+    async def check_forwarders_presence(self, forwarder_keys):
+        """Check for the presence of several keys with one MGET
+
+        Parameters
+        ----------
+        forwarder_keys : `list`
+            Forwarder keys used for looking up service existence
+
+        Returns
+        -------
+        A list of the values of the keys, None for those which are gone
+        """
+        if not forwarder_keys:
+            return []
+        return await self.conn.mget(forwarder_keys)
+
+    async def set_forwarder_associations(self, associations):
+        """Set several association keys in one round trip
+
+        Parameters
+        ----------
+        associations : `dict`
+            (forwarder hostname, timeout) by association key
+        """
+        if not associations:
+            return
+        async with self.batch(transaction=False):
+            for key, (forwarder_hostname, timeout) in associations.items():
+                await self.conn.set(key, forwarder_hostname, ex=timeout)
+
+    async def delete_forwarder_associations(self, keys):
+        """Delete several association keys with one DEL
+
+        Parameters
+        ----------
+        keys : `list`
+            the association keys
+        """
+        if keys:
+            LOGGER.info(f'deleting {keys}')
+            await self.conn.delete(*keys)
+
+    async def refresh_forwarder_association(self, timeout):
+        """Reset the expiry of the association key without rewriting it
+
+        Parameters
+        ----------
+        timeout : `float`
+            seconds until the key expires
+
+        Returns
+        -------
+        True if the key existed
+        """
+        return bool(await self.conn.pexpire(self.association_key, int(timeout * 1000)))
+
+    async def delete_forwarder_association(self):
+        """Delete the forwarder association key
+        """
+        LOGGER.info(f'deleting {self.association_key}')
+        await self.conn.delete(self.association_key)
+
+    async def set_paired_forwarder_info(self, forwarder_info, timeout):
+        """Add the paired forwarder's information
+
+        Parameters
+        ----------
+        forwarder_info : `lsst.dm.csc.base.forwarder_info.ForwarderInfo`
+            Forwarder information object
+        timeout : `int`
+            timeout value
+        """
+        info = forwarder_info.to_dict()
+        data = json.dumps(info)
+        self.cache.invalidate(self.device)
+        await self.conn.hset(self.device, self.PAIRED_FORWARDER, data)
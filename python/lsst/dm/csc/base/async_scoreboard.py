@@ -0,0 +1,339 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import contextlib
+import functools
+import logging
+import sys
+import redis.asyncio
+from lsst.dm.csc.base.scoreboard_backend import RedisBackend
+from lsst.dm.csc.base.scoreboard_cache import ReadCache, keyspace_channel, notifications_enabled
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AsyncScoreboard:
+    """asyncio version of `lsst.dm.csc.base.scoreboard.Scoreboard`, which
+    doesn't block the event loop while waiting on Redis.  Create it with
+    `create`, which also checks the connection.  Scoreboards on the same
+    event loop and Redis database share one connection pool, and only the
+    first of them pings the server.
+
+    Parameters
+    ----------
+    device : `str`
+        device name
+    db : `int`
+        redis database number
+    host : `str`
+        host name of Redis instance
+    port : `int`
+        network port number of Redis instance
+    cache_ttl : `float`
+        seconds reads of the device's fields are cached for; 0 disables caching
+    backend : `lsst.dm.csc.base.scoreboard_backend.ScoreboardBackend`
+        where the data is kept; a Redis server if None
+    """
+
+    def __init__(self, device, db, host, port=6379, cache_ttl=0, backend=None):
+        self.device = device
+        self.db = db
+        self.host = host
+        self.port = port
+        self.backend = RedisBackend() if backend is None else backend
+        self.conn = self.backend.client(host, port, db)
+
+        self.STATE = "state"
+        self.SESSION = "session"
+
+        # the pipeline commands are queued on while in batch()
+        self._pipeline = None
+
+        # cached device fields; writes through this board invalidate them, and
+        # watch_invalidations() also invalidates them when others write
+        self.cache = ReadCache(cache_ttl)
+        self._invalidator = None
+
+    @classmethod
+    async def create(cls, *args, **kwargs):
+        """Create a scoreboard and check its connection
+
+        Parameters are those of the class.
+
+        Returns
+        -------
+        The connected scoreboard
+        """
+        board = cls(*args, **kwargs)
+        await board.connect()
+        return board
+
+    async def connect(self):
+        """Check the connection to Redis
+        """
+        LOGGER.info(f"Connecting {self.device} to redis database {self.db} at host {self.host}:{self.port}")
+        await self.backend.verify(self.conn)
+
+    async def close(self):
+        """Stop watching for invalidations and release this board's connection;
+        the shared pool stays open
+        """
+        if self._invalidator is not None:
+            self._invalidator.cancel()
+            await asyncio.gather(self._invalidator, return_exceptions=True)
+            self._invalidator = None
+        await self.conn.aclose()
+
+    async def watch_invalidations(self):
+        """Drop cached fields when the device's hash is changed by anyone; see
+        `lsst.dm.csc.base.scoreboard.Scoreboard.watch_invalidations`
+
+        Returns
+        -------
+        True if notifications are being watched
+        """
+        if not self.cache.enabled or self._invalidator is not None:
+            return self._invalidator is not None
+        pubsub = await self.subscribe_keyspace(self.device, "hg")
+        if pubsub is None:
+            LOGGER.warning("no keyspace notifications; scoreboard cache relies on its ttl")
+            return False
+        self._invalidator = asyncio.create_task(self._listen(pubsub))
+        return True
+
+    async def subscribe_keyspace(self, key, classes):
+        """Subscribe to the keyspace notifications of a key
+
+        Parameters
+        ----------
+        key : `str`
+            Redis key
+        classes : `str`
+            classes of command, as notify-keyspace-events flags, which must
+            be notified for the subscription to be any use
+
+        Returns
+        -------
+        A `redis.asyncio.client.PubSub` whose messages carry the event names,
+        or None if the server doesn't send those notifications
+        """
+        try:
+            if not notifications_enabled(await self.conn.config_get("notify-keyspace-events"), classes):
+                return None
+            pubsub = self.conn.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(keyspace_channel(self.db, key))
+        except redis.RedisError as e:
+            LOGGER.warning(f"can't subscribe to keyspace notifications of {key}: {e}")
+            return None
+        return pubsub
+
+    async def _listen(self, pubsub):
+        try:
+            while True:
+                message = await pubsub.get_message(timeout=1.0)
+                if message is not None:
+                    self.cache.invalidate(self.device)
+        except redis.RedisError as e:
+            # without notifications, a cached field could be stale until its ttl runs out
+            LOGGER.warning(f"lost keyspace notifications: {e}; dropping scoreboard cache")
+            self.cache.clear()
+            self._invalidator = None
+        finally:
+            await pubsub.aclose()
+
+    def cache_stats(self):
+        """Get the read cache counters
+
+        Returns
+        -------
+        A dict with hits, misses, invalidations, the hit rate, and the number
+        of cached fields
+        """
+        return self.cache.stats()
+
+    def command_stats(self):
+        """Get the latencies of the Redis commands sent by scoreboards in this
+        process
+
+        Returns
+        -------
+        A dict of histograms by command, and the slow command log; see
+        `lsst.dm.csc.base.redis_timing.CommandTimings.snapshot`
+        """
+        return self.conn.timings.snapshot()
+
+    def failover_stats(self):
+        """Get the failover counters
+
+        Returns
+        -------
+        A dict of counters, see
+        `lsst.dm.csc.base.redis_failover.Failover.snapshot`, or None without
+        a failover
+        """
+        return None if self.backend.failover is None else self.backend.failover.snapshot()
+
+    async def _hget(self, field, decode=None):
+        if self._pipeline is not None:
+            # a read in a batch is queued, and its raw reply is in the
+            # batch's results, so it isn't looked up, decoded or cached
+            return await self.conn.hget(self.device, field)
+        hit, value = self.cache.get(self.device, field)
+        if hit:
+            return value
+        generation = self.cache.generation(self.device)
+        value = await self.conn.hget(self.device, field)
+        if decode is not None:
+            value = decode(value)
+        self.cache.put(self.device, field, value, generation)
+        return value
+
+    @contextlib.asynccontextmanager
+    async def batch(self, transaction=True):
+        """Queue the writes made in the block and send them in one round trip
+        when it exits; see `lsst.dm.csc.base.scoreboard.Scoreboard.batch`
+
+        Parameters
+        ----------
+        transaction : `bool`
+            if True, the writes are applied atomically with MULTI/EXEC
+
+        Returns
+        -------
+        The results of the queued commands, in a list filled in when the
+        batch is sent
+        """
+        if self._pipeline is not None:
+            yield []
+            return
+        conn = self.conn
+        results = []
+        self._pipeline = self.conn = conn.pipeline(transaction=transaction)
+        try:
+            yield results
+            results.extend(await self._pipeline.execute())
+        finally:
+            await self._pipeline.reset()
+            self._pipeline = None
+            self.conn = conn
+
+    async def get_state(self):
+        """Get the device state
+
+        Returns
+        -------
+        The device state
+        """
+        return await self._hget(self.STATE)
+
+    async def set_state(self, state):
+        """Set the device state
+        """
+        self.cache.invalidate(self.device)
+        await self.conn.hset(self.device, self.STATE, state)
+
+    async def get_session(self):
+        """Get the session identifier
+
+        Returns
+        -------
+        The session identifier
+        """
+        return await self._hget(self.SESSION)
+
+    async def set_session(self, session):
+        """Set the session identifier
+        """
+        self.cache.invalidate(self.device)
+        await self.conn.hset(self.device, self.SESSION, session)
+
+    async def set_fields(self, mapping):
+        """Set several fields of the device with one HSET
+
+        Parameters
+        ----------
+        mapping : `dict`
+            values by field name
+        """
+        self.cache.invalidate(self.device)
+        await self.conn.hset(self.device, mapping=mapping)
+
+    async def get_fields(self, *fields):
+        """Get several fields of the device with one HMGET
+
+        Parameters
+        ----------
+        *fields : `str`
+            field names
+
+        Returns
+        -------
+        A dict of values by field name; fields which aren't set are None
+        """
+        return dict(zip(fields, await self.conn.hmget(self.device, fields)))
+
+
+class SyncScoreboardAdapter:
+    """Give a synchronous `Scoreboard` or `Archiveboard` the interface of the
+    asyncio versions, by running each call in the default executor so it
+    doesn't block the event loop
+
+    Parameters
+    ----------
+    board : `lsst.dm.csc.base.scoreboard.Scoreboard`
+        the synchronous scoreboard
+    """
+
+    def __init__(self, board):
+        self.board = board
+
+    def __getattr__(self, name):
+        attr = getattr(self.board, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, functools.partial(attr, *args, **kwargs))
+        return call
+
+    async def close(self):
+        """Close the connections to Redis
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self.board.close)
+
+    @contextlib.asynccontextmanager
+    async def batch(self, transaction=True):
+        """Queue the writes made in the block and send them in one round trip
+        when it exits; see `lsst.dm.csc.base.scoreboard.Scoreboard.batch`
+        """
+        batch = self.board.batch(transaction)
+        results = batch.__enter__()
+        try:
+            yield results
+        except BaseException:
+            if not batch.__exit__(*sys.exc_info()):
+                raise
+        else:
+            await asyncio.get_running_loop().run_in_executor(None, batch.__exit__, None, None, None)
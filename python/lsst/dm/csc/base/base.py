@@ -21,10 +21,12 @@
 
 
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import os
 import os.path
+import queue
 import sys
+import threading
 import time
 import yaml
 from lsst.dm.csc.base.Credentials import Credentials
@@ -32,6 +34,59 @@ from lsst.dm.csc.base.Credentials import Credentials
 LOGGER = logging.getLogger(__name__)
 
 
+class LogQueueListener(QueueListener):
+    """QueueListener which waits for room on a full queue when stopping,
+    rather than failing to enqueue its sentinel
+    """
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler which never blocks the caller. If the bounded queue is
+    full, the record is dropped and counted instead.
+
+    The QueueListener draining the queue is stopped when this handler is
+    closed, so pending records are written out at logging shutdown.  Records
+    are logged from any thread, so the count of dropped ones is kept under
+    a lock.
+
+    Parameters
+    ----------
+    record_queue : `queue.Queue`
+        bounded queue to write records to
+    """
+
+    def __init__(self, record_queue):
+        super().__init__(record_queue)
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.listener = None
+
+    @property
+    def dropped(self):
+        """Number of records dropped because the queue was full
+        """
+        with self._dropped_lock:
+            return self._dropped
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
+        super().close()
+
+
 class Base:
     """Base class which sets up logging, configuration and credentials
 
@@ -47,6 +102,7 @@ class Base:
 
     def __init__(self, name, config_filename, log_filename):
         self._name = name
+        self._log_handler = None
         self._config = self.loadConfigFile(config_filename)
         self.setupLogging(log_filename)
         self._cred = Credentials('iip_cred.yaml')
@@ -125,11 +181,27 @@ class Base:
         """
         return self._config
 
+    def getDroppedLogCount(self):
+        """Get the number of log records dropped because the log queue was full
+
+        Returns
+        -------
+        The number of dropped log records
+        """
+        if self._log_handler is None:
+            return 0
+        return self._log_handler.dropped
+
     def setupLogging(self, filename):
         """Setup writing to a log. If the IIP_LOG_DIR environment variable
         is set, use that.  Otherwise, use log_dir_location if it was
         specified. If it wasn't, default to /tmp.
 
+        Records are put on a bounded queue (ROOT.LOG_QUEUE_SIZE entries) and
+        written, and the file rotated, by a background thread, so logging never
+        blocks the event loop.  Records which don't fit on the queue are
+        dropped and counted.
+
         Parameters
         -----------
         filename : `str`
@@ -159,18 +231,32 @@ class Base:
             # if we're here, there was no LOGGING_DIR entry in the config file,
             # and IIP_LOG_DIR hasn't been set.  Therefore, write to stdout.
             handler = logging.StreamHandler(sys.stdout)
-            LOGGER.addHandler(handler)
-            logging.basicConfig(level=logging.INFO, format=FORMAT, datefmt="%Y-%m-%d %H:%M:%S")
         else:
             # if we're here, either LOGGING_DIR was set, or IIP_LOG_DIR was set, so write files to
             # the directory that was indicated.
             log_file = os.path.join(log_dir, filename)
             handler = RotatingFileHandler(log_file, maxBytes=2000000, backupCount=10)
-            LOGGER.addHandler(handler)
-            logging.basicConfig(filename=log_file, level=logging.INFO, format=FORMAT,
-                                datefmt="%Y-%m-%d %H:%M:%S")
+        handler.setFormatter(logging.Formatter(FORMAT, datefmt="%Y-%m-%d %H:%M:%S"))
+
+        root_logger = logging.getLogger()
+        root_logger.setLevel(logging.INFO)
+
+        # logging is process wide, so replace any queue set up by an earlier instance
+        for h in list(root_logger.handlers):
+            if isinstance(h, DroppingQueueHandler):
+                root_logger.removeHandler(h)
+                h.close()
+
+        queue_size = self._config['ROOT'].get('LOG_QUEUE_SIZE', 10000)
+        self._log_handler = DroppingQueueHandler(queue.Queue(queue_size))
+        self._log_handler.listener = LogQueueListener(self._log_handler.queue, handler)
+        self._log_handler.listener.start()
+        root_logger.addHandler(self._log_handler)
 
     def shutdown(self):
         """Shutdown all services
         """
-        pass
+        if self._log_handler is not None:
+            logging.getLogger().removeHandler(self._log_handler)
+            self._log_handler.close()
+            self._log_handler = None
@@ -21,6 +21,8 @@
 
 import asyncio
 import logging
+from lsst.dm.csc.base.ack_latency import LatencyEstimator
+from lsst.dm.csc.base.waiter import wait_for_event
 
 LOGGER = logging.getLogger(__name__)
 
@@ -29,26 +31,135 @@ class Beacon:
     """Beacon used to continually update status of the running service to inform the forwarder
     of it's "alive" state.
 
+    Updates are made on fixed deadlines from the loop's monotonic clock, so the
+    time the update itself takes doesn't stretch the period.  Updates which
+    can't be made in time are skipped and counted, and how late each update
+    starts is kept as jitter statistics.
+
     Parameter
     ---------
     evt : `asyncio.Event`
         Event used to flag shutdown
-    scoreboard : `lsst.dm.csc.base.scoreboard`
-        Scoreboard to update
+    scoreboard : `lsst.dm.csc.base.async_archiveboard.AsyncArchiveboard`
+        Scoreboard to update; a synchronous one must be wrapped in a
+        `lsst.dm.csc.base.async_scoreboard.SyncScoreboardAdapter`
+    pexpire : `bool`
+        if True, after the association is first set it is kept alive by
+        resetting its expiry with PEXPIRE instead of writing it again
     """
-    def __init__(self, evt, scoreboard):
+    def __init__(self, evt, scoreboard, pexpire=False):
         self.evt = evt
         self.evt.clear()
         self.scoreboard = scoreboard
+        self.pexpire = pexpire
+
+        # lateness of each update, in seconds
+        self.jitter = LatencyEstimator()
+        self.max_jitter = 0.0
+        self.updates = 0
+        self.missed = 0
+
+    def jitter_stats(self):
+        """Get the update timing statistics
+
+        Returns
+        -------
+        A dict with the number of updates made and missed, and the mean, 99th
+        percentile and largest lateness of the updates, in seconds
+        """
+        return {"updates": self.updates, "missed": self.missed, "mean": self.jitter.average,
+                "p99": self.jitter.percentile(99), "max": self.max_jitter}
+
+    async def update(self, forwarder_info, seconds_to_expire, first):
+        """Set the association, or with pexpire, refresh its expiry
+        """
+        if self.pexpire and not first:
+            # if the key is already gone, it has to be written again
+            if await self.scoreboard.refresh_forwarder_association(seconds_to_expire):
+                return
+            LOGGER.info(f"association with {forwarder_info.hostname} had gone; setting it again")
+        await self.scoreboard.set_forwarder_association(forwarder_info.hostname, seconds_to_expire)
 
     async def ping(self, forwarder_info, seconds_to_expire, seconds_to_update):
         """Continously update forwarder association info every `seconds_to_update`, setting the expiration
         time to `seconds_to_expire`.  Note that seconds_to_update should be less than seconds_to_expire.
         """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        first = True
         while True:
             if self.evt.is_set():  # if this is set, we were asked to shut down.
                 LOGGER.info(f"stopping beacon for {forwarder_info.hostname}")
-                self.scoreboard.delete_forwarder_association()
+                await self.scoreboard.delete_forwarder_association()
+                return
+            lateness = loop.time() - deadline
+            self.jitter.add(lateness)
+            self.max_jitter = max(self.max_jitter, lateness)
+            await self.update(forwarder_info, seconds_to_expire, first)
+            first = False
+            self.updates += 1
+
+            deadline += seconds_to_update
+            now = loop.time()
+            if now >= deadline:
+                missed = int((now - deadline) // seconds_to_update) + 1
+                self.missed += missed
+                deadline += missed * seconds_to_update
+                LOGGER.warning(f"beacon for {forwarder_info.hostname} missed {missed} updates")
+            # wake as soon as we're asked to shut down
+            await wait_for_event(self.evt, deadline - now)
+
+
+class MultiBeacon:
+    """Beacon which keeps many associations alive, refreshing all of them in
+    one pipelined round trip each update
+
+    Parameter
+    ---------
+    evt : `asyncio.Event`
+        Event used to flag shutdown
+    scoreboard : `lsst.dm.csc.base.async_archiveboard.AsyncArchiveboard`
+        Scoreboard to update
+    """
+    def __init__(self, evt, scoreboard):
+        self.evt = evt
+        self.evt.clear()
+        self.scoreboard = scoreboard
+        self.associations = {}
+
+    def add(self, key, forwarder_info, seconds_to_expire):
+        """Start keeping an association alive
+
+        Parameters
+        ----------
+        key : `str`
+            association key
+        forwarder_info : `lsst.dm.csc.base.forwarder_info.ForwarderInfo`
+            the paired Forwarder
+        seconds_to_expire : `int`
+            seconds the key lasts unless refreshed
+        """
+        self.associations[key] = (forwarder_info.hostname, seconds_to_expire)
+
+    def remove(self, key):
+        """Stop keeping an association alive; it expires on its own
+
+        Parameters
+        ----------
+        key : `str`
+            association key
+        """
+        self.associations.pop(key, None)
+
+    async def ping(self, seconds_to_update):
+        """Continously update every association every `seconds_to_update`, until
+        asked to shut down, then delete them all.  seconds_to_update should be
+        less than the shortest seconds_to_expire.
+        """
+        while True:
+            if self.evt.is_set():  # if this is set, we were asked to shut down.
+                LOGGER.info(f"stopping beacon for {len(self.associations)} associations")
+                await self.scoreboard.delete_forwarder_associations(list(self.associations))
                 return
-            self.scoreboard.set_forwarder_association(forwarder_info.hostname, seconds_to_expire)
-            await asyncio.sleep(seconds_to_update)
+            await self.scoreboard.set_forwarder_associations(dict(self.associations))
+            await wait_for_event(self.evt, seconds_to_update)
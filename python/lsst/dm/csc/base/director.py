@@ -21,8 +21,12 @@
 
 import asyncio
 import datetime
+import itertools
 import logging
+from lsst.dm.csc.base.ack_table import AckTable
 from lsst.dm.csc.base.base import Base
+from lsst.dm.csc.base.journal import Journal
+from lsst.dm.csc.base.tracer import Tracer
 
 LOGGER = logging.getLogger(__name__)
 
@@ -41,12 +45,34 @@ class Director(Base):
     def __init__(self, name, config_filename, log_filename):
         super().__init__(name, config_filename, log_filename)
 
-        self.initialize_session()
-
         cdm = self.getConfiguration()
         root = cdm["ROOT"]
+
+        # if JOURNAL_FILE is given, sent messages, acks and job numbers are
+        # journaled there, so job numbers continue across restarts and
+        # exposures which were mid-flight can be reported
+        self.journal = None
+        self.recovered = None
+        journal_file = root.get("JOURNAL_FILE")
+        if journal_file is not None:
+            self.journal = Journal(journal_file, root.get("JOURNAL_SYNC_INTERVAL", 0.1),
+                                   root.get("JOURNAL_SYNC_BATCH", 64))
+            self.recovered = self.journal.open()
+            images = self.recovered.images()
+            if images:
+                LOGGER.warning(f"images mid-flight in session {self.recovered.session_id}: {images}")
+            LOGGER.info(f"journal {journal_file} replayed; last jobnum {self.recovered.jobnum}")
+
+        self._ack_ids = itertools.count(1)
+        self.initialize_session()
+
         self.base_broker_addr = root["BASE_BROKER_ADDR"]
 
+        # spans of each exposure's hops through the archiver, written to
+        # TRACE_FILE, if it is given, when services stop
+        self.tracer = Tracer(root.get("TRACE_BUFFER_SIZE", 4096))
+        self.trace_file = root.get("TRACE_FILE")
+
         cred = self.getCredentials()
 
         service_user = cred.getUser('service_user')
@@ -56,10 +82,119 @@ class Director(Base):
 
         self.base_broker_url = url
 
-        self._ack_lock = asyncio.Lock()
-        self._ack_id = 0
-        self._event_map_lock = asyncio.Lock()
-        self._event_map = {}
+        # everything here runs on one event loop thread, so this
+        # doesn't need a lock.  Entries which never see an ack are dropped
+        # after ACK_TTL seconds, and at most ACK_TABLE_MAX are kept.
+        self._ack_table = AckTable(ttl=root.get("ACK_TTL", 600),
+                                   max_entries=root.get("ACK_TABLE_MAX", 10000),
+                                   on_resolve=self._ack_resolved,
+                                   on_forget=self._ack_forgotten)
+
+        # round trip estimates of acks registered with a (msg_type, queue) key;
+        # set up by subclasses which know their ack timeout
+        self.ack_timeouts = None
+
+    def get_ack_stats(self):
+        """Get counters for outstanding, expired, evicted, late, duplicate and unknown acks
+
+        Returns
+        -------
+        A dict of counters
+        """
+        return self._ack_table.stats()
+
+    def register_ack(self, ack_id, timeout=None, on_timeout=None, key=None):
+        """Register interest in an ack
+
+        Parameters
+        ----------
+        ack_id : `str`
+            id of the ack to wait for
+        timeout : `float`
+            seconds to wait for the ack; None waits for ACK_TTL
+        on_timeout : `callable`
+            called with the `AckEntry` if the ack doesn't arrive within timeout
+        key : `tuple`
+            (msg_type, queue) of the message, used to estimate round trip times
+
+        Returns
+        -------
+        asyncio.Future which is resolved with the ack message when it arrives
+        """
+        return self._ack_table.register(ack_id, timeout, on_timeout, key).future
+
+    def ack_outstanding(self, ack_id):
+        """Check whether an ack is still expected
+
+        Parameters
+        ----------
+        ack_id : `str`
+            id of the ack
+
+        Returns
+        -------
+        True if the ack is registered and hasn't arrived, expired or been evicted
+        """
+        return ack_id in self._ack_table
+
+    def ack_arrived(self, ack_id):
+        """Check whether an ack has arrived already, so another copy of it
+        is a duplicate
+
+        Parameters
+        ----------
+        ack_id : `str`
+            id of the ack
+
+        Returns
+        -------
+        True if the ack was resolved before, in time or after its entry
+        expired or was evicted
+        """
+        return self._ack_table.resolved(ack_id)
+
+    def journal_sent(self, msg):
+        """Journal a message which expects an ack, if journaling is enabled
+
+        Parameters
+        ----------
+        msg : `dict`
+            the message sent
+        """
+        if self.journal is not None:
+            self.journal.sent(msg)
+
+    def _ack_resolved(self, entry, rtt):
+        if self.ack_timeouts is not None and isinstance(entry.data, tuple):
+            self.ack_timeouts.observe(*entry.data, rtt)
+
+    def _ack_forgotten(self, entry, reason):
+        # the ack is no longer waited for, so it isn't reported as
+        # mid-flight when the journal is replayed
+        if self.journal is not None:
+            self.journal.gone(entry.ack_id, reason)
+
+    def resolve_ack(self, ack_id, msg):
+        """Resolve the future registered for an ack
+
+        Parameters
+        ----------
+        ack_id : `str`
+            id of the ack which arrived
+        msg : `dict`
+            the ack message
+
+        Returns
+        -------
+        The round trip time in seconds, or None if the ack wasn't expected,
+        for example because it was already resolved by an earlier copy
+        """
+        rtt = self._ack_table.resolve(ack_id, msg)
+        if self.journal is not None:
+            self.journal.acked(ack_id)
+        if rtt is not None:
+            LOGGER.debug("ack %s round trip time %.6f s", ack_id, rtt)
+        return rtt
 
     async def create_event(self, ack_id):
         """Create an event using the ack_id, and store it in a cache
@@ -74,8 +209,7 @@ class Director(Base):
         asyncio.Event
         """
         evt = asyncio.Event()
-        async with self._event_map_lock:
-            self._event_map[ack_id] = evt
+        self._ack_table.register(ack_id, data=evt)
         return evt
 
     async def clear_event(self, ack_id):
@@ -109,11 +243,20 @@ class Director(Base):
         -------
         asyncio.Event
         """
-        evt = None
-        async with self._event_map_lock:
-            if ack_id in self._event_map:
-                evt = self._event_map.pop(ack_id)
-        return evt
+        entry = self._ack_table.pop(ack_id)
+        if entry is None:
+            return None
+        entry.future.cancel()
+        return entry.data
+
+    def next_ack_id(self):
+        """Create a unique ID
+
+        Returns
+        -------
+        a unique id
+        """
+        return self._ack_prefix + str(next(self._ack_ids))
 
     async def get_next_ack_id(self):
         """Create a unique ID
@@ -122,18 +265,18 @@ class Director(Base):
         -------
         a unique id
         """
-        ack_id_val = 0
-        async with self._ack_lock:
-            self._ack_id += 1
-            ack_id_val = self._ack_id
-        ack_id = f"{self.session_id}_{ack_id_val}"
-        return ack_id
+        return self.next_ack_id()
 
     def initialize_session(self):
-        """Initialize the session id and jobnum.
+        """Initialize the session id and jobnum.  If journaling is enabled, jobnum
+        continues from the last one journaled.
         """
         self.session_id = str(datetime.datetime.now()).replace(' ', '_')
+        self._ack_prefix = f"{self.session_id}_"
         self.jobnum = 0
+        if self.journal is not None:
+            self.jobnum = self.recovered.jobnum
+            self.journal.session(self.session_id)
 
     def get_session_id(self):
         """Returns the session id
@@ -160,4 +303,24 @@ class Director(Base):
         A new job number
         """
         self.jobnum += 1
+        if self.journal is not None:
+            self.journal.job(self.jobnum)
         return self.jobnum
+
+    def dump_trace(self):
+        """Write the recorded spans to TRACE_FILE, if it is configured
+        """
+        if self.trace_file is None:
+            return
+        try:
+            self.tracer.dump(self.trace_file)
+        except OSError as e:
+            LOGGER.warning(f"can't write trace spans to {self.trace_file}: {e}")
+
+    def shutdown(self):
+        """Shutdown all services
+        """
+        self.dump_trace()
+        if self.journal is not None:
+            self.journal.close()
+        super().shutdown()
@@ -19,10 +19,28 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import struct
+import sys
+
+# a bitmask of the fields which are present, the lengths of the three
+# fields, then the fields in UTF-8; a field which is None has its bit clear
+# and a length of 0
+_HEADER = struct.Struct("!BHHH")
+MAX_FIELD_LENGTH = 0xFFFF
+
+
+def _intern(value):
+    # a malformed record may hold other types, which are kept as they are
+    return sys.intern(value) if type(value) is str else value
+
 
 class ForwarderInfo:
     """Representation of information about a Forwarder
 
+    ForwarderInfo is immutable and hashable.  Its strings are interned, so
+    records of the same Forwarder share them and compare quickly; fields of
+    other types are kept as given.
+
     Parameters
     ----------
     hostname : `str`
@@ -33,7 +51,125 @@ class ForwarderInfo:
         RabbitMQ queue where the Forwarder service listens for incoming messages
     """
 
+    __slots__ = ("hostname", "ip_address", "consume_queue")
+
     def __init__(self, hostname, ip_address, consume_queue):
-        self.hostname = hostname
-        self.ip_address = ip_address
-        self.consume_queue = consume_queue
+        object.__setattr__(self, "hostname", _intern(hostname))
+        object.__setattr__(self, "ip_address", _intern(ip_address))
+        object.__setattr__(self, "consume_queue", _intern(consume_queue))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ForwarderInfo is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("ForwarderInfo is immutable")
+
+    def _key(self):
+        return (self.hostname, self.ip_address, self.consume_queue)
+
+    def __eq__(self, other):
+        if not isinstance(other, ForwarderInfo):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return (f"ForwarderInfo(hostname={self.hostname!r}, ip_address={self.ip_address!r}, "
+                f"consume_queue={self.consume_queue!r})")
+
+    def __reduce__(self):
+        return (ForwarderInfo, self._key())
+
+    def to_dict(self):
+        """Get the fields as a dict, in the form written to Redis as JSON
+
+        Returns
+        -------
+        A dict keyed by field name
+        """
+        return {"hostname": self.hostname, "ip_address": self.ip_address,
+                "consume_queue": self.consume_queue}
+
+    @classmethod
+    def from_dict(cls, d):
+        """Create a ForwarderInfo from the dict made by `to_dict`
+
+        Parameters
+        ----------
+        d : `dict`
+            fields by name
+
+        Returns
+        -------
+        forwarder_info : `ForwarderInfo`
+        """
+        return cls(d["hostname"], d["ip_address"], d["consume_queue"])
+
+    def to_bytes(self):
+        """Encode as a compact binary record
+
+        Returns
+        -------
+        The encoded `bytes`
+
+        Raises
+        ------
+        ValueError
+            if a field isn't a string or None, or is longer than
+            MAX_FIELD_LENGTH bytes in UTF-8
+        """
+        present = 0
+        fields = []
+        for i, value in enumerate(self._key()):
+            if value is None:
+                fields.append(b"")
+                continue
+            if not isinstance(value, str):
+                raise ValueError(f"can't encode ForwarderInfo field {value!r}")
+            field = value.encode()
+            if len(field) > MAX_FIELD_LENGTH:
+                raise ValueError(f"ForwarderInfo field of {len(field)} bytes is longer "
+                                 f"than {MAX_FIELD_LENGTH}")
+            present |= 1 << i
+            fields.append(field)
+        return _HEADER.pack(present, *(len(field) for field in fields)) + b"".join(fields)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Decode a record made by `to_bytes`
+
+        Parameters
+        ----------
+        data : `bytes`
+            the record
+
+        Returns
+        -------
+        forwarder_info : `ForwarderInfo`
+
+        Raises
+        ------
+        ValueError
+            if the record is cut short, has bytes after its last field, or
+            isn't valid UTF-8
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError(f"ForwarderInfo record of {len(data)} bytes is shorter than its header")
+        present, *lengths = _HEADER.unpack_from(data)
+        offset = _HEADER.size
+        values = []
+        for i, length in enumerate(lengths):
+            if not present & (1 << i):
+                if length:
+                    raise ValueError("ForwarderInfo record has a length for a missing field")
+                values.append(None)
+                continue
+            if offset + length > len(data):
+                raise ValueError(f"ForwarderInfo record of {len(data)} bytes is cut short")
+            values.append(data[offset:offset + length].decode())
+            offset += length
+        if offset != len(data):
+            raise ValueError(f"ForwarderInfo record has {len(data) - offset} bytes after its fields")
+        return cls(*values)
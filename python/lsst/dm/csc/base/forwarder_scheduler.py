@@ -0,0 +1,291 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import logging
+import redis
+from lsst.dm.csc.base.forwarder_info import ForwarderInfo
+
+LOGGER = logging.getLogger(__name__)
+
+# Pick a Forwarder from the pool and take it out, in one step so two
+# archivers can't pick the same one.  The candidates, read from the pool
+# beforehand, are looked at in turn: the first one still in the pool and
+# healthy is taken, and the unhealthy ones before it are dropped from the
+# pool on the way.
+#
+# KEYS[1] pool sorted set, KEYS[2] info hash, KEYS[3...] alive keys of the
+# candidates, if their health is checked
+# ARGV[1] "1" to check health, ARGV[2...] candidate members
+PICK_SCRIPT = """
+local check = ARGV[1] == '1'
+for i = 2, #ARGV do
+    local member = ARGV[i]
+    if redis.call('ZSCORE', KEYS[1], member) then
+        local info = redis.call('HGET', KEYS[2], member)
+        redis.call('ZREM', KEYS[1], member)
+        redis.call('HDEL', KEYS[2], member)
+        if not check or redis.call('EXISTS', KEYS[i + 1]) == 1 then
+            return {member, info}
+        end
+    end
+end
+return nil
+"""
+
+
+def pick(pool, alive, preferred=None):
+    """Choose a Forwarder the way `ForwarderScheduler.pair` does, without
+    Redis; used by the simulation benchmark
+
+    Parameters
+    ----------
+    pool : `dict`
+        scores by member
+    alive : `set`
+        healthy members
+    preferred : `str`
+        member to choose if it is in the pool and healthy
+
+    Returns
+    -------
+    The chosen member, or None
+    """
+    if preferred in pool and preferred in alive:
+        return preferred
+    for member in sorted(pool, key=pool.get):
+        if member in alive:
+            return member
+    return None
+
+
+class PairingPolicy:
+    """Chooses which Forwarder an archiver would like to pair with.  The pick
+    itself falls back to the least loaded healthy Forwarder if the preferred
+    one isn't available.
+    """
+
+    def preferred(self, members):
+        """Get the preferred member
+
+        Parameters
+        ----------
+        members : `list`
+            members of the pool, by ascending score
+
+        Returns
+        -------
+        The preferred member, or None to take the least loaded
+        """
+        return None
+
+    def paired(self, member):
+        """Note the member which was paired with
+
+        Parameters
+        ----------
+        member : `str`
+            the member
+        """
+        pass
+
+
+class LeastLoadedPolicy(PairingPolicy):
+    """Pair with the healthy Forwarder with the lowest load score
+    """
+    pass
+
+
+class RoundRobinPolicy(PairingPolicy):
+    """Pair with the Forwarders in turn, in hostname order
+    """
+
+    def __init__(self):
+        self.last = None
+
+    def preferred(self, members):
+        if not members:
+            return None
+        members = sorted(members)
+        if self.last is not None:
+            for member in members:
+                if member > self.last:
+                    return member
+        return members[0]
+
+    def paired(self, member):
+        self.last = member
+
+
+class AffinityPolicy(PairingPolicy):
+    """Pair with the Forwarder paired with last time, if it is available, so
+    it can reuse what it set up; otherwise with the least loaded one
+    """
+
+    def __init__(self):
+        self.last = None
+
+    def preferred(self, members):
+        return self.last
+
+    def paired(self, member):
+        self.last = member
+
+
+POLICIES = {"least_loaded": LeastLoadedPolicy, "round_robin": RoundRobinPolicy, "affinity": AffinityPolicy}
+
+
+def make_policy(name):
+    """Create a pairing policy by name
+
+    Parameters
+    ----------
+    name : `str`
+        "least_loaded", "round_robin" or "affinity"
+
+    Returns
+    -------
+    policy : `PairingPolicy`
+    """
+    try:
+        return POLICIES[name]()
+    except KeyError:
+        raise ValueError(f"unknown forwarder pairing policy {name}; "
+                         f"expected one of {sorted(POLICIES)}") from None
+
+
+class ForwarderScheduler:
+    """Pool of Forwarders which publish a load score to a Redis sorted set,
+    from which archivers pair with one according to a `PairingPolicy`.  A
+    Forwarder is taken out of the pool by PICK_SCRIPT, or, if the server
+    can't run scripts, by separate calls in which ZREM decides which
+    archiver gets it.
+
+    Parameters
+    ----------
+    board : `lsst.dm.csc.base.async_archiveboard.AsyncArchiveboard`
+        scoreboard whose connection is used
+    policy : `PairingPolicy`
+        how to choose a Forwarder; defaults to the least loaded one
+    pool_key : `str`
+        key of the sorted set of Forwarders by score; their info is kept in
+        a hash at pool_key + "_info"
+    alive_prefix : `str`
+        prefix of the keys Forwarders keep alive while they are healthy;
+        None skips the health check
+    scan_limit : `int`
+        most members the pick looks through for a healthy one
+    """
+
+    def __init__(self, board, policy=None, pool_key="forwarder_pool", alive_prefix="forwarder_alive:",
+                 scan_limit=32):
+        self.board = board
+        self.policy = LeastLoadedPolicy() if policy is None else policy
+        self.pool_key = pool_key
+        self.info_key = f"{pool_key}_info"
+        self.alive_prefix = alive_prefix
+        self.scan_limit = scan_limit
+        self._pick = board.conn.register_script(PICK_SCRIPT)
+
+    async def publish(self, forwarder_info, score, ttl):
+        """Add a Forwarder to the pool, or update its score, and mark it alive
+
+        Parameters
+        ----------
+        forwarder_info : `lsst.dm.csc.base.forwarder_info.ForwarderInfo`
+            the Forwarder
+        score : `float`
+            its load or latency; lower is preferred
+        ttl : `int`
+            seconds it is considered healthy for without publishing again
+        """
+        member = forwarder_info.hostname
+        async with self.board.batch():
+            await self.board.conn.zadd(self.pool_key, {member: score})
+            await self.board.conn.hset(self.info_key, member, json.dumps(forwarder_info.to_dict()))
+            if self.alive_prefix is not None:
+                await self.board.conn.set(f"{self.alive_prefix}{member}", 1, ex=ttl)
+
+    async def loads(self):
+        """Get the pool
+
+        Returns
+        -------
+        A list of (member, score), by ascending score
+        """
+        return await self.board.conn.zrange(self.pool_key, 0, -1, withscores=True)
+
+    async def pair(self):
+        """Take a Forwarder from the pool
+
+        Returns
+        -------
+        forwarder_info : `lsst.dm.csc.base.forwarder_info.ForwarderInfo`
+
+        Raises
+        ------
+        RuntimeError
+            if no healthy Forwarder is in the pool
+        """
+        members = await self.board.conn.zrange(self.pool_key, 0, self.scan_limit - 1)
+        preferred = self.policy.preferred(members)
+        candidates = list(members)
+        if preferred is not None:
+            candidates = [preferred] + [member for member in members if member != preferred]
+        result = None
+        if candidates:
+            result = await self._take(candidates)
+        if result is None:
+            LOGGER.info(f"No healthy forwarder in {self.pool_key}")
+            raise RuntimeError(f"No healthy forwarder in {self.pool_key}")
+        member, info = result
+        self.policy.paired(member)
+        LOGGER.info(f"paired with {member} from {self.pool_key}")
+        return ForwarderInfo.from_dict(json.loads(info))
+
+    async def _take(self, candidates):
+        keys = [self.pool_key, self.info_key]
+        if self.alive_prefix is not None:
+            keys.extend(f"{self.alive_prefix}{member}" for member in candidates)
+        if self._pick is not None:
+            try:
+                check = "" if self.alive_prefix is None else "1"
+                return await self._pick(keys=keys, args=[check] + candidates)
+            except redis.ResponseError as e:
+                # servers with scripting turned off don't know EVALSHA
+                if "unknown command" not in str(e).lower():
+                    raise
+                LOGGER.warning(f"pick script failed: {e}; pairing won't be atomic")
+                self._pick = None
+        return await self._take_unscripted(candidates)
+
+    async def _take_unscripted(self, candidates):
+        conn = self.board.conn
+        for member in candidates:
+            info = await conn.hget(self.info_key, member)
+            # only the archiver whose ZREM removes the member has it
+            if not await conn.zrem(self.pool_key, member):
+                continue
+            await conn.hdel(self.info_key, member)
+            if self.alive_prefix is None or await conn.exists(f"{self.alive_prefix}{member}"):
+                return member, info
+        return None
@@ -0,0 +1,337 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import collections
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class JournalState:
+    """What a journal held when it was replayed
+
+    Attributes
+    ----------
+    jobnum : `int`
+        the last job number given out
+    session_id : `str`
+        the last session id
+    outstanding : `collections.OrderedDict`
+        records of sent messages which were never acked, by ACK_ID
+    """
+
+    def __init__(self):
+        self.jobnum = 0
+        self.session_id = None
+        self.outstanding = collections.OrderedDict()
+
+    def images(self):
+        """Get the images which were mid-flight
+
+        Returns
+        -------
+        A list of IMAGE_IDs, oldest first, with messages that were never acked
+        """
+        images = []
+        for record in self.outstanding.values():
+            image_id = record.get("image_id")
+            if image_id is not None and image_id not in images:
+                images.append(image_id)
+        return images
+
+    def apply(self, record):
+        """Apply one journal record
+
+        Parameters
+        ----------
+        record : `dict`
+            the record
+        """
+        kind = record["t"]
+        if kind == "send":
+            self.outstanding[record["ack_id"]] = record
+        elif kind in ("ack", "gone"):
+            self.outstanding.pop(record["ack_id"], None)
+        elif kind == "job":
+            self.jobnum = max(self.jobnum, record["job_num"])
+        elif kind == "session":
+            # messages of earlier sessions were reported when the journal
+            # was opened for this one, and are never acked now
+            self.session_id = record["session_id"]
+            self.outstanding.clear()
+
+
+class Journal:
+    """Append-only journal of sent messages, their acks, and job numbers, so
+    the state of a Director can be recovered after a restart
+
+    Records are JSON lines.  They are written as they happen, but only made
+    durable with fsync once sync_batch records are pending or sync_interval
+    seconds after the first of them, so a burst of messages costs one fsync.
+    On an event loop the fsync runs in its executor, so the loop doesn't
+    stall on the disk.
+
+    Parameters
+    ----------
+    filename : `str`
+        journal file
+    sync_interval : `float`
+        longest time, in seconds, a record waits to be synced
+    sync_batch : `int`
+        number of pending records which are synced right away
+    """
+
+    def __init__(self, filename, sync_interval=0.1, sync_batch=64):
+        self.filename = filename
+        self.sync_interval = sync_interval
+        self.sync_batch = sync_batch
+        self._file = None
+        self._pending = 0
+        self._sync_handle = None
+        self._syncing = None
+        self._resync = False
+        self.syncs = 0
+
+    def open(self):
+        """Replay the journal, compact it down to what is still outstanding,
+        and open it for appending
+
+        Returns
+        -------
+        state : `JournalState`
+            what the journal held
+        """
+        state = self.replay(self.filename)
+
+        # rewrite the journal with only the records which still matter, so it
+        # doesn't grow across restarts
+        tmp = f"{self.filename}.tmp"
+        with open(tmp, "w") as f:
+            if state.session_id is not None:
+                f.write(self._encode({"t": "session", "session_id": state.session_id}))
+            f.write(self._encode({"t": "job", "job_num": state.jobnum}))
+            for record in state.outstanding.values():
+                f.write(self._encode(record))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.filename)
+
+        self._file = open(self.filename, "a")
+        return state
+
+    @staticmethod
+    def replay(filename):
+        """Read a journal
+
+        Parameters
+        ----------
+        filename : `str`
+            journal file; a missing file is an empty journal
+
+        Returns
+        -------
+        state : `JournalState`
+            what the journal held
+        """
+        state = JournalState()
+        if not os.path.exists(filename):
+            return state
+        with open(filename) as f:
+            for n, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # the last line is cut short if the process died while writing it
+                    LOGGER.warning(f"{filename}:{n}: skipping unreadable journal record")
+                    continue
+                state.apply(record)
+        return state
+
+    def _encode(self, record):
+        return json.dumps(record, separators=(',', ':')) + "\n"
+
+    def append(self, record):
+        """Add a record to the journal
+
+        Parameters
+        ----------
+        record : `dict`
+            the record; "t" holds its kind
+        """
+        if self._file is None:
+            return
+        self._file.write(self._encode(record))
+        self._pending += 1
+        if self._pending >= self.sync_batch:
+            self.sync()
+        elif self._sync_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.sync()
+                return
+            self._sync_handle = loop.call_later(self.sync_interval, self.sync)
+
+    def sent(self, msg):
+        """Record a message which expects an ack
+
+        Parameters
+        ----------
+        msg : `dict`
+            the message sent
+        """
+        self.append({"t": "send", "ack_id": msg["ACK_ID"], "msg_type": msg.get("MSG_TYPE"),
+                     "image_id": msg.get("IMAGE_ID"), "job_num": msg.get("JOB_NUM"), "ts": time.time()})
+
+    def acked(self, ack_id):
+        """Record an ack
+
+        Parameters
+        ----------
+        ack_id : `str`
+            id of the ack which arrived
+        """
+        self.append({"t": "ack", "ack_id": ack_id})
+
+    def gone(self, ack_id, reason):
+        """Record an ack which is no longer waited for
+
+        Parameters
+        ----------
+        ack_id : `str`
+            id of the ack
+        reason : `str`
+            why it went away, "expired" or "evicted"
+        """
+        self.append({"t": "gone", "ack_id": ack_id, "reason": reason})
+
+    def job(self, job_num):
+        """Record a job number which was given out
+
+        Parameters
+        ----------
+        job_num : `int`
+            the job number
+        """
+        self.append({"t": "job", "job_num": job_num})
+
+    def session(self, session_id):
+        """Record a new session
+
+        Parameters
+        ----------
+        session_id : `str`
+            the session id
+        """
+        self.append({"t": "session", "session_id": session_id})
+
+    def sync(self):
+        """Make the records written so far durable
+
+        On an event loop this only starts the fsync; `synced` waits for it.
+        """
+        if self._sync_handle is not None:
+            self._sync_handle.cancel()
+            self._sync_handle = None
+        if self._file is None or self._pending == 0:
+            return
+        self._file.flush()
+        self._pending = 0
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            os.fsync(self._file.fileno())
+            self.syncs += 1
+            return
+        if self._syncing is not None:
+            # the running fsync may have started before these records were
+            # flushed, so another one follows it
+            self._resync = True
+            return
+        self._start_fsync(loop)
+
+    def _start_fsync(self, loop):
+        # fsync a duplicate of the descriptor, which stays valid if the
+        # journal is closed while the fsync runs.  Whichever of the worker
+        # and a cancellation takes the claim closes it.
+        fd = os.dup(self._file.fileno())
+        claim = threading.Lock()
+        self._syncing = loop.run_in_executor(None, self._fsync, fd, claim)
+        self._syncing.add_done_callback(functools.partial(self._fsync_done, fd, claim))
+
+    @staticmethod
+    def _fsync(fd, claim):
+        if not claim.acquire(blocking=False):
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _fsync_done(self, fd, claim, future):
+        self._syncing = None
+        if future.cancelled():
+            if claim.acquire(blocking=False):
+                # the worker never ran
+                os.close(fd)
+            # the records it was for are synced by the next fsync
+            LOGGER.warning(f"journal {self.filename}: fsync cancelled; records not synced")
+            self._resync = True
+        elif future.exception() is not None:
+            LOGGER.error(f"journal {self.filename}: fsync failed: {future.exception()}")
+        else:
+            self.syncs += 1
+        if self._resync and self._file is not None:
+            self._resync = False
+            try:
+                self._start_fsync(asyncio.get_running_loop())
+            except RuntimeError:
+                # the loop's executor has been shut down
+                os.fsync(self._file.fileno())
+                self.syncs += 1
+
+    async def synced(self):
+        """Wait for the fsyncs started by `sync` to finish
+        """
+        while self._syncing is not None:
+            await asyncio.wait([self._syncing])
+
+    def close(self):
+        """Sync and close the journal
+        """
+        if self._file is None:
+            return
+        if self._sync_handle is not None:
+            self._sync_handle.cancel()
+            self._sync_handle = None
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self.syncs += 1
+        self._file.close()
+        self._file = None
@@ -0,0 +1,719 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+from collections import deque
+import fnmatch
+import logging
+import redis
+from lsst.dm.csc.base.redis_timing import get_timings
+from lsst.dm.csc.base.scoreboard_cache import keyspace_channel
+
+LOGGER = logging.getLogger(__name__)
+
+WRONGTYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+
+
+def _encode(value):
+    # values come back as strings, as from a client with decode_responses
+    if isinstance(value, bytes):
+        return value.decode()
+    return str(value)
+
+
+class SortedSet(dict):
+    """Scores by member of a sorted set, kept apart from hashes by its type
+    """
+
+    def ordered(self):
+        """Get the members by ascending score, then name
+        """
+        return sorted(self, key=lambda member: (self[member], member))
+
+
+class LocalServer:
+    """In-process stand-in for the part of Redis the asyncio scoreboards use,
+    so the Beacon, Watcher and pairing work without a Redis server
+
+    Strings, hashes, lists and sorted sets are kept in memory.  Keys expire on the event
+    loop's clock, so a loop with a virtual clock expires them in virtual
+    time, and keyspace notifications are sent for them.  Because the loop
+    runs one command at a time, a pipeline is always applied atomically.
+    Lua scripts aren't supported: they fail as they would on a server with
+    scripting turned off.  A server can be stopped and started again, to
+    stand in for a Redis server which goes away.
+
+    Parameters
+    ----------
+    notify_keyspace_events : `str`
+        value reported for the notify-keyspace-events setting; notifications
+        are always sent
+    """
+
+    def __init__(self, notify_keyspace_events="KA"):
+        self.config = {"notify-keyspace-events": notify_keyspace_events}
+        # values by key, by database
+        self._dbs = {}
+        # loop time each key with a ttl expires at, by database
+        self._expires = {}
+        # subscribed LocalPubSub by channel
+        self._subscribers = {}
+        # futures of blocked pops, by database
+        self._poppers = {}
+        self.running = True
+
+    def stop(self):
+        """Make commands fail as if the server had gone away, and end the
+        subscriptions; the data is kept
+        """
+        self.running = False
+        for subscribers in list(self._subscribers.values()):
+            for pubsub in list(subscribers):
+                pubsub.disconnect()
+        self._subscribers.clear()
+
+    def start(self):
+        """Make commands work again after `stop`
+        """
+        self.running = True
+
+    def check(self):
+        """Raise the error a client gets if the server has gone away
+
+        Raises
+        ------
+        redis.ConnectionError
+            if the server is stopped
+        """
+        if not self.running:
+            raise redis.ConnectionError("local scoreboard server is stopped")
+
+    def _now(self):
+        return asyncio.get_running_loop().time()
+
+    def keys(self, db):
+        """Get the values by key of a database, without expired keys
+
+        Parameters
+        ----------
+        db : `int`
+            database number
+
+        Returns
+        -------
+        A dict of values by key: strings, dicts for hashes, deques for lists
+        and `SortedSet` for sorted sets
+        """
+        for key in list(self._expires.get(db, {})):
+            self.lookup(db, key)
+        return self._dbs.setdefault(db, {})
+
+    def lookup(self, db, key, kind=None):
+        """Get the value of a key, expiring it first if its time is up
+
+        Parameters
+        ----------
+        db : `int`
+            database number
+        key : `str`
+            the key
+        kind : `type`
+            str, dict, deque or `SortedSet`, which the value must be if it
+            exists
+
+        Returns
+        -------
+        The value, or None if the key doesn't exist
+
+        Raises
+        ------
+        redis.ResponseError
+            if the value is of another kind
+        redis.ConnectionError
+            if the server is stopped
+        """
+        self.check()
+        values = self._dbs.setdefault(db, {})
+        deadline = self._expires.get(db, {}).get(key)
+        if deadline is not None and deadline <= self._now():
+            self._expire(db, key, deadline)
+        value = values.get(key)
+        if value is not None and kind is not None and type(value) is not kind:
+            raise redis.ResponseError(WRONGTYPE)
+        return value
+
+    def store(self, db, key, value, event):
+        """Set the value of a key, and notify its subscribers of the event
+        """
+        self._dbs.setdefault(db, {})[key] = value
+        self.notify(db, key, event)
+
+    def remove(self, db, key, event):
+        """Remove a key, and notify its subscribers of the event
+
+        Returns
+        -------
+        True if the key existed
+        """
+        if self._dbs.setdefault(db, {}).pop(key, None) is None:
+            return False
+        self._expires.get(db, {}).pop(key, None)
+        self.notify(db, key, event)
+        return True
+
+    def set_expiry(self, db, key, seconds):
+        """Expire a key after some seconds
+
+        Parameters
+        ----------
+        db : `int`
+            database number
+        key : `str`
+            key, which must exist
+        seconds : `float`
+            seconds until it expires; None removes the expiry
+        """
+        expires = self._expires.setdefault(db, {})
+        if seconds is None:
+            expires.pop(key, None)
+            return
+        deadline = self._now() + seconds
+        expires[key] = deadline
+        # the key is also expired when next looked up, if this never runs
+        asyncio.get_running_loop().call_at(deadline, self._expire, db, key, deadline)
+
+    def ttl(self, db, key):
+        """Get the seconds until a key expires
+
+        Returns
+        -------
+        The seconds, -1 if the key doesn't expire, or -2 if it doesn't exist
+        """
+        if self.lookup(db, key) is None:
+            return -2
+        deadline = self._expires.get(db, {}).get(key)
+        return -1 if deadline is None else max(deadline - self._now(), 0)
+
+    def _expire(self, db, key, deadline):
+        # a later SET or EXPIRE replaces the deadline this was scheduled for
+        if self._expires.get(db, {}).get(key) == deadline:
+            self.remove(db, key, "expired")
+
+    def notify(self, db, key, event):
+        """Send a keyspace notification to the subscribers of a key
+
+        Parameters
+        ----------
+        db : `int`
+            database number
+        key : `str`
+            the key
+        event : `str`
+            command or event name, such as hset or expired
+        """
+        channel = keyspace_channel(db, key)
+        for pubsub in list(self._subscribers.get(channel, ())):
+            pubsub.deliver("message", channel, event)
+
+    def subscribe(self, channel, pubsub):
+        self._subscribers.setdefault(channel, set()).add(pubsub)
+
+    def unsubscribe(self, channel, pubsub):
+        subscribers = self._subscribers.get(channel)
+        if subscribers is not None:
+            subscribers.discard(pubsub)
+            if not subscribers:
+                del self._subscribers[channel]
+
+    def pushed(self, db):
+        """Wake the pops blocked on a database
+        """
+        for future in self._poppers.pop(db, ()):
+            if not future.done():
+                future.set_result(None)
+
+    async def wait_for_push(self, db, timeout):
+        """Wait for a push to a database
+
+        Parameters
+        ----------
+        db : `int`
+            database number
+        timeout : `float`
+            seconds to wait at most; None waits until a push
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._poppers.setdefault(db, []).append(future)
+        try:
+            await asyncio.wait({future}, timeout=timeout)
+        finally:
+            future.cancel()
+
+    def flushdb(self, db):
+        """Delete every key of a database, without notifications
+        """
+        self._dbs.pop(db, None)
+        self._expires.pop(db, None)
+
+
+class LocalRedis:
+    """Client of one database of a `LocalServer`, with the methods of
+    `redis.asyncio.StrictRedis` the scoreboards use
+
+    Parameters
+    ----------
+    server : `LocalServer`
+        the server
+    db : `int`
+        database number
+    """
+
+    def __init__(self, server, db=0):
+        self.server = server
+        self.db = db
+        # commands don't leave the process, so they aren't timed
+        self.timings = get_timings()
+
+    def _lookup(self, key, kind=None):
+        return self.server.lookup(self.db, key, kind)
+
+    async def ping(self):
+        self.server.check()
+        return True
+
+    async def close(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+    async def config_get(self, pattern="*"):
+        self.server.check()
+        return {name: value for name, value in self.server.config.items()
+                if fnmatch.fnmatchcase(name, pattern)}
+
+    async def flushdb(self):
+        self.server.flushdb(self.db)
+        return True
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return LocalPipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return LocalPubSub(self.server, ignore_subscribe_messages)
+
+    def register_script(self, script):
+        return LocalScript()
+
+    async def script_load(self, script):
+        raise redis.ResponseError("unknown command 'SCRIPT'")
+
+    # keys
+
+    async def exists(self, *names):
+        return sum(self._lookup(name) is not None for name in names)
+
+    async def delete(self, *names):
+        deleted = 0
+        for name in names:
+            if self._lookup(name) is not None:
+                deleted += self.server.remove(self.db, name, "del")
+        return deleted
+
+    async def expire(self, name, time):
+        return await self.pexpire(name, int(time * 1000))
+
+    async def pexpire(self, name, time):
+        if self._lookup(name) is None:
+            return False
+        self.server.set_expiry(self.db, name, time / 1000)
+        self.server.notify(self.db, name, "expire")
+        return True
+
+    async def ttl(self, name):
+        ttl = self.server.ttl(self.db, name)
+        return round(ttl) if ttl >= 0 else ttl
+
+    async def pttl(self, name):
+        ttl = self.server.ttl(self.db, name)
+        return round(ttl * 1000) if ttl >= 0 else ttl
+
+    # strings
+
+    async def get(self, name):
+        return self._lookup(name, str)
+
+    async def mget(self, keys, *args):
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        keys.extend(args)
+        values = [self._lookup(key) for key in keys]
+        return [value if isinstance(value, str) else None for value in values]
+
+    async def set(self, name, value, ex=None, px=None, nx=False, xx=False):
+        exists = self._lookup(name) is not None
+        if (nx and exists) or (xx and not exists):
+            return None
+        self.server.set_expiry(self.db, name, None)
+        self.server.store(self.db, name, _encode(value), "set")
+        if ex is not None:
+            self.server.set_expiry(self.db, name, ex)
+        elif px is not None:
+            self.server.set_expiry(self.db, name, px / 1000)
+        return True
+
+    # hashes
+
+    async def hget(self, name, key):
+        fields = self._lookup(name, dict)
+        return None if fields is None else fields.get(key)
+
+    async def hmget(self, name, keys, *args):
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        keys.extend(args)
+        fields = self._lookup(name, dict) or {}
+        return [fields.get(key) for key in keys]
+
+    async def hgetall(self, name):
+        return dict(self._lookup(name, dict) or {})
+
+    async def hset(self, name, key=None, value=None, mapping=None):
+        items = {} if key is None else {key: value}
+        if mapping:
+            items.update(mapping)
+        if not items:
+            raise redis.DataError("'hset' with no key value pairs")
+        fields = self._lookup(name, dict)
+        if fields is None:
+            fields = {}
+        added = sum(field not in fields for field in items)
+        fields.update((field, _encode(value)) for field, value in items.items())
+        self.server.store(self.db, name, fields, "hset")
+        return added
+
+    async def hdel(self, name, *keys):
+        fields = self._lookup(name, dict)
+        if fields is None:
+            return 0
+        removed = sum(fields.pop(key, None) is not None for key in keys)
+        if removed:
+            self.server.notify(self.db, name, "hdel")
+            if not fields:
+                self.server.remove(self.db, name, "del")
+        return removed
+
+    # lists; the head is on the left
+
+    async def _push(self, name, values, left):
+        items = self._lookup(name, deque)
+        if items is None:
+            items = deque()
+        for value in values:
+            if left:
+                items.appendleft(_encode(value))
+            else:
+                items.append(_encode(value))
+        self.server.store(self.db, name, items, "lpush" if left else "rpush")
+        self.server.pushed(self.db)
+        return len(items)
+
+    async def lpush(self, name, *values):
+        return await self._push(name, values, True)
+
+    async def rpush(self, name, *values):
+        return await self._push(name, values, False)
+
+    def _pop(self, name, left):
+        items = self._lookup(name, deque)
+        if items is None:
+            return None
+        item = items.popleft() if left else items.pop()
+        self.server.notify(self.db, name, "lpop" if left else "rpop")
+        if not items:
+            self.server.remove(self.db, name, "del")
+        return item
+
+    async def lpop(self, name):
+        return self._pop(name, True)
+
+    async def rpop(self, name):
+        return self._pop(name, False)
+
+    async def brpop(self, keys, timeout=0):
+        """Pop from the tail of the first non-empty list, waiting for a push
+        if they are all empty
+
+        Parameters
+        ----------
+        keys : `str` or `list`
+            list keys
+        timeout : `float`
+            seconds to wait at most; 0 waits until a push
+
+        Returns
+        -------
+        A tuple of the key and the item, or None if the wait timed out
+        """
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        while True:
+            for key in keys:
+                item = self._pop(key, False)
+                if item is not None:
+                    return (key, item)
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return None
+            await self.server.wait_for_push(self.db, remaining)
+
+    async def llen(self, name):
+        items = self._lookup(name, deque)
+        return 0 if items is None else len(items)
+
+    async def lrange(self, name, start, end):
+        items = list(self._lookup(name, deque) or ())
+        end = len(items) if end == -1 else end + 1
+        return items[start:end]
+
+    # sorted sets
+
+    async def zadd(self, name, mapping):
+        scores = self._lookup(name, SortedSet)
+        if scores is None:
+            scores = SortedSet()
+        added = sum(member not in scores for member in mapping)
+        scores.update((_encode(member), float(score)) for member, score in mapping.items())
+        self.server.store(self.db, name, scores, "zadd")
+        return added
+
+    async def zscore(self, name, member):
+        return (self._lookup(name, SortedSet) or {}).get(member)
+
+    async def zcard(self, name):
+        return len(self._lookup(name, SortedSet) or ())
+
+    async def zrem(self, name, *members):
+        scores = self._lookup(name, SortedSet)
+        if scores is None:
+            return 0
+        removed = sum(scores.pop(member, None) is not None for member in members)
+        if removed:
+            self.server.notify(self.db, name, "zrem")
+            if not scores:
+                self.server.remove(self.db, name, "del")
+        return removed
+
+    async def zrange(self, name, start, end, withscores=False):
+        scores = self._lookup(name, SortedSet) or SortedSet()
+        members = scores.ordered()
+        end = len(members) if end == -1 else end + 1
+        members = members[start:end]
+        if withscores:
+            return [(member, scores[member]) for member in members]
+        return members
+
+
+class LocalPipeline:
+    """Commands queued for a `LocalRedis`, with the interface of
+    `redis.asyncio.client.Pipeline`; each queued command returns the
+    pipeline, and `execute` runs them all without yielding to other tasks
+    unless one of them blocks
+
+    Parameters
+    ----------
+    client : `LocalRedis`
+        the client the commands are run on
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.command_stack = []
+
+    def __getattr__(self, name):
+        command = getattr(self.client, name)
+
+        def queue(*args, **kwargs):
+            self.command_stack.append((command, args, kwargs))
+            return self
+        return queue
+
+    def __await__(self):
+        return self._itself().__await__()
+
+    async def _itself(self):
+        return self
+
+    def __len__(self):
+        return len(self.command_stack)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.reset()
+
+    async def execute(self, raise_on_error=True):
+        stack, self.command_stack = self.command_stack, []
+        results = []
+        for command, args, kwargs in stack:
+            try:
+                results.append(await command(*args, **kwargs))
+            except redis.ResponseError as e:
+                results.append(e)
+        if raise_on_error:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    async def reset(self):
+        self.command_stack = []
+
+
+class LocalPubSub:
+    """Subscription to channels of a `LocalServer`, with the interface of
+    `redis.asyncio.client.PubSub`
+
+    Parameters
+    ----------
+    server : `LocalServer`
+        the server
+    ignore_subscribe_messages : `bool`
+        if True, no messages are returned for subscribing and unsubscribing
+    """
+
+    def __init__(self, server, ignore_subscribe_messages=False):
+        self.server = server
+        self.ignore_subscribe_messages = ignore_subscribe_messages
+        self.channels = set()
+        self._messages = asyncio.Queue()
+
+    def disconnect(self):
+        """Make the next `get_message` fail, as it does when the connection
+        to the server is lost
+        """
+        self.channels.clear()
+        self._messages.put_nowait(None)
+
+    def deliver(self, kind, channel, data):
+        self._messages.put_nowait({"type": kind, "pattern": None, "channel": channel, "data": data})
+
+    async def subscribe(self, *channels):
+        self.server.check()
+        for channel in channels:
+            self.server.subscribe(channel, self)
+            self.channels.add(channel)
+            if not self.ignore_subscribe_messages:
+                self.deliver("subscribe", channel, len(self.channels))
+
+    async def unsubscribe(self, *channels):
+        for channel in channels or list(self.channels):
+            self.server.unsubscribe(channel, self)
+            self.channels.discard(channel)
+            if not self.ignore_subscribe_messages:
+                self.deliver("unsubscribe", channel, len(self.channels))
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        """Get the next message
+
+        Parameters
+        ----------
+        ignore_subscribe_messages : `bool`
+            if True, skip messages for subscribing and unsubscribing
+        timeout : `float`
+            seconds to wait for a message; None waits until one arrives
+
+        Returns
+        -------
+        The message, as a dict with type, pattern, channel and data, or None
+        if none arrived in time
+
+        Raises
+        ------
+        redis.ConnectionError
+            if the server was stopped
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            try:
+                if deadline is None:
+                    message = await self._messages.get()
+                else:
+                    message = await asyncio.wait_for(self._messages.get(), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                return None
+            if message is None:
+                raise redis.ConnectionError("local scoreboard server is stopped")
+            if not (ignore_subscribe_messages and message["type"] != "message"):
+                return message
+
+    async def aclose(self):
+        for channel in list(self.channels):
+            self.server.unsubscribe(channel, self)
+        self.channels.clear()
+
+    close = aclose
+
+
+class LocalScript:
+    """Script registered with a `LocalRedis`, which fails when run as it
+    would on a server with scripting turned off
+    """
+
+    async def __call__(self, keys=None, args=None, client=None):
+        raise redis.ResponseError("unknown command 'EVALSHA'")
+
+
+# servers by (host, port), so scoreboards of the same host and port share data
+_servers = {}
+
+
+def get_server(host, port):
+    """Get the local server standing in for a Redis host and port
+
+    Parameters
+    ----------
+    host : `str`
+        host name of the Redis instance it replaces
+    port : `int`
+        network port number of the Redis instance it replaces
+
+    Returns
+    -------
+    server : `LocalServer`
+    """
+    key = (host, port)
+    server = _servers.get(key)
+    if server is None:
+        LOGGER.info(f"creating local scoreboard server for {host}:{port}")
+        server = LocalServer()
+        _servers[key] = server
+    return server
+
+
+def reset_servers():
+    """Forget the local servers and their data
+    """
+    _servers.clear()
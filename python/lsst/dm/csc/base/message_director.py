@@ -20,14 +20,26 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import asyncio
+import collections
+import functools
 import logging
+import redis
+from lsst.dm.csc.base.ack_latency import AckTimeoutEstimator
 from lsst.dm.csc.base.publisher import Publisher
 from lsst.dm.csc.base.consumer import Consumer
 from lsst.dm.csc.base.director import Director
-from lsst.dm.csc.base.waiter import Waiter
+from lsst.dm.csc.base.forwarder_scheduler import ForwarderScheduler, make_policy
+from lsst.dm.csc.base.redis_failover import Failover
+from lsst.dm.csc.base.redis_pool import configure_pools
+from lsst.dm.csc.base.redis_timing import configure_timings, get_timings
+from lsst.dm.csc.base.retry import RetryPolicies
+from lsst.dm.csc.base.scoreboard_backend import make_backend
+from lsst.dm.csc.base.target_dir import TargetDirCache
+from lsst.dm.csc.base.waiter import Waiter, timer_wheel
 from lsst.dm.csc.base.beacon import Beacon
 from lsst.dm.csc.base.watcher import Watcher
-from lsst.dm.csc.base.archiveboard import Archiveboard
+from lsst.dm.csc.base.async_archiveboard import AsyncArchiveboard
+from lsst.dm.csc.base.message_log import MessageLogger, MessageSummary
 
 LOGGER = logging.getLogger(__name__)
 
@@ -42,13 +54,19 @@ class MessageDirector(Director):
     config_filename : `str`
     log_filename : `str`
     """
+
+    # most startIntegration messages sent ahead of the archive controller's reply
+    # which are remembered while waiting for that reply
+    MAX_SPECULATIVE_DIRS = 1000
+
     def __init__(self, parent, name, config_filename, log_filename):
         super().__init__(name, config_filename, log_filename)
         self.parent = parent
 
         self._msg_actions = {}
 
-        self.getConfiguration()
+        root = self.getConfiguration()["ROOT"]
+        self.msg_log = MessageLogger(LOGGER, debug_sample=root.get("LOG_DEBUG_SAMPLE", 0))
 
         self.ARCHIVE_CONTROLLER_NAME = None
         self.FWDR_HEALTH_CHECK_ACK = None
@@ -75,6 +93,17 @@ class MessageDirector(Director):
         # a fault state
         self.wait_for_ack_timeouts = False
 
+        # resends of messages whose acks time out; configured by ACK_RETRY
+        self.retries = RetryPolicies()
+
+        # if pipeline_start_integration is set to True, startIntegration is sent to the
+        # Forwarder right away with the target directory cached from the archive
+        # controller's last reply, and the controller's reply only confirms it
+        self.pipeline_start_integration = False
+        self.target_dir_cache = TargetDirCache()
+        # target directories sent ahead of the controller's reply, by its ACK_ID
+        self._speculative_dirs = collections.OrderedDict()
+
     def config_val(self, config, key):
         if key in config:
             return config[key]
@@ -100,8 +129,59 @@ class MessageDirector(Director):
             sinfo = sinfo + f'default message ack timeout set to {self.ack_timeout}'
             LOGGER.info(sinfo)
 
+        # if ADAPTIVE_ACK_TIMEOUT is given, ack timeouts are derived from the observed
+        # round trip time of each message type and queue, clamped to MIN and MAX seconds;
+        # MAX defaults to four times ACK_TIMEOUT
+        adaptive = root.get("ADAPTIVE_ACK_TIMEOUT")
+        if adaptive is None:
+            self.ack_timeouts = AckTimeoutEstimator(self.ack_timeout)
+        else:
+            self.ack_timeouts = AckTimeoutEstimator(self.ack_timeout, adaptive=True,
+                                                    minimum=adaptive.get("MIN"),
+                                                    maximum=adaptive.get("MAX"),
+                                                    multiplier=adaptive.get("MULTIPLIER", 3),
+                                                    percentile=adaptive.get("PERCENTILE", 99),
+                                                    min_samples=adaptive.get("MIN_SAMPLES", 20))
+            LOGGER.info(f'adaptive ack timeouts enabled: {adaptive}')
+
+        # if ACK_RETRY is given, messages whose acks time out are resent with the same
+        # ACK_ID, per MSG_TYPE, before going into fault
+        self.retries = RetryPolicies(root.get("ACK_RETRY"))
+
+        self.pipeline_start_integration = root.get("PIPELINE_START_INTEGRATION", False)
+        LOGGER.info(f'pipelined startIntegration: {self.pipeline_start_integration}')
+
         self.redis_host = root["REDIS_HOST"]
         self.redis_db = root["ARCHIVER_REDIS_DB"]
+        # scoreboards share connection pools set up by REDIS_POOL
+        pool = root.get("REDIS_POOL", {})
+        configure_pools(max_connections=pool.get("MAX_CONNECTIONS"),
+                        health_check_interval=pool.get("HEALTH_CHECK_INTERVAL", 30),
+                        socket_keepalive=pool.get("SOCKET_KEEPALIVE", True))
+        # scoreboard commands slower than SLOW_THRESHOLD seconds are kept in a
+        # slow log of the last SLOW_LOG_SIZE of them
+        slow_log = root.get("REDIS_SLOW_LOG", {})
+        configure_timings(slow_threshold=slow_log.get("SLOW_THRESHOLD", 0.01),
+                          slow_log_size=slow_log.get("SLOW_LOG_SIZE", 128))
+
+        # seconds scoreboard reads are cached for; 0 turns the cache off
+        self.scoreboard_cache_ttl = root.get("SCOREBOARD_CACHE_TTL", 0)
+
+        # "local" keeps the scoreboards in this process instead of Redis, for single
+        # host test stands where no Forwarder reads them from elsewhere
+        # if REDIS_FAILOVER is given, scoreboard commands which fail because Redis went
+        # away are retried on the next of its ENDPOINTS, or the master its SENTINELS report
+        self.redis_failover = Failover.from_config(root.get("REDIS_FAILOVER"))
+        backend = root.get("SCOREBOARD_BACKEND", "redis")
+        self.scoreboard_backend = make_backend(backend, self.redis_failover)
+        LOGGER.info(f'scoreboard backend: {backend}, failover: {self.redis_failover is not None}')
+
+        # if FORWARDER_SCHEDULER is given, the Forwarder is picked from a pool scored by
+        # load, per its POLICY, rather than popped from the forwarder list
+        self.forwarder_scheduler = root.get("FORWARDER_SCHEDULER")
+        self.pairing_policy = None
+        if self.forwarder_scheduler is not None:
+            self.pairing_policy = make_policy(self.forwarder_scheduler.get("POLICY", "least_loaded"))
 
         self.forwarder_publish_queue = root["FORWARDER_PUBLISH_QUEUE"]
         self.forwarder_host = None
@@ -114,6 +194,8 @@ class MessageDirector(Director):
         beacon = csc['BEACON']
         self.seconds_to_expire = beacon['SECONDS_TO_EXPIRE']
         self.seconds_to_update = beacon['SECONDS_TO_UPDATE']
+        # if PEXPIRE is set, the beacon refreshes the association's expiry rather than rewriting it
+        self.beacon_pexpire = beacon.get('PEXPIRE', False)
 
         ats = root['ATS']
         self.wfs_raft = ats['WFS_RAFT']
@@ -131,6 +213,7 @@ class MessageDirector(Director):
 
         self.stop_forwarder_beacon_evt = asyncio.Event()
         self.stop_watcher_evt = asyncio.Event()
+        self.beacon_task = None
 
         self.publisher = None
         self.oods_consumer = None
@@ -147,9 +230,15 @@ class MessageDirector(Director):
         LOGGER.info("start_services called")
 
         self.services_started_evt.set()
+        if self.scoreboard is not None:
+            await self.scoreboard.close()
+            self.scoreboard = None
         try:
-            self.scoreboard = Archiveboard(self._name, db=self.redis_db, host=self.redis_host,
-                                           key=self.ASSOCIATION_KEY)
+            self.scoreboard = await AsyncArchiveboard.create(self._name, db=self.redis_db,
+                                                             host=self.redis_host, key=self.ASSOCIATION_KEY,
+                                                             cache_ttl=self.scoreboard_cache_ttl,
+                                                             backend=self.scoreboard_backend)
+            await self.scoreboard.watch_invalidations()
         except Exception as e:
             LOGGER.info(e)
             msg = "scoreboard could't establish connection with redis broker"
@@ -158,16 +247,30 @@ class MessageDirector(Director):
 
         forwarder_info = None
         try:
-            forwarder_info = self.scoreboard.pop_forwarder_from_list()
+            if self.forwarder_scheduler is None:
+                forwarder_info = await self.scoreboard.pair_forwarder(self.seconds_to_expire)
+            else:
+                scheduler = ForwarderScheduler(self.scoreboard, self.pairing_policy,
+                                               self.forwarder_scheduler.get("POOL_KEY", "forwarder_pool"),
+                                               self.forwarder_scheduler.get("ALIVE_PREFIX",
+                                                                            "forwarder_alive:"))
+                forwarder_info = await scheduler.pair()
 
             LOGGER.info(f"pairing with forwarder {forwarder_info.hostname}")
+        except (redis.ConnectionError, redis.TimeoutError) as e:
+            # the connection is only checked when its pool is first used, so
+            # a redis outage since then shows up here
+            LOGGER.info(e)
+            msg = f"redis db {self.redis_db} on {self.redis_host} unavailable while pairing: {e}"
+            self.parent.call_fault(5701, msg)
+            return
         except Exception:
             msg = f"no forwarder on forwarder_list in redis db {self.redis_db} on {self.redis_host}"
             self.parent.call_fault(5701, msg)
             return
         try:
             # record which forwarder we're paired to
-            self.beacon = Beacon(self.stop_forwarder_beacon_evt, self.scoreboard)
+            self.beacon = Beacon(self.stop_forwarder_beacon_evt, self.scoreboard, self.beacon_pexpire)
             self.beacon_task = asyncio.create_task(self.beacon.ping(forwarder_info,
                                                                     self.seconds_to_expire,
                                                                     self.seconds_to_update))
@@ -181,14 +284,42 @@ class MessageDirector(Director):
         task = asyncio.create_task(self.send_association_message())
         await task
 
+    def get_scoreboard_stats(self):
+        """Get the latencies of the Redis commands sent by scoreboards, and
+        the slow command log
+
+        Returns
+        -------
+        A dict; see `lsst.dm.csc.base.redis_timing.CommandTimings.snapshot`
+        """
+        return get_timings().snapshot()
+
+    def get_failover_stats(self):
+        """Get the numbers of Redis connection errors, retries and failovers
+
+        Returns
+        -------
+        A dict; see `lsst.dm.csc.base.redis_failover.Failover.snapshot`, or
+        None if REDIS_FAILOVER isn't configured
+        """
+        return None if self.redis_failover is None else self.redis_failover.snapshot()
+
     async def stop_services(self):
         """Stop all non-CSC commmunication
         """
         if self.services_started_evt.is_set():
             self.stop_watcher_evt.set()
             self.stop_forwarder_beacon_evt.set()
+            if self.beacon_task is not None:
+                # the beacon wakes at once and deletes the association, so the
+                # Forwarder can be paired again as soon as this returns
+                await asyncio.gather(self.beacon_task, return_exceptions=True)
+                self.beacon_task = None
             await self.rescind_connections()
             self.services_started_evt.clear()
+        if self.journal is not None:
+            self.journal.sync()
+        self.dump_trace()
 
     async def establish_connections(self, info):
         """Establish non-CSC messaging connections
@@ -284,9 +415,9 @@ class MessageDirector(Director):
         """
         msg_type = body['MSG_TYPE']
         if (msg_type != self.FWDR_HEALTH_CHECK_ACK) and (msg_type != 'ARCHIVE_HEALTH_CHECK_ACK'):
-            LOGGER.info("received message")
-            LOGGER.info(body)
+            self.msg_log.received(body)
         ch.basic_ack(method.delivery_tag)
+        self.tracer.extract(getattr(properties, 'headers', None))
         if msg_type in self._msg_actions:
             handler = self._msg_actions.get(msg_type)
             asyncio.create_task(handler(body))
@@ -296,7 +427,7 @@ class MessageDirector(Director):
     def on_telemetry(self, ch, method, properties, body):
         """Called when telemetry is received. Calls parent CSC object to emit the telemetry as a SAL message
         """
-        LOGGER.info(f"message was: {body}")
+        self.msg_log.log("telemetry", body)
         ch.basic_ack(method.delivery_tag)
 
         asyncio.create_task(self.parent.send_imageRetrievalForArchiving(self.CAMERA_NAME,
@@ -310,8 +441,10 @@ class MessageDirector(Director):
         msg : `dict`
             Dictionary containing parameters of message used to create a message to send to the OODS
         """
-        m = self.build_file_ingest_request_message(msg)
-        await self.publisher.publish_message(self.OODS_PUBLISH_QUEUE, m)
+        obsid = msg['OBSID']
+        with self.tracer.span("send_ingest_message_to_oods", obsid):
+            m = self.build_file_ingest_request_message(msg)
+            await self.publisher.publish_message(self.OODS_PUBLISH_QUEUE, m, self.tracer.inject(obsid))
 
     def build_file_ingest_request_message(self, msg):
         """Create a ingest request message for the OODS
@@ -340,8 +473,8 @@ class MessageDirector(Director):
         msg : `dict`
             contents of image_in_oods message
         """
-        LOGGER.info(f"msg received: {msg}")
-        asyncio.create_task(self.parent.send_imageInOODS(msg))
+        with self.tracer.span("process_image_in_oods", msg['OBSID']):
+            asyncio.create_task(self.parent.send_imageInOODS(msg))
 
     async def process_items_xferd_ack(self, msg):
         """ Handle at_items_xferd_ack message
@@ -364,7 +497,7 @@ class MessageDirector(Director):
         """
         self.archive_heartbeat_evt.clear()
 
-    async def publish_message(self, queue, msg):
+    async def publish_message(self, queue, msg, headers=None):
         """ publish message
         Parameters
         ----------
@@ -372,13 +505,18 @@ class MessageDirector(Director):
             RabbitMQ queue to write to
         msg : `dict`
             Containing message contents
+        headers : `dict`
+            optional AMQP message headers; by default, the trace context of
+            the message's image, if it has one
         """
-        await self.publisher.publish_message(queue, msg)
+        if headers is None:
+            headers = self.tracer.inject_message(msg)
+        await self.publisher.publish_message(queue, msg, headers)
 
     async def send_association_message(self):
         """Send an association message to inform the forwarder it has been picked
         """
-        ack_id = await self.get_next_ack_id()
+        ack_id = self.next_ack_id()
         msg = {}
         msg['ACK_ID'] = ack_id
         msg['MSG_TYPE'] = 'ASSOCIATED'
@@ -388,10 +526,110 @@ class MessageDirector(Director):
 
         code = 5752
         report = f"No association response from forwarder. Setting fault state with code = {code}"
+        self.expect_ack(self.forwarder_consume_queue, msg, code, report, True)
+
+    def expect_ack(self, queue, msg, code, report, enforce, headers=None):
+        """Register for the ack of a message which was sent, optionally faulting if it
+        doesn't arrive within the ack timeout for its message type and queue.
+
+        If the timeout is enforced and the retry policy for the message type allows it,
+        the message is resent with the same ACK_ID before going into fault.
+
+        Parameters
+        ----------
+        queue : `str`
+            queue the message was sent to
+        msg : `dict`
+            the message which was sent
+        code : `int`
+            fault code used if the ack doesn't arrive
+        report : `str`
+            Description used if the ack doesn't arrive
+        enforce : `bool`
+            if True, go into fault if the ack doesn't arrive in time
+        headers : `dict`
+            AMQP headers the message was sent with, used if it is resent
+
+        Returns
+        -------
+        asyncio.Future which is resolved with the ack message
+        """
+        self.journal_sent(msg)
+        if not enforce:
+            return self.register_ack(msg['ACK_ID'], key=(msg['MSG_TYPE'], queue))
+        return self._await_ack(queue, msg, code, report, headers, 0, 0)
+
+    def _await_ack(self, queue, msg, code, report, headers, attempt, delay):
+        key = (msg['MSG_TYPE'], queue)
+        timeout = delay + self.ack_timeouts.timeout(*key)
+        on_timeout = functools.partial(self.ack_timed_out, queue, msg, code, report, headers, attempt)
+        return self.register_ack(msg['ACK_ID'], timeout, on_timeout, key)
+
+    def ack_timed_out(self, queue, msg, code, report, headers, attempt, entry):
+        """Resend a message whose ack didn't arrive in time, or go into fault
+        if its retry policy is used up
+
+        Parameters
+        ----------
+        queue : `str`
+            queue the message was sent to
+        msg : `dict`
+            the message
+        code : `int`
+            fault code
+        report : `str`
+            Description of what happened in this fault
+        headers : `dict`
+            AMQP headers the message was sent with
+        attempt : `int`
+            number of times the message has been resent already
+        entry : `lsst.dm.csc.base.ack_table.AckEntry`
+            the entry which timed out
+        """
+        msg_type = msg['MSG_TYPE']
+        policy = self.retries.get(msg_type)
+        if attempt < policy.count:
+            attempt += 1
+            delay = policy.delay(attempt)
+            LOGGER.info(f"ack {entry.ack_id} timed out; resending {msg_type} in {delay} s "
+                        f"(retry {attempt} of {policy.count})")
+            self.retries.retried(msg_type, entry.ack_id)
+            # keep waiting for the ack during the backoff, so an ack which arrives late
+            # still resolves it and the resend is skipped
+            self._await_ack(queue, msg, code, report, headers, attempt, delay)
+            asyncio.create_task(self.resend_message(queue, msg, headers, delay))
+            return
+        self.retries.exhausted(msg_type, entry.ack_id)
+        LOGGER.info(f"ack {entry.ack_id} timed out")
+        self.parent.call_fault(code=code, report=report)
+
+    async def resend_message(self, queue, msg, headers, delay):
+        """Resend a message after a delay, unless it was acked in the meantime.  The
+        receiver is expected to treat a repeated ACK_ID as the same request.
+
+        Parameters
+        ----------
+        queue : `str`
+            queue to send the message to
+        msg : `dict`
+            the message
+        headers : `dict`
+            AMQP headers to send the message with
+        delay : `float`
+            seconds to wait before resending
+        """
+        if delay:
+            await timer_wheel().sleep(delay)
+        if not self.ack_outstanding(msg['ACK_ID']):
+            return
+        await self.publish_message(queue, msg, headers)
 
-        evt = await self.create_event(ack_id)
-        waiter = Waiter(evt, self.parent, self.ack_timeout)
-        self.startIntegration_ack_task = asyncio.create_task(waiter.pause(code, report))
+    def _ack_resolved(self, entry, rtt):
+        # the round trip time of a resent message is ambiguous, since the ack might
+        # be for any of the sends, so it isn't used for the timeout estimate
+        if self.retries.resolved(entry.ack_id):
+            return
+        super()._ack_resolved(entry, rtt)
 
     def send_telemetry(self, status_code, description):
         """Send telemetry
@@ -424,7 +662,7 @@ class MessageDirector(Director):
         -------
         dict containing message contents
         """
-        LOGGER.info(f'data = {data}')
+        LOGGER.debug("data = %s", data)
         d = {}
 
         d['MSG_TYPE'] = self.NEW_ARCHIVE_ITEM
@@ -534,8 +772,7 @@ class MessageDirector(Director):
         if "ACK_ID" in msg:
             ack_id = msg["ACK_ID"]
             LOGGER.info(f"association ack received {ack_id}")
-            evt = await self.clear_event(ack_id)
-            if evt is None:
+            if self.resolve_ack(ack_id, msg) is None:
                 LOGGER.info(f"Association ACK {ack_id} is unknown.  Ignored.")
                 return
         else:
@@ -553,11 +790,33 @@ class MessageDirector(Director):
         msg : `dict`
             contents of new_at_item_ack
         """
-        ack_id = msg["ACK_ID"]
-        LOGGER.info(f"process_new_item_ack ack_id = {ack_id} received")
-        await self.clear_event(ack_id)
-        # this is scheduled, since process_new_item_ack is never await-ed
-        asyncio.create_task(self.send_startIntegration(msg))
+        with self.tracer.span("process_new_item_ack", msg['IMAGE_ID']):
+            ack_id = msg["ACK_ID"]
+            LOGGER.info(f"process_new_item_ack ack_id = {ack_id} received")
+            duplicate = self.ack_arrived(ack_id)
+            self.resolve_ack(ack_id, msg)
+            if duplicate:
+                # a copy of an ack already handled, say for a resent NEW_ARCHIVE_ITEM;
+                # the Forwarder was already told.  An ack which arrives after its entry
+                # expired is still acted on, since no copy of it was.
+                LOGGER.info(f"ignoring ack {ack_id}, which arrived before")
+                # if startIntegration was pipelined, it was sent then; a later copy of the
+                # ack mustn't send it again
+                self._speculative_dirs.pop(ack_id, None)
+                return
+            target_dir = msg['TARGET_DIR']
+            self.target_dir_cache.update(target_dir)
+
+            sent_dir = self._speculative_dirs.pop(ack_id, None)
+            if sent_dir == target_dir:
+                # the Forwarder was already sent the right directory
+                return
+            if sent_dir is not None:
+                LOGGER.warning(f"startIntegration for {msg['IMAGE_ID']} was sent with target "
+                               f"directory {sent_dir}, but the archive controller gave {target_dir}; "
+                               f"resending")
+            # this is scheduled, since process_new_item_ack is never await-ed
+            asyncio.create_task(self.send_startIntegration(msg))
 
     async def send_startIntegration(self, msg):
         """Send the startIntegration message to the forwarder
@@ -567,20 +826,19 @@ class MessageDirector(Director):
         msg : `dict`
             Contents of CSC startIntegration message
         """
-        ack_id = await self.get_next_ack_id()
-        m = self.build_startIntegration_message(ack_id, msg)
+        image_id = msg['IMAGE_ID']
+        with self.tracer.span("send_startIntegration", image_id):
+            ack_id = self.next_ack_id()
+            m = self.build_startIntegration_message(ack_id, msg)
 
-        await self.publish_message(self.forwarder_consume_queue, m)
-        LOGGER.info("startIntegration sent to forwarder")
+            headers = self.tracer.inject(image_id)
+            await self.publish_message(self.forwarder_consume_queue, m, headers)
+            LOGGER.info("startIntegration sent to forwarder")
 
-        evt = await self.create_event(ack_id)
-        if self.wait_for_ack_timeouts:
             code = 5752
             report = f"No xfer_params response from forwarder. Setting fault state with code = {code}"
-
-            # creates a timer waiting for an acknowledgement
-            waiter = Waiter(evt, self.parent, self.ack_timeout)
-            asyncio.create_task(waiter.pause(code, report))
+            self.expect_ack(self.forwarder_consume_queue, m, code, report, self.wait_for_ack_timeouts,
+                            headers)
 
     #
     # startIntegration
@@ -589,33 +847,46 @@ class MessageDirector(Director):
         """transmit startIntegration to the archive controller
 
         The response message returns information from the archive controller which is
-        transmitted to the Forwarder
+        transmitted to the Forwarder.  If startIntegration is pipelined and the target
+        directory for today is already known, the Forwarder is sent it at the same time
+        as the archive controller, and the controller's response confirms it.
 
         Parameters
         ----------
         msg : `dict`
             Contents of the startIntegration message
         """
-        ack_id = await self.get_next_ack_id()
-
-        # first we send a message to the archiver, to obtain the correct target directory
-        m = self.build_archiver_message(ack_id, msg)
-        LOGGER.info(f"transmit_startIntegration msg = {m}")
-
-        await self.publish_message(self.ARCHIVE_CTRL_CONSUME_QUEUE, m)
+        image_id = msg.imageName
+        with self.tracer.span("transmit_startIntegration", image_id):
+            ack_id = self.next_ack_id()
+
+            # first we send a message to the archiver, to obtain the correct target directory
+            m = self.build_archiver_message(ack_id, msg)
+
+            headers = self.tracer.inject(image_id)
+            target_dir = None
+            if self.pipeline_start_integration:
+                target_dir = self.target_dir_cache.get()
+            if target_dir is None:
+                await self.publish_message(self.ARCHIVE_CTRL_CONSUME_QUEUE, m, headers)
+            else:
+                self._speculative_dirs[ack_id] = target_dir
+                while len(self._speculative_dirs) > self.MAX_SPECULATIVE_DIRS:
+                    self._speculative_dirs.popitem(last=False)
+                data = {'IMAGE_ID': image_id, 'TARGET_DIR': target_dir}
+                await asyncio.gather(self.publish_message(self.ARCHIVE_CTRL_CONSUME_QUEUE, m, headers),
+                                     self.send_startIntegration(data))
+            self.msg_log.sent(self.ARCHIVE_CTRL_CONSUME_QUEUE, m)
+
+            # now we set up a wait for the ack. If the ack doesn't appear within the time
+            # frame allotted, a fault is thrown.  Otherwise, when the ack message is received,
+            # the data is extracted within the "process_new_item_ack" method, and the
+            # "startIntegration" message is build and sent to the forwarder from that method
 
-        # now we set up a wait for the ack. If the ack doesn't appear within the time
-        # frame allotted, a fault is thrown.  Otherwise, when the ack message is received,
-        # the data is extracted within the "process_new_item_ack" method, and the
-        # "startIntegration" message is build and sent to the forwarder from that method
-
-        evt = await self.create_event(ack_id)
-        if self.wait_for_ack_timeouts:
             code = 5752
-            report = f"No ack response from at archive controller"
-
-            waiter = Waiter(evt, self.parent, self.ack_timeout)
-            asyncio.create_task(waiter.pause(code, report))
+            report = "No ack response from at archive controller"
+            self.expect_ack(self.ARCHIVE_CTRL_CONSUME_QUEUE, m, code, report, self.wait_for_ack_timeouts,
+                            headers)
 
     async def process_xfer_params_ack(self, msg):
         """Handle xfer_params_ack message
@@ -627,7 +898,7 @@ class MessageDirector(Director):
         """
         ack_id = msg["ACK_ID"]
         LOGGER.info(f"startIntegration ack_id = {ack_id} received")
-        await self.clear_event(ack_id)
+        self.resolve_ack(ack_id, msg)
 
     #
     # endReadout
@@ -640,25 +911,26 @@ class MessageDirector(Director):
         msg : `salobj.DataType`
             Contents of the endReadout CSC message
         """
-        ack_id = await self.get_next_ack_id()
+        image_id = msg.imageName
+        with self.tracer.span("transmit_endReadout", image_id):
+            ack_id = self.next_ack_id()
 
-        m = self.build_endReadout_message(ack_id, msg)
-        LOGGER.info(f"transmit_endReadout msg = {m}")
-        await self.publish_message(self.forwarder_consume_queue, m)
+            m = self.build_endReadout_message(ack_id, msg)
+            headers = self.tracer.inject(image_id)
+            await self.publish_message(self.forwarder_consume_queue, m, headers)
+            self.msg_log.sent(self.forwarder_consume_queue, m)
 
-        evt = await self.create_event(ack_id)
-        if self.wait_for_ack_timeouts:
             code = 5753
             report = f"No endReadout ack from forwarder. Setting fault state with code = {code}"
-            waiter = Waiter(evt, self.parent, self.ack_timeout)
-            asyncio.create_task(waiter.pause(code, report))
+            self.expect_ack(self.forwarder_consume_queue, m, code, report, self.wait_for_ack_timeouts,
+                            headers)
 
     async def process_fwdr_end_readout_ack(self, msg):
         """ Handle at_fwder_end_readout_ack message
         """
         ack_id = msg["ACK_ID"]
         LOGGER.info(f"endReadout ack_id = {ack_id} received")
-        await self.clear_event(ack_id)
+        self.resolve_ack(ack_id, msg)
 
     #
     # largeFileObjectAvailable
@@ -671,24 +943,21 @@ class MessageDirector(Director):
         msg: `salobj.DataType`
             the contents of the largeFileObjectAvailable CSC message
         """
-        ack_id = await self.get_next_ack_id()
+        ack_id = self.next_ack_id()
         m = self.build_largeFileObjectAvailable_message(ack_id, msg)
-        LOGGER.info(f"transmit_largeFileObjectAvailable msg = {m}")
         await self.publish_message(self.forwarder_consume_queue, m)
+        self.msg_log.sent(self.forwarder_consume_queue, m)
 
-        evt = await self.create_event(ack_id)
-        if self.wait_for_ack_timeouts:
-            code = 5754
-            report = f"No largeFileObjectAvailable ack from forwarder. Setting fault state with code = {code}"
-            waiter = Waiter(evt, self.parent, self.ack_timeout)
-            asyncio.create_task(waiter.pause(code, report))
+        code = 5754
+        report = f"No largeFileObjectAvailable ack from forwarder. Setting fault state with code = {code}"
+        self.expect_ack(self.forwarder_consume_queue, m, code, report, self.wait_for_ack_timeouts)
 
     async def process_header_ready_ack(self, msg):
         """ Handle header_ready_ack message
         """
         ack_id = msg["ACK_ID"]
         LOGGER.info(f"largeFileObjectAvailable ack_id = {ack_id} received")
-        await self.clear_event(ack_id)
+        self.resolve_ack(ack_id, msg)
 
     #
     # Heartbeat
@@ -713,12 +982,12 @@ class MessageDirector(Director):
             await pub.start()
 
             while True:
-                ack_id = await self.get_next_ack_id()
+                ack_id = self.next_ack_id()
                 msg = {"MSG_TYPE": msg_type,
                        "ACK_ID": ack_id,
                        "SESSION_ID": self.get_session_id(),
                        "REPLY_QUEUE": self.forwarder_publish_queue}
-                LOGGER.debug(f"about to send {msg}")
+                LOGGER.debug("about to send %s", MessageSummary(msg))
                 await pub.publish_message(queue, msg)
 
                 code = 5751
@@ -0,0 +1,139 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import itertools
+import logging
+
+# keys shown when a message is summarized, in the order they are shown
+SUMMARY_KEYS = ('MSG_TYPE', 'ACK_ID', 'IMAGE_ID', 'OBSID', 'JOB_NUM', 'RAFT', 'SENSOR', 'FILENAME',
+                'STATUS_CODE')
+
+
+class MessageSummary:
+    """Compact key=value summary of a message, formatted only when the
+    logging record is actually emitted.
+
+    Pass this as a logging argument rather than formatting it in place, so
+    the cost is only paid if the level is enabled.
+
+    Parameters
+    ----------
+    msg : `dict`
+        message to summarize
+    fields : `dict`
+        additional key=value pairs to show before the message keys
+    """
+
+    __slots__ = ('msg', 'fields')
+
+    def __init__(self, msg, fields=None):
+        self.msg = msg
+        self.fields = fields
+
+    def __str__(self):
+        items = []
+        if self.fields:
+            items = [f"{k}={v}" for k, v in self.fields.items()]
+        msg = self.msg
+        if isinstance(msg, dict):
+            items.extend(f"{k}={msg[k]}" for k in SUMMARY_KEYS if k in msg)
+        elif msg is not None:
+            items.append(str(msg))
+        return " ".join(items)
+
+
+class MessageLogger:
+    """Level-gated, structured logging of messages
+
+    Messages are logged as compact key=value summaries.  Nothing is
+    formatted unless the logger is enabled for the level used. When
+    ``debug_sample`` is set, the full body of one in every ``debug_sample``
+    messages is also logged at DEBUG level.
+
+    Parameters
+    ----------
+    logger : `logging.Logger`
+        logger to write to
+    level : `int`
+        level summaries are logged at
+    debug_sample : `int`
+        log the full body of one message out of this many at DEBUG; 0 disables
+    """
+
+    def __init__(self, logger, level=logging.INFO, debug_sample=0):
+        self.logger = logger
+        self.level = level
+        self.debug_sample = debug_sample
+        self._count = itertools.count()
+
+    def log(self, event, msg, level=None, **fields):
+        """Log a summary of a message
+
+        Parameters
+        ----------
+        event : `str`
+            short description of what happened to the message
+        msg : `dict`
+            the message
+        level : `int`
+            level to log at; defaults to the level given at construction
+        fields : `dict`
+            additional key=value pairs to include in the summary
+        """
+        self._emit(event, msg, level, fields)
+
+    def _emit(self, event, msg, level, fields, stacklevel=3):
+        # stacklevel points the record's funcName and lineno at our caller's caller
+        if level is None:
+            level = self.level
+        logger = self.logger
+        if logger.isEnabledFor(level):
+            logger.log(level, "%s %s", event, MessageSummary(msg, fields), stacklevel=stacklevel)
+        if self.debug_sample and logger.isEnabledFor(logging.DEBUG):
+            if next(self._count) % self.debug_sample == 0:
+                logger.debug("%s body: %s", event, msg, stacklevel=stacklevel)
+
+    def received(self, msg, **fields):
+        """Log a summary of an incoming message
+
+        Parameters
+        ----------
+        msg : `dict`
+            the message
+        fields : `dict`
+            additional key=value pairs to include in the summary
+        """
+        self._emit("received", msg, None, fields)
+
+    def sent(self, queue, msg, **fields):
+        """Log a summary of an outgoing message
+
+        Parameters
+        ----------
+        queue : `str`
+            queue the message was sent to
+        msg : `dict`
+            the message
+        fields : `dict`
+            additional key=value pairs to include in the summary
+        """
+        self._emit("sent", msg, None, dict(queue=queue, **fields))
@@ -23,6 +23,7 @@ import asyncio
 import logging
 import pika
 from lsst.dm.csc.base.YamlHandler import YamlHandler
+from lsst.dm.csc.base.message_log import MessageSummary
 from pika.adapters.asyncio_connection import AsyncioConnection
 
 LOGGER = logging.getLogger(__name__)
@@ -115,19 +116,32 @@ class Publisher(object):
         if self._channel is not None:
             self._channel.close()
 
-    async def publish_message(self, route_key, msg):
+    async def publish_message(self, route_key, msg, headers=None):
+        """Publish a message
+
+        Parameters
+        ----------
+        route_key : `str`
+            RabbitMQ routing key to publish to
+        msg : `dict`
+            message contents
+        headers : `dict`
+            optional AMQP message headers, used to carry trace context
+        """
 
         encoded_data = self._message_handler.encode_message(msg)
 
-        self.logger_level("Sending msg to %s", route_key)
-
         # Since this is asynchronous, it's possible to still be in the
         # process of getting setup and having self._channel be None when
         # publish_message is being called from another thread, so we wait
         # here until setup is completed.
         await self.setup_complete_event.wait()
-        self._channel.basic_publish(exchange='message', routing_key=route_key, body=encoded_data)
-        self.logger_level(f'message sent message body is: {msg}')
+        properties = None
+        if headers is not None:
+            properties = pika.BasicProperties(headers=headers)
+        self._channel.basic_publish(exchange='message', routing_key=route_key, body=encoded_data,
+                                    properties=properties)
+        self.logger_level("message sent to %s: %s", route_key, MessageSummary(msg))
 
     async def stop(self):
         self._stopping = True
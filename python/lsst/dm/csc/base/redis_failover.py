@@ -0,0 +1,524 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+from collections import deque
+import logging
+import time
+import redis
+import redis.asyncio.sentinel
+import redis.sentinel
+from lsst.dm.csc.base.retry import RetryPolicy
+
+LOGGER = logging.getLogger(__name__)
+
+# errors which mean the server is gone, or is no longer the one to write to
+FAILOVER_ERRORS = (redis.ConnectionError, redis.TimeoutError, redis.ReadOnlyError)
+
+# commands which leave the same state however many times they are applied,
+# so they can be sent again when the reply to them was lost.  Others, such
+# as LPUSH, RPOP, ZREM and scripts, may already have been applied, so their
+# errors go to the caller.
+IDEMPOTENT = frozenset([
+    "ping", "info", "config_get", "exists", "type", "ttl", "pttl", "keys", "scan",
+    "get", "mget", "hget", "hmget", "hgetall", "hkeys", "hvals", "hexists", "hlen",
+    "lrange", "llen", "lindex", "smembers", "sismember", "scard",
+    "zrange", "zrangebyscore", "zscore", "zcard", "zrank",
+    "set", "mset", "hset", "hmset", "expire", "pexpire",
+])
+
+
+def parse_endpoint(endpoint):
+    """Get the host and port of an endpoint
+
+    Parameters
+    ----------
+    endpoint : `str` or `list`
+        "host:port", "host", or [host, port]
+
+    Returns
+    -------
+    A tuple of the host and port
+    """
+    if isinstance(endpoint, str):
+        host, _, port = endpoint.partition(":")
+        return host, int(port) if port else 6379
+    host, port = endpoint
+    return host, int(port)
+
+
+class Failover:
+    """Where to find a Redis server again when the one in use goes away,
+    how often to retry a command, and counters of what happened.  Other
+    servers are either a fixed list of endpoints, which are tried in turn,
+    or the master of a Sentinel service.  Clients made with this share the
+    counters.
+
+    The configuration is a dict with either ENDPOINTS, a list of
+    "host:port", or SENTINELS, a list of "host:port" of Sentinels, and
+    SERVICE, the name of the master they monitor; and optionally RETRY, a
+    dict with COUNT, BACKOFF, MULTIPLIER and MAX_BACKOFF, for example::
+
+        REDIS_FAILOVER:
+          ENDPOINTS: ["redis1:6379", "redis2:6379"]
+          RETRY: {COUNT: 5, BACKOFF: 0.1, MAX_BACKOFF: 2}
+
+    Parameters
+    ----------
+    endpoints : `list`
+        (host, port) of the servers to fail over to
+    sentinels : `list`
+        (host, port) of the Sentinels to ask for the master
+    service : `str`
+        name of the master monitored by the Sentinels
+    retry : `lsst.dm.csc.base.retry.RetryPolicy`
+        how many times a command is retried after a connection error, and
+        the backoff before each retry
+    socket_timeout : `float`
+        seconds to wait for a Sentinel's reply
+    """
+
+    def __init__(self, endpoints=None, sentinels=None, service=None, retry=None, socket_timeout=1.0):
+        if sentinels and not service:
+            raise ValueError("a Sentinel service name is needed with SENTINELS")
+        self.endpoints = list(endpoints or [])
+        self.sentinels = list(sentinels or [])
+        self.service = service
+        self.retry = RetryPolicy(3, 0.1, 2.0, 2.0) if retry is None else retry
+        self.socket_timeout = socket_timeout
+
+        self.errors = 0
+        self.retries = 0
+        self.failovers = 0
+        # (time, from, to) of recent failovers
+        self.history = deque(maxlen=32)
+
+        self._sentinel = None
+        self._async_sentinels = {}
+
+    @classmethod
+    def from_config(cls, config):
+        """Create a failover from its configuration
+
+        Parameters
+        ----------
+        config : `dict`
+            the configuration; see the class
+
+        Returns
+        -------
+        The failover, or None if config is None
+        """
+        if config is None:
+            return None
+        c = config.get("RETRY", {})
+        retry = RetryPolicy(c.get("COUNT", 3), c.get("BACKOFF", 0.1), c.get("MULTIPLIER", 2.0),
+                            c.get("MAX_BACKOFF", 2.0))
+        return cls(endpoints=[parse_endpoint(e) for e in config.get("ENDPOINTS", [])],
+                   sentinels=[parse_endpoint(e) for e in config.get("SENTINELS", [])],
+                   service=config.get("SERVICE"), retry=retry,
+                   socket_timeout=config.get("SOCKET_TIMEOUT", 1.0))
+
+    def candidates(self, current):
+        """Get the endpoints to try after the current one failed, in order
+
+        Parameters
+        ----------
+        current : `tuple`
+            (host, port) of the server in use
+
+        Returns
+        -------
+        A list of (host, port): the next endpoints in the list, wrapping
+        around, with the current one last
+        """
+        endpoints = [e for e in self.endpoints if e != current]
+        if current in self.endpoints:
+            i = self.endpoints.index(current)
+            endpoints = self.endpoints[i + 1:] + self.endpoints[:i]
+        return endpoints + [current]
+
+    def discover(self):
+        """Ask the Sentinels for the master
+
+        Returns
+        -------
+        (host, port) of the master
+
+        Raises
+        ------
+        redis.sentinel.MasterNotFoundError
+            if no Sentinel knows it
+        """
+        if self._sentinel is None:
+            self._sentinel = redis.sentinel.Sentinel(self.sentinels, socket_timeout=self.socket_timeout)
+        return self._sentinel.discover_master(self.service)
+
+    async def async_discover(self):
+        """Ask the Sentinels for the master, without blocking the event loop;
+        see `discover`
+        """
+        loop = asyncio.get_running_loop()
+        sentinel = self._async_sentinels.get(loop)
+        if sentinel is None:
+            sentinel = redis.asyncio.sentinel.Sentinel(self.sentinels, socket_timeout=self.socket_timeout)
+            self._async_sentinels = {loop: sentinel}
+        return await sentinel.discover_master(self.service)
+
+    def failed_over(self, old, new):
+        """Count a move to another server
+        """
+        self.failovers += 1
+        self.history.append((time.time(), old, new))
+        LOGGER.warning(f"redis failed over from {old[0]}:{old[1]} to {new[0]}:{new[1]}")
+
+    def snapshot(self):
+        """Get the counters
+
+        Returns
+        -------
+        A dict with the numbers of connection errors, retries and
+        failovers, and the recent failovers as dicts of time, from and to
+        """
+        history = [{"time": when, "from": f"{old[0]}:{old[1]}", "to": f"{new[0]}:{new[1]}"}
+                   for when, old, new in self.history]
+        return {"errors": self.errors, "retries": self.retries, "failovers": self.failovers,
+                "history": history}
+
+
+class FailoverRedis:
+    """Client which sends each command to the current server of a
+    `Failover`, with the interface of the client it wraps.  When a command
+    fails because the server went away, it waits out the retry backoff,
+    finds the server to use, and sends the command again.  A command whose
+    reply was lost may be applied twice, so only those in `IDEMPOTENT`, and
+    pipelines made of them, are sent again; the errors of others are raised
+    once the server to use for the next command has been found.  On an
+    event loop thread, the backoff isn't waited out, so the loop doesn't
+    stall.
+
+    Parameters
+    ----------
+    failover : `Failover`
+        where to find other servers, and how to retry
+    host : `str`
+        host name of the server to start with
+    port : `int`
+        network port number of the server to start with
+    connect : `callable`
+        makes the client of a server, given its host and port
+    """
+
+    def __init__(self, failover, host, port, connect):
+        self.failover = failover
+        self.endpoint = (host, port)
+        self._connect = connect
+        self._clients = {}
+        self.conn = self._client(self.endpoint)
+
+    def _client(self, endpoint):
+        client = self._clients.get(endpoint)
+        if client is None:
+            client = self._connect(*endpoint)
+            self._clients[endpoint] = client
+        return client
+
+    def _switch(self, endpoint):
+        if endpoint != self.endpoint:
+            self.failover.failed_over(self.endpoint, endpoint)
+            self.endpoint = endpoint
+            self.conn = self._client(endpoint)
+
+    def resolve(self):
+        """Find the server to use: the Sentinels' master, or the first
+        endpoint after the current one which answers a ping
+
+        Returns
+        -------
+        True if a server was found
+        """
+        try:
+            if self.failover.sentinels:
+                self._switch(tuple(self.failover.discover()))
+                return True
+            for endpoint in self.failover.candidates(self.endpoint):
+                try:
+                    self._client(endpoint).ping()
+                except FAILOVER_ERRORS:
+                    continue
+                self._switch(endpoint)
+                return True
+        except FAILOVER_ERRORS as e:
+            LOGGER.warning(f"can't find a redis server: {e}")
+        return False
+
+    def run(self, call, retry=True):
+        """Call a function with the current client, retrying on another
+        server if this one went away
+
+        Parameters
+        ----------
+        call : `callable`
+            called with the client
+        retry : `bool`
+            if False, the call may have been applied when it fails, so it
+            isn't made again
+
+        Returns
+        -------
+        What the function returned
+        """
+        attempt = 0
+        while True:
+            try:
+                return call(self.conn)
+            except FAILOVER_ERRORS as e:
+                self.failover.errors += 1
+                attempt += 1
+                if not retry:
+                    LOGGER.warning(f"redis error on {self.endpoint[0]}:{self.endpoint[1]}: {e}; "
+                                   "not retried")
+                    self.resolve()
+                    raise
+                if attempt > self.failover.retry.count:
+                    raise
+                LOGGER.warning(f"redis error on {self.endpoint[0]}:{self.endpoint[1]}: {e}; "
+                               f"retry {attempt} of {self.failover.retry.count}")
+                self.failover.retries += 1
+                self._backoff(attempt)
+                self.resolve()
+
+    def _backoff(self, attempt):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            time.sleep(self.failover.retry.delay(attempt))
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name == "conn":
+            raise AttributeError(name)
+        attr = getattr(self.conn, name)
+        if not callable(attr):
+            return attr
+
+        def command(*args, **kwargs):
+            return self.run(lambda conn: getattr(conn, name)(*args, **kwargs), name in IDEMPOTENT)
+        return command
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return FailoverPipeline(self, transaction)
+
+    def pubsub(self, **kwargs):
+        # subscriptions stay on the server they were made on; their readers
+        # see the error when it goes away
+        return self.conn.pubsub(**kwargs)
+
+    def register_script(self, script):
+        return FailoverScript(self, script)
+
+    def close(self):
+        for client in self._clients.values():
+            client.close()
+
+
+class FailoverPipeline:
+    """Commands queued for a `FailoverRedis`, sent in one pipeline to the
+    server in use when `execute` is called, and sent again to the next
+    server if that one went away and all of them are in `IDEMPOTENT`
+
+    Parameters
+    ----------
+    client : `FailoverRedis`
+        the client
+    transaction : `bool`
+        if True, the commands are applied atomically with MULTI/EXEC
+    """
+
+    def __init__(self, client, transaction=True):
+        self.client = client
+        self.transaction = transaction
+        self.command_stack = []
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def queue(*args, **kwargs):
+            self.command_stack.append((name, args, kwargs))
+            return self
+        return queue
+
+    def __len__(self):
+        return len(self.command_stack)
+
+    def _idempotent(self):
+        return all(name in IDEMPOTENT for name, args, kwargs in self.command_stack)
+
+    def _send(self, conn, raise_on_error):
+        pipeline = conn.pipeline(transaction=self.transaction)
+        for name, args, kwargs in self.command_stack:
+            getattr(pipeline, name)(*args, **kwargs)
+        return pipeline.execute(raise_on_error)
+
+    def execute(self, raise_on_error=True):
+        try:
+            return self.client.run(lambda conn: self._send(conn, raise_on_error), self._idempotent())
+        finally:
+            self.command_stack = []
+
+    def reset(self):
+        self.command_stack = []
+
+
+class FailoverScript:
+    """Script registered with a `FailoverRedis`, which is registered again
+    with each server it runs on.  A script may have been applied when it
+    fails, so it isn't sent again.
+
+    Parameters
+    ----------
+    client : `FailoverRedis`
+        the client
+    script : `str`
+        the Lua script
+    """
+
+    def __init__(self, client, script):
+        self.client = client
+        self.script = script
+        self._scripts = {}
+
+    def _for(self, conn):
+        script = self._scripts.get(id(conn))
+        if script is None:
+            script = conn.register_script(self.script)
+            self._scripts[id(conn)] = script
+        return script
+
+    def __call__(self, keys=None, args=None):
+        return self.client.run(lambda conn: self._for(conn)(keys=keys, args=args), False)
+
+
+class AsyncFailoverRedis(FailoverRedis):
+    """asyncio version of `FailoverRedis`, whose commands are coroutines
+    """
+
+    async def resolve(self):
+        """Find the server to use; see `FailoverRedis.resolve`
+        """
+        try:
+            if self.failover.sentinels:
+                self._switch(tuple(await self.failover.async_discover()))
+                return True
+            for endpoint in self.failover.candidates(self.endpoint):
+                try:
+                    await self._client(endpoint).ping()
+                except FAILOVER_ERRORS:
+                    continue
+                self._switch(endpoint)
+                return True
+        except FAILOVER_ERRORS as e:
+            LOGGER.warning(f"can't find a redis server: {e}")
+        return False
+
+    async def run(self, call, retry=True):
+        """Await a function of the current client, retrying on another
+        server if this one went away; see `FailoverRedis.run`
+        """
+        attempt = 0
+        while True:
+            try:
+                return await call(self.conn)
+            except FAILOVER_ERRORS as e:
+                self.failover.errors += 1
+                attempt += 1
+                if not retry:
+                    LOGGER.warning(f"redis error on {self.endpoint[0]}:{self.endpoint[1]}: {e}; "
+                                   "not retried")
+                    await self.resolve()
+                    raise
+                if attempt > self.failover.retry.count:
+                    raise
+                LOGGER.warning(f"redis error on {self.endpoint[0]}:{self.endpoint[1]}: {e}; "
+                               f"retry {attempt} of {self.failover.retry.count}")
+                self.failover.retries += 1
+                await asyncio.sleep(self.failover.retry.delay(attempt))
+                await self.resolve()
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name == "conn":
+            raise AttributeError(name)
+        attr = getattr(self.conn, name)
+        if not callable(attr):
+            return attr
+
+        async def command(*args, **kwargs):
+            return await self.run(lambda conn: getattr(conn, name)(*args, **kwargs), name in IDEMPOTENT)
+        return command
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return AsyncFailoverPipeline(self, transaction)
+
+    def register_script(self, script):
+        return AsyncFailoverScript(self, script)
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.aclose()
+
+    aclose = close
+
+
+class AsyncFailoverPipeline(FailoverPipeline):
+    """asyncio version of `FailoverPipeline`
+    """
+
+    def __await__(self):
+        return self._itself().__await__()
+
+    async def _itself(self):
+        return self
+
+    async def _send(self, conn, raise_on_error):
+        pipeline = conn.pipeline(transaction=self.transaction)
+        for name, args, kwargs in self.command_stack:
+            # queueing returns the pipeline, which may need awaiting
+            await getattr(pipeline, name)(*args, **kwargs)
+        return await pipeline.execute(raise_on_error)
+
+    async def execute(self, raise_on_error=True):
+        try:
+            return await self.client.run(lambda conn: self._send(conn, raise_on_error),
+                                         self._idempotent())
+        finally:
+            self.command_stack = []
+
+    async def reset(self):
+        self.command_stack = []
+
+
+class AsyncFailoverScript(FailoverScript):
+    """asyncio version of `FailoverScript`
+    """
+
+    async def __call__(self, keys=None, args=None):
+        return await self.client.run(lambda conn: self._for(conn)(keys=keys, args=args), False)
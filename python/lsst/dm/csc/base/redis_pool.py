@@ -0,0 +1,158 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import logging
+import weakref
+import redis
+import redis.asyncio
+
+LOGGER = logging.getLogger(__name__)
+
+# settings for pools created from now on; see configure_pools
+_settings = {"max_connections": None, "health_check_interval": 30, "socket_keepalive": True}
+
+# synchronous pools by (host, port, db)
+_pools = {}
+
+# asyncio pools by event loop, then (host, port, db); their connections
+# belong to the loop they were made on
+_async_pools = weakref.WeakKeyDictionary()
+
+# pools whose server has answered a ping
+_verified = weakref.WeakSet()
+
+
+def configure_pools(max_connections=None, health_check_interval=30, socket_keepalive=True):
+    """Set up the Redis connection pools created from now on
+
+    Parameters
+    ----------
+    max_connections : `int`
+        most connections in each pool; None is unlimited
+    health_check_interval : `int`
+        seconds a connection can be idle before it is pinged on its next use
+    socket_keepalive : `bool`
+        if True, TCP keepalive is turned on for each connection
+    """
+    _settings["max_connections"] = max_connections
+    _settings["health_check_interval"] = health_check_interval
+    _settings["socket_keepalive"] = socket_keepalive
+
+
+def _pool_kwargs(host, port, db):
+    return {"host": host, "port": port, "db": db, "encoding": "utf-8", "decode_responses": True,
+            "max_connections": _settings["max_connections"],
+            "health_check_interval": _settings["health_check_interval"],
+            "socket_keepalive": _settings["socket_keepalive"]}
+
+
+def get_pool(host, port, db):
+    """Get the synchronous connection pool shared by everything in this process
+    which talks to a Redis database
+
+    Parameters
+    ----------
+    host : `str`
+        host name of Redis instance
+    port : `int`
+        network port number of Redis instance
+    db : `int`
+        redis database number
+
+    Returns
+    -------
+    pool : `redis.ConnectionPool`
+    """
+    key = (host, port, db)
+    pool = _pools.get(key)
+    if pool is None:
+        LOGGER.info(f"creating redis connection pool for {host}:{port} db {db}")
+        pool = redis.ConnectionPool(**_pool_kwargs(host, port, db))
+        _pools[key] = pool
+    return pool
+
+
+def get_async_pool(host, port, db):
+    """Get the asyncio connection pool shared by everything on the running
+    event loop which talks to a Redis database
+
+    Parameters
+    ----------
+    host : `str`
+        host name of Redis instance
+    port : `int`
+        network port number of Redis instance
+    db : `int`
+        redis database number
+
+    Returns
+    -------
+    pool : `redis.asyncio.ConnectionPool`
+    """
+    pools = _async_pools.setdefault(asyncio.get_running_loop(), {})
+    key = (host, port, db)
+    pool = pools.get(key)
+    if pool is None:
+        LOGGER.info(f"creating asyncio redis connection pool for {host}:{port} db {db}")
+        pool = redis.asyncio.ConnectionPool(**_pool_kwargs(host, port, db))
+        pools[key] = pool
+    return pool
+
+
+def ping_once(conn):
+    """Ping the server of a client's pool, unless it has been pinged already
+
+    Parameters
+    ----------
+    conn : `redis.StrictRedis`
+        client using a pool from `get_pool`
+    """
+    pool = conn.connection_pool
+    if pool not in _verified:
+        conn.ping()
+        _verified.add(pool)
+
+
+async def async_ping_once(conn):
+    """Ping the server of a client's pool, unless it has been pinged already
+
+    Parameters
+    ----------
+    conn : `redis.asyncio.StrictRedis`
+        client using a pool from `get_async_pool`
+    """
+    pool = conn.connection_pool
+    if pool not in _verified:
+        await conn.ping()
+        _verified.add(pool)
+
+
+def reset_pools():
+    """Disconnect and forget the synchronous pools, and forget the asyncio
+    ones, so the next clients start afresh
+    """
+    for pool in _pools.values():
+        pool.disconnect()
+    _pools.clear()
+    _async_pools.clear()
+    _verified.clear()
@@ -0,0 +1,298 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from collections import deque
+import logging
+import time
+import redis
+import redis.asyncio
+import redis.asyncio.client
+import redis.client
+
+LOGGER = logging.getLogger(__name__)
+
+# upper bounds of the histogram buckets in seconds: powers of two from 1us to
+# about 16s; slower commands go in one more bucket
+BUCKET_BOUNDS = tuple(2 ** i / 1e6 for i in range(25))
+
+# commands which wait on purpose for data to arrive, so taking long isn't
+# a sign of a slow server; they are kept out of the slow log
+BLOCKING_COMMANDS = frozenset(["BLPOP", "BRPOP", "BRPOPLPUSH", "BLMOVE", "BZPOPMIN", "BZPOPMAX"])
+
+
+class CommandHistogram:
+    """Histogram of the latencies of one Redis command, in buckets whose
+    bounds double, so a sample costs a few comparisons and no allocation
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        """Add a sample
+
+        Parameters
+        ----------
+        seconds : `float`
+            latency of the command
+        """
+        index = 0
+        for bound in BUCKET_BOUNDS:
+            if seconds <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Estimate a percentile from the buckets
+
+        Parameters
+        ----------
+        q : `float`
+            percentile, between 0 and 100
+
+        Returns
+        -------
+        The upper bound of the bucket holding the percentile, capped at the
+        largest sample, or None if there are no samples
+        """
+        if self.count == 0:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                break
+        if index < len(BUCKET_BOUNDS):
+            return min(BUCKET_BOUNDS[index], self.max)
+        return self.max
+
+
+class CommandTimings:
+    """Latency histograms of Redis commands, by command name, and a ring
+    buffer of the commands slower than a threshold.  Blocking commands such
+    as BRPOP have their own histograms, but aren't put in the slow log,
+    since they wait on purpose.
+
+    Parameters
+    ----------
+    slow_threshold : `float`
+        seconds a command must take to be put in the slow log
+    slow_log_size : `int`
+        number of slow commands kept
+    """
+
+    def __init__(self, slow_threshold=0.01, slow_log_size=128):
+        self.slow_threshold = slow_threshold
+        self.histograms = {}
+        self.slow_log = deque(maxlen=slow_log_size)
+
+    def configure(self, slow_threshold=0.01, slow_log_size=128):
+        """Change the slow log settings; the slow log is emptied if its size
+        changes
+
+        Parameters
+        ----------
+        slow_threshold : `float`
+            seconds a command must take to be put in the slow log
+        slow_log_size : `int`
+            number of slow commands kept
+        """
+        self.slow_threshold = slow_threshold
+        if slow_log_size != self.slow_log.maxlen:
+            self.slow_log = deque(maxlen=slow_log_size)
+
+    def record(self, command, key, seconds):
+        """Record a command's latency
+
+        Parameters
+        ----------
+        command : `str`
+            command name, such as HSET, or PIPELINE for a batch
+        key : `str`
+            key the command was on, or a description of a batch
+        seconds : `float`
+            time from sending the command to reading its reply
+        """
+        histogram = self.histograms.get(command)
+        if histogram is None:
+            histogram = CommandHistogram()
+            self.histograms[command] = histogram
+        histogram.add(seconds)
+        if seconds >= self.slow_threshold and command not in BLOCKING_COMMANDS:
+            LOGGER.debug(f"slow redis command {command} {key}: {seconds * 1000:.1f} ms")
+            self.slow_log.append((time.time(), command, key, seconds))
+
+    def snapshot(self):
+        """Get the timings so far
+
+        Returns
+        -------
+        A dict with "commands", a dict by command name of dicts with the
+        count, mean, p50, p99, max, and bucket counts keyed by their upper
+        bound in seconds (None for the overflow bucket); and "slow", a list
+        of dicts with the wall clock time, command, key and seconds of the
+        slow commands, oldest first
+        """
+        commands = {}
+        bounds = BUCKET_BOUNDS + (None,)
+        for command, histogram in self.histograms.items():
+            commands[command] = {"count": histogram.count,
+                                 "mean": histogram.total / histogram.count,
+                                 "p50": histogram.percentile(50),
+                                 "p99": histogram.percentile(99),
+                                 "max": histogram.max,
+                                 "buckets": {bound: count for bound, count in zip(bounds, histogram.counts)
+                                             if count}}
+        slow = [{"time": when, "command": command, "key": key, "seconds": seconds}
+                for when, command, key, seconds in self.slow_log]
+        return {"commands": commands, "slow": slow}
+
+    def reset(self):
+        """Forget all timings
+        """
+        self.histograms.clear()
+        self.slow_log.clear()
+
+
+# timings shared by every scoreboard in this process
+_timings = CommandTimings()
+
+
+def configure_timings(slow_threshold=0.01, slow_log_size=128):
+    """Set up the slow log of the shared timings
+
+    Parameters
+    ----------
+    slow_threshold : `float`
+        seconds a command must take to be put in the slow log
+    slow_log_size : `int`
+        number of slow commands kept
+    """
+    _timings.configure(slow_threshold, slow_log_size)
+
+
+def get_timings():
+    """Get the timings shared by every scoreboard in this process
+
+    Returns
+    -------
+    timings : `CommandTimings`
+    """
+    return _timings
+
+
+def _describe(args):
+    return str(args[0]).upper(), (str(args[1]) if len(args) > 1 else None)
+
+
+def _describe_pipeline(pipeline):
+    return "PIPELINE", f"{len(pipeline)} commands"
+
+
+class TimedRedis(redis.StrictRedis):
+    """`redis.StrictRedis` which records the latency of each command, and of
+    each pipeline as a whole
+
+    Parameters
+    ----------
+    timings : `CommandTimings`
+        where latencies are recorded; the shared timings if None
+
+    Other parameters are those of `redis.StrictRedis`.
+    """
+
+    def __init__(self, *args, timings=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = timings if timings is not None else _timings
+
+    def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            self.timings.record(*_describe(args), time.perf_counter() - start)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipeline = TimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+        pipeline.timings = self.timings
+        return pipeline
+
+
+class TimedPipeline(redis.client.Pipeline):
+    """Pipeline made by `TimedRedis`, which records the latency of sending it
+    """
+
+    timings = _timings
+
+    def execute(self, raise_on_error=True):
+        command, key = _describe_pipeline(self)
+        start = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            self.timings.record(command, key, time.perf_counter() - start)
+
+
+class AsyncTimedRedis(redis.asyncio.StrictRedis):
+    """asyncio version of `TimedRedis`
+    """
+
+    def __init__(self, *args, timings=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = timings if timings is not None else _timings
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            self.timings.record(*_describe(args), time.perf_counter() - start)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipeline = AsyncTimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+        pipeline.timings = self.timings
+        return pipeline
+
+
+class AsyncTimedPipeline(redis.asyncio.client.Pipeline):
+    """Pipeline made by `AsyncTimedRedis`, which records the latency of
+    sending it
+    """
+
+    timings = _timings
+
+    async def execute(self, raise_on_error=True):
+        command, key = _describe_pipeline(self)
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            self.timings.record(command, key, time.perf_counter() - start)
@@ -0,0 +1,168 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+class RetryPolicy:
+    """How often, and how soon, to resend a message whose ack didn't arrive
+
+    Parameters
+    ----------
+    count : `int`
+        number of times the message is resent before giving up
+    backoff : `float`
+        seconds to wait before the first resend
+    multiplier : `float`
+        factor the wait grows by for each further resend
+    max_backoff : `float`
+        longest wait between resends, in seconds
+    """
+
+    def __init__(self, count=0, backoff=0.0, multiplier=2.0, max_backoff=None):
+        self.count = count
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.max_backoff = max_backoff
+
+    def delay(self, attempt):
+        """Get the wait before a resend
+
+        Parameters
+        ----------
+        attempt : `int`
+            the resend about to be made, starting at 1
+
+        Returns
+        -------
+        The wait in seconds
+        """
+        delay = self.backoff * self.multiplier ** (attempt - 1)
+        if self.max_backoff is not None:
+            delay = min(delay, self.max_backoff)
+        return delay
+
+
+class RetryPolicies:
+    """Retry policies by message type, with counters of what they did
+
+    The configuration is a dict keyed by MSG_TYPE, plus an optional
+    DEFAULT entry, of dicts with COUNT, BACKOFF, MULTIPLIER and
+    MAX_BACKOFF keys, for example::
+
+        ACK_RETRY:
+          DEFAULT: {COUNT: 0}
+          AT_FWDR_END_READOUT: {COUNT: 2, BACKOFF: 0.5}
+
+    Parameters
+    ----------
+    config : `dict`
+        retry configuration; None disables retries
+    """
+
+    def __init__(self, config=None):
+        self._policies = {}
+        self._default = RetryPolicy()
+        if config is not None:
+            for msg_type, c in config.items():
+                policy = RetryPolicy(c.get('COUNT', 0), c.get('BACKOFF', 0.0), c.get('MULTIPLIER', 2.0),
+                                     c.get('MAX_BACKOFF'))
+                if msg_type == 'DEFAULT':
+                    self._default = policy
+                else:
+                    self._policies[msg_type] = policy
+
+        # ack ids which have been resent, and their message type
+        self._retried = {}
+        self._stats = {}
+
+    def get(self, msg_type):
+        """Get the policy for a message type
+
+        Parameters
+        ----------
+        msg_type : `str`
+            the MSG_TYPE
+
+        Returns
+        -------
+        policy : `RetryPolicy`
+        """
+        return self._policies.get(msg_type, self._default)
+
+    def _counters(self, msg_type):
+        counters = self._stats.get(msg_type)
+        if counters is None:
+            counters = {"retries": 0, "recovered": 0, "exhausted": 0}
+            self._stats[msg_type] = counters
+        return counters
+
+    def retried(self, msg_type, ack_id):
+        """Count a resend
+
+        Parameters
+        ----------
+        msg_type : `str`
+            the MSG_TYPE of the message resent
+        ack_id : `str`
+            its ACK_ID
+        """
+        self._retried[ack_id] = msg_type
+        self._counters(msg_type)["retries"] += 1
+
+    def resolved(self, ack_id):
+        """Count an ack, if its message had been resent
+
+        Parameters
+        ----------
+        ack_id : `str`
+            ACK_ID which was acked
+
+        Returns
+        -------
+        True if the message had been resent
+        """
+        msg_type = self._retried.pop(ack_id, None)
+        if msg_type is None:
+            return False
+        self._counters(msg_type)["recovered"] += 1
+        return True
+
+    def exhausted(self, msg_type, ack_id):
+        """Count a message which is given up on
+
+        Parameters
+        ----------
+        msg_type : `str`
+            the MSG_TYPE of the message
+        ack_id : `str`
+            its ACK_ID
+        """
+        self._retried.pop(ack_id, None)
+        self._counters(msg_type)["exhausted"] += 1
+
+    def stats(self):
+        """Get the retry counters
+
+        Returns
+        -------
+        A dict keyed by MSG_TYPE of dicts with the number of resends, messages
+        acked after a resend, and messages given up on
+        """
+        return {msg_type: dict(counters) for msg_type, counters in self._stats.items()}
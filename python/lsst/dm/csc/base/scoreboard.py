@@ -19,8 +19,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import contextlib
 import logging
 import redis
+from lsst.dm.csc.base.redis_failover import FailoverRedis
+from lsst.dm.csc.base.redis_pool import get_pool, ping_once
+from lsst.dm.csc.base.redis_timing import TimedRedis
+from lsst.dm.csc.base.scoreboard_cache import ReadCache, keyspace_channel, notifications_enabled
 
 LOGGER = logging.getLogger(__name__)
 
@@ -28,7 +33,10 @@ LOGGER = logging.getLogger(__name__)
 class Scoreboard:
     """Scoreboard is the interface to the Redis key/value database. It
     is meant to store information about the running status of services used
-    by the archiver system
+    by the archiver system.  Scoreboards for the same Redis database share
+    one connection pool, and only the first of them pings the server.  The
+    latency of each command is recorded in the shared
+    `lsst.dm.csc.base.redis_timing.CommandTimings`.
 
     Parameters
     ----------
@@ -40,17 +48,158 @@ class Scoreboard:
         host name of Redis instance
     port : `int`
         network port number of Redis instance
+    cache_ttl : `float`
+        seconds reads of the device's fields are cached for; 0 disables caching
+    failover : `lsst.dm.csc.base.redis_failover.Failover`
+        where to find another Redis server if this one goes away; commands
+        which fail because it went away are retried there
     """
 
-    def __init__(self, device, db, host, port=6379):
+    def __init__(self, device, db, host, port=6379, cache_ttl=0, failover=None):
         LOGGER.info(f"Connecting {device} to redis database {db} at host {host}:{port}")
         self.device = device
-        self.conn = redis.StrictRedis(host, port, charset='utf-8', db=db, decode_responses=True)
-        self.conn.ping()
+        self.db = db
+        self.failover = failover
+        if failover is None:
+            self.conn = TimedRedis(connection_pool=get_pool(host, port, db))
+        else:
+            self.conn = FailoverRedis(failover, host, port,
+                                      lambda h, p: TimedRedis(connection_pool=get_pool(h, p, db)))
+        ping_once(self.conn)
+
+        # cached device fields; writes through this board invalidate them, and
+        # watch_invalidations() also invalidates them when others write
+        self.cache = ReadCache(cache_ttl)
+        self._invalidator = None
 
         self.STATE = "state"
         self.SESSION = "session"
 
+        # the pipeline commands are queued on while in batch()
+        self._pipeline = None
+
+    def watch_invalidations(self):
+        """Drop cached fields when the device's hash is changed by anyone,
+        using Redis keyspace notifications.  They must be enabled on the
+        server (notify-keyspace-events with K and A, or K, h and g);
+        otherwise cached fields are only dropped when their ttl runs out or
+        this board writes them.
+
+        Returns
+        -------
+        True if notifications are being watched
+        """
+        if not self.cache.enabled or self._invalidator is not None:
+            return self._invalidator is not None
+        try:
+            if not notifications_enabled(self.conn.config_get("notify-keyspace-events")):
+                LOGGER.warning("keyspace notifications are off; scoreboard cache relies on its ttl")
+                return False
+            pubsub = self.conn.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{keyspace_channel(self.db, self.device): self._invalidate})
+        except redis.RedisError as e:
+            LOGGER.warning(f"can't watch keyspace notifications: {e}; scoreboard cache relies on its ttl")
+            return False
+        self._invalidator = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        return True
+
+    def _invalidate(self, message):
+        self.cache.invalidate(self.device)
+
+    def cache_stats(self):
+        """Get the read cache counters
+
+        Returns
+        -------
+        A dict with hits, misses, invalidations, the hit rate, and the number
+        of cached fields
+        """
+        return self.cache.stats()
+
+    def command_stats(self):
+        """Get the latencies of the Redis commands sent by scoreboards in this
+        process
+
+        Returns
+        -------
+        A dict of histograms by command, and the slow command log; see
+        `lsst.dm.csc.base.redis_timing.CommandTimings.snapshot`
+        """
+        return self.conn.timings.snapshot()
+
+    def failover_stats(self):
+        """Get the failover counters
+
+        Returns
+        -------
+        A dict of counters, see
+        `lsst.dm.csc.base.redis_failover.Failover.snapshot`, or None without
+        a failover
+        """
+        return None if self.failover is None else self.failover.snapshot()
+
+    def _hget(self, field, decode=None):
+        if self._pipeline is not None:
+            # a read in a batch is queued, and its raw reply is in the
+            # batch's results, so it isn't looked up, decoded or cached
+            return self.conn.hget(self.device, field)
+        hit, value = self.cache.get(self.device, field)
+        if hit:
+            return value
+        generation = self.cache.generation(self.device)
+        value = self.conn.hget(self.device, field)
+        if decode is not None:
+            value = decode(value)
+        self.cache.put(self.device, field, value, generation)
+        return value
+
+    def close(self):
+        """Stop watching for invalidations and release this board's connection;
+        the shared pool stays open
+        """
+        if self._invalidator is not None:
+            self._invalidator.stop()
+            self._invalidator = None
+        self.conn.close()
+
+    @contextlib.contextmanager
+    def batch(self, transaction=True):
+        """Queue the writes made in the block and send them in one round trip
+        when it exits, for example::
+
+            with board.batch():
+                board.set_state("ENABLE")
+                board.set_session(session_id)
+
+        Reads made in the block are queued with the writes, so their return
+        values aren't the replies; the raw replies are in the results, in
+        order.  If the block raises, nothing is written.  A batch inside
+        another batch joins it.
+
+        Parameters
+        ----------
+        transaction : `bool`
+            if True, the writes are applied atomically with MULTI/EXEC
+
+        Returns
+        -------
+        The results of the queued commands, in a list filled in when the
+        batch is sent
+        """
+        if self._pipeline is not None:
+            yield []
+            return
+        conn = self.conn
+        results = []
+        self._pipeline = self.conn = conn.pipeline(transaction=transaction)
+        try:
+            yield results
+            results.extend(self._pipeline.execute())
+        finally:
+            self._pipeline.reset()
+            self._pipeline = None
+            self.conn = conn
+
     def get_state(self):
         """Get the device state
 
@@ -58,23 +207,46 @@ class Scoreboard:
         -------
         The device state
         """
-        return self.conn.hget(self.device, self.STATE)
+        return self._hget(self.STATE)
 
     def set_state(self, state):
         """Set the device state
         """
+        self.cache.invalidate(self.device)
         self.conn.hset(self.device, self.STATE, state)
 
     def get_session(self):
         """Get the session identifier
         """
-        return self.conn.hget(self.device, self.SESSION)
+        return self._hget(self.SESSION)
 
     def set_session(self, session):
         """Set the session identifier
+        """
+        self.cache.invalidate(self.device)
+        self.conn.hset(self.device, self.SESSION, session)
+
+    def set_fields(self, mapping):
+        """Set several fields of the device with one HSET
+
+        Parameters
+        ----------
+        mapping : `dict`
+            values by field name
+        """
+        self.cache.invalidate(self.device)
+        self.conn.hset(self.device, mapping=mapping)
+
+    def get_fields(self, *fields):
+        """Get several fields of the device with one HMGET
+
+        Parameters
+        ----------
+        *fields : `str`
+            field names
 
         Returns
         -------
-        The session identifier
+        A dict of values by field name; fields which aren't set are None
         """
-        self.conn.hset(self.device, self.SESSION, session)
+        return dict(zip(fields, self.conn.hmget(self.device, fields)))
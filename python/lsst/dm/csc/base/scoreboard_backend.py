@@ -0,0 +1,140 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from lsst.dm.csc.base.local_redis import LocalRedis, get_server
+from lsst.dm.csc.base.redis_failover import AsyncFailoverRedis
+from lsst.dm.csc.base.redis_pool import async_ping_once, get_async_pool
+from lsst.dm.csc.base.redis_timing import AsyncTimedRedis
+
+
+class ScoreboardBackend:
+    """Where the asyncio scoreboards keep their data.  A backend makes the
+    client a scoreboard sends its commands to, which has the interface of
+    `redis.asyncio.StrictRedis`.  Subclasses implement `connect`.
+
+    Parameters
+    ----------
+    failover : `lsst.dm.csc.base.redis_failover.Failover`
+        where to find another server if the one in use goes away; None
+        keeps to the one the scoreboard was given
+    """
+
+    def __init__(self, failover=None):
+        self.failover = failover
+
+    def client(self, host, port, db):
+        """Make a client for a database, which fails over to other servers
+        if the backend has a failover
+
+        Parameters
+        ----------
+        host : `str`
+            host name of Redis instance
+        port : `int`
+            network port number of Redis instance
+        db : `int`
+            redis database number
+
+        Returns
+        -------
+        The client
+        """
+        if self.failover is None:
+            return self.connect(host, port, db)
+        return AsyncFailoverRedis(self.failover, host, port, lambda h, p: self.connect(h, p, db))
+
+    def connect(self, host, port, db):
+        """Make a client for a database of one server
+
+        Parameters
+        ----------
+        host : `str`
+            host name of Redis instance
+        port : `int`
+            network port number of Redis instance
+        db : `int`
+            redis database number
+
+        Returns
+        -------
+        The client
+        """
+        raise NotImplementedError()
+
+    async def verify(self, conn):
+        """Check a client made by this backend can reach its data
+
+        Parameters
+        ----------
+        conn : `object`
+            the client
+        """
+        raise NotImplementedError()
+
+
+class RedisBackend(ScoreboardBackend):
+    """Keep the data in a Redis server, through the shared connection pools
+    """
+
+    def connect(self, host, port, db):
+        return AsyncTimedRedis(connection_pool=get_async_pool(host, port, db))
+
+    async def verify(self, conn):
+        await async_ping_once(conn)
+
+
+class LocalBackend(ScoreboardBackend):
+    """Keep the data in this process, in a
+    `lsst.dm.csc.base.local_redis.LocalServer` for each host and port,
+    for tests and single host deployments where nothing outside the
+    process reads the scoreboards
+    """
+
+    def connect(self, host, port, db):
+        return LocalRedis(get_server(host, port), db)
+
+    async def verify(self, conn):
+        await conn.ping()
+
+
+BACKENDS = {"redis": RedisBackend, "local": LocalBackend}
+
+
+def make_backend(name, failover=None):
+    """Create a scoreboard backend by name
+
+    Parameters
+    ----------
+    name : `str`
+        "redis" or "local"
+    failover : `lsst.dm.csc.base.redis_failover.Failover`
+        where to find another server if the one in use goes away
+
+    Returns
+    -------
+    backend : `ScoreboardBackend`
+    """
+    try:
+        return BACKENDS[name](failover)
+    except KeyError:
+        raise ValueError(f"unknown scoreboard backend {name}; "
+                         f"expected one of {sorted(BACKENDS)}") from None
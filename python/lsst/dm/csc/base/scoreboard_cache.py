@@ -0,0 +1,185 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import logging
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ReadCache:
+    """Local cache of scoreboard hash fields, with a time to live
+
+    Entries are grouped by Redis key, since a keyspace notification for a
+    hash only says the key changed, not which field.  Each key has a
+    generation which is bumped when it is invalidated, so a value read from
+    Redis before an invalidation arrived isn't cached after it.
+
+    The synchronous scoreboard invalidates entries from its pubsub thread,
+    so every method takes a lock.
+
+    Parameters
+    ----------
+    ttl : `float`
+        seconds an entry is used for; 0 disables the cache
+    clock : `callable`
+        returns the current time in seconds
+    """
+
+    def __init__(self, ttl=0, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    def get(self, key, field):
+        """Look up a cached field
+
+        Parameters
+        ----------
+        key : `str`
+            Redis key
+        field : `str`
+            hash field
+
+        Returns
+        -------
+        A tuple of whether the field was cached, and its value
+        """
+        with self._lock:
+            fields = self._entries.get(key)
+            entry = None if fields is None else fields.get(field)
+            if entry is not None and entry[0] > self._clock():
+                self.hits += 1
+                return True, entry[1]
+            self.misses += 1
+            return False, None
+
+    def generation(self, key):
+        """Get the generation of a key, to pass to `put` with a value read
+        after this call
+
+        Parameters
+        ----------
+        key : `str`
+            Redis key
+        """
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def put(self, key, field, value, generation):
+        """Cache a field, unless the key was invalidated since the value was read
+
+        Parameters
+        ----------
+        key : `str`
+            Redis key
+        field : `str`
+            hash field
+        value : `object`
+            the value
+        generation : `int`
+            generation of the key from before the value was read
+        """
+        with self._lock:
+            if not self.enabled or self._generations.get(key, 0) != generation:
+                return
+            self._entries.setdefault(key, {})[field] = (self._clock() + self.ttl, value)
+
+    def invalidate(self, key):
+        """Drop the cached fields of a key
+
+        Parameters
+        ----------
+        key : `str`
+            Redis key
+        """
+        with self._lock:
+            self._invalidate(key)
+
+    def _invalidate(self, key):
+        self._generations[key] = self._generations.get(key, 0) + 1
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        """Drop everything
+        """
+        with self._lock:
+            for key in list(self._entries):
+                self._invalidate(key)
+
+    def stats(self):
+        """Get the cache counters
+
+        Returns
+        -------
+        A dict with hits, misses, invalidations, the hit rate, and the number
+        of cached fields
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "entries": sum(len(fields) for fields in self._entries.values())}
+
+
+def keyspace_channel(db, key):
+    """Get the keyspace notification channel of a key
+
+    Parameters
+    ----------
+    db : `int`
+        redis database number
+    key : `str`
+        Redis key
+    """
+    return f"__keyspace@{db}__:{key}"
+
+
+def notifications_enabled(config, classes="hg"):
+    """Check whether the server sends keyspace notifications for some classes
+    of command
+
+    Parameters
+    ----------
+    config : `dict`
+        result of CONFIG GET notify-keyspace-events
+    classes : `str`
+        the classes, as notify-keyspace-events flags; by default hash and
+        generic commands
+
+    Returns
+    -------
+    True if the notifications will arrive
+    """
+    flags = config.get("notify-keyspace-events", "")
+    return "K" in flags and ("A" in flags or all(c in flags for c in classes))
@@ -0,0 +1,92 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import datetime
+
+
+def observing_day(now=None):
+    """Get the observing day, which rolls over at noon UTC, so a night's exposures
+    all share one day
+
+    Parameters
+    ----------
+    now : `datetime.datetime`
+        time to get the observing day of; defaults to the current time
+
+    Returns
+    -------
+    The observing day as a `datetime.date`
+    """
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+    return (now - datetime.timedelta(hours=12)).date()
+
+
+class TargetDirCache:
+    """The target directory the archive controller last gave out, which is
+    only valid for the observing day it was given out on
+
+    Parameters
+    ----------
+    clock : `callable`
+        returns the current observing day; defaults to `observing_day`
+    """
+
+    def __init__(self, clock=observing_day):
+        self._clock = clock
+        self._day = None
+        self._target_dir = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self):
+        """Get the target directory for the current observing day
+
+        Returns
+        -------
+        The target directory, or None if it isn't known for today
+        """
+        if self._target_dir is not None and self._clock() != self._day:
+            # the day rolled over; the controller will create a new directory
+            self.invalidate()
+        if self._target_dir is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._target_dir
+
+    def update(self, target_dir):
+        """Remember the target directory given out by the archive controller
+
+        Parameters
+        ----------
+        target_dir : `str`
+            the target directory
+        """
+        self._day = self._clock()
+        self._target_dir = target_dir
+
+    def invalidate(self):
+        """Forget the target directory
+        """
+        self._day = None
+        self._target_dir = None
@@ -0,0 +1,226 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+import itertools
+import json
+import logging
+import os
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Span:
+    """A single timed hop of an exposure through the archiver
+
+    Parameters
+    ----------
+    name : `str`
+        name of the hop, usually the method being traced
+    image_id : `str`
+        image the hop is working on; this is used as the trace id
+    span_id : `str`
+        unique id of this span
+    parent_id : `str`
+        id of the span which caused this one, or None
+    """
+
+    def __init__(self, name, image_id, span_id, parent_id):
+        self.name = name
+        self.image_id = image_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start_us = time.time_ns() // 1000
+        self._start_ns = time.perf_counter_ns()
+        self.duration_us = None
+
+    def finish(self):
+        """Mark the end of this span
+        """
+        self.duration_us = (time.perf_counter_ns() - self._start_ns) // 1000
+
+
+class Tracer:
+    """Record the hops an exposure takes through the archiver into an
+    in-memory ring buffer, so per-exposure latency can be examined with a
+    Chrome trace viewer (chrome://tracing or Perfetto).
+
+    Spans for the same image id are chained together in this process; the
+    trace context is carried across processes in the AMQP message headers
+    using `inject` and `extract`.
+
+    Parameters
+    ----------
+    size : `int`
+        maximum number of spans kept in the ring buffer
+    """
+
+    TRACE_ID = "TRACE_ID"
+    SPAN_ID = "SPAN_ID"
+
+    def __init__(self, size=4096):
+        self._spans = deque(maxlen=size)
+        self._span_ids = itertools.count(1)
+        self._pid = os.getpid()
+
+        # most recent span id seen for each image, used as the parent
+        # of the next span for that image
+        self._current = OrderedDict()
+        self._current_max = size
+
+    def _next_span_id(self):
+        return f"{self._pid:x}.{next(self._span_ids)}"
+
+    def _set_current(self, image_id, span_id):
+        self._current[image_id] = span_id
+        self._current.move_to_end(image_id)
+        if len(self._current) > self._current_max:
+            self._current.popitem(last=False)
+
+    @contextmanager
+    def span(self, name, image_id):
+        """Time a hop for an image, recording it into the ring buffer
+
+        Parameters
+        ----------
+        name : `str`
+            name of the hop
+        image_id : `str`
+            image the hop is working on
+
+        Yields
+        ------
+        span : `Span`
+            the span being recorded
+        """
+        image_id = str(image_id)
+        s = Span(name, image_id, self._next_span_id(), self._current.get(image_id))
+        self._set_current(image_id, s.span_id)
+        try:
+            yield s
+        finally:
+            s.finish()
+            self._spans.append(s)
+
+    def inject(self, image_id):
+        """Create message headers carrying the trace context of an image
+
+        Parameters
+        ----------
+        image_id : `str`
+            image whose context should be sent
+
+        Returns
+        -------
+        A dict to be used as AMQP message headers
+        """
+        image_id = str(image_id)
+        return {self.TRACE_ID: image_id, self.SPAN_ID: self._current.get(image_id)}
+
+    def inject_message(self, msg):
+        """Create message headers carrying the trace context of the image a
+        message is about
+
+        Parameters
+        ----------
+        msg : `dict`
+            the message; its IMAGE_ID, or else its OBSID, names the image
+
+        Returns
+        -------
+        A dict to be used as AMQP message headers, or None if the message
+        isn't about an image
+        """
+        image_id = msg.get("IMAGE_ID", msg.get("OBSID"))
+        return None if image_id is None else self.inject(image_id)
+
+    def extract(self, headers):
+        """Adopt the trace context from incoming message headers, so the next
+        span for that image is parented to the remote span
+
+        Parameters
+        ----------
+        headers : `dict`
+            AMQP message headers; may be None
+        """
+        if not headers or self.TRACE_ID not in headers:
+            return
+        span_id = headers.get(self.SPAN_ID)
+        if span_id is not None:
+            self._set_current(str(headers[self.TRACE_ID]), span_id)
+
+    def spans(self, image_id=None):
+        """Get the recorded spans
+
+        Parameters
+        ----------
+        image_id : `str`
+            if given, only return spans for this image
+
+        Returns
+        -------
+        A list of `Span` objects, oldest first
+        """
+        if image_id is None:
+            return list(self._spans)
+        image_id = str(image_id)
+        return [s for s in self._spans if s.image_id == image_id]
+
+    def to_chrome_trace(self):
+        """Convert the ring buffer to the Chrome trace event format
+
+        Each image is placed on its own track, so one exposure's hops line up
+        on a single row.
+
+        Returns
+        -------
+        A dict which can be serialized to JSON
+        """
+        events = []
+        tracks = {}
+        for s in self._spans:
+            tid = tracks.get(s.image_id)
+            if tid is None:
+                tid = len(tracks) + 1
+                tracks[s.image_id] = tid
+                events.append({"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+                               "args": {"name": s.image_id}})
+            events.append({"name": s.name, "cat": "exposure", "ph": "X",
+                           "ts": s.start_us, "dur": s.duration_us,
+                           "pid": self._pid, "tid": tid,
+                           "args": {"image_id": s.image_id, "span_id": s.span_id,
+                                    "parent_id": s.parent_id}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, filename):
+        """Write the ring buffer to a file as Chrome trace JSON
+
+        Parameters
+        ----------
+        filename : `str`
+            name of the file to write
+        """
+        LOGGER.info(f"writing {len(self._spans)} trace spans to {filename}")
+        with open(filename, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
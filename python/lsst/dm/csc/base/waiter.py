@@ -21,9 +21,259 @@
 
 import asyncio
 import logging
+import math
+import weakref
 
 LOGGER = logging.getLogger(__name__)
 
+# one shared wheel per event loop
+_wheels = weakref.WeakKeyDictionary()
+
+
+async def wait_for_event(evt, timeout):
+    """Wait for an event to be set, for at most timeout seconds
+
+    Parameters
+    ----------
+    evt : `asyncio.Event`
+        the event
+    timeout : `float`
+        seconds to wait
+
+    Returns
+    -------
+    True if the event was set
+    """
+    if evt.is_set():
+        return True
+    if timeout <= 0:
+        return False
+    try:
+        await asyncio.wait_for(evt.wait(), timeout)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+def timer_wheel():
+    """Get the TimerWheel shared by everything running on the current event loop
+
+    Returns
+    -------
+    wheel : `TimerWheel`
+    """
+    loop = asyncio.get_running_loop()
+    wheel = _wheels.get(loop)
+    if wheel is None:
+        wheel = TimerWheel(loop)
+        _wheels[loop] = wheel
+    return wheel
+
+
+class TimerEntry:
+    """A callback scheduled on a `TimerWheel`
+
+    Parameters
+    ----------
+    wheel : `TimerWheel`
+        wheel the callback is scheduled on
+    tick : `int`
+        wheel tick at which the callback runs
+    callback : `callable`
+        method to call
+    args : `tuple`
+        arguments for the callback
+    """
+
+    __slots__ = ('wheel', 'tick', 'callback', 'args', 'bucket', '_cancelled')
+
+    def __init__(self, wheel, tick, callback, args):
+        self.wheel = wheel
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self.bucket = None
+        self._cancelled = False
+
+    def cancelled(self):
+        """Returns True if the callback was cancelled
+        """
+        return self._cancelled
+
+    def cancel(self):
+        """Cancel the callback
+        """
+        self._cancelled = True
+        if self.bucket is not None:
+            self.bucket.discard(self)
+            self.bucket = None
+            self.wheel._count -= 1
+
+
+class TimerWheel:
+    """Hierarchical timer wheel, used to schedule many deadlines cheaply
+
+    Each level has ``slots`` buckets; a bucket on level 0 covers one tick,
+    and a bucket on level n covers ``slots`` buckets of level n - 1.
+    Inserting and cancelling a deadline are O(1).  While anything is
+    scheduled the event loop is woken once per tick; buckets of the higher
+    levels are cascaded down as their time comes.  Callbacks run up to one
+    tick late, never early.
+
+    Parameters
+    ----------
+    loop : `asyncio.AbstractEventLoop`
+        event loop to run on
+    tick : `float`
+        resolution of the wheel in seconds
+    slots : `int`
+        buckets per level; must be a power of two
+    levels : `int`
+        number of levels
+    """
+
+    def __init__(self, loop, tick=0.05, slots=64, levels=4):
+        self._loop = loop
+        self.tick = tick
+        self._slots = slots
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        self._levels = levels
+        self._wheel = [[set() for i in range(slots)] for j in range(levels)]
+        # deadlines beyond the reach of the top level
+        self._overflow = set()
+        self._origin = loop.time()
+        self._current = 0
+        self._count = 0
+        self._handle = None
+
+    def __len__(self):
+        return self._count
+
+    def call_at(self, when, callback, *args):
+        """Schedule a callback at an event loop time
+
+        Parameters
+        ----------
+        when : `float`
+            event loop time to run the callback
+        callback : `callable`
+            method to call
+        args : `tuple`
+            arguments for the callback
+
+        Returns
+        -------
+        entry : `TimerEntry`
+            the scheduled callback, which can be cancelled
+        """
+        if self._handle is None:
+            # the wheel was idle, so catch the current tick up to now
+            self._current = int((self._loop.time() - self._origin) / self.tick)
+            self._handle = self._loop.call_at(self._origin + (self._current + 1) * self.tick, self._advance)
+        tick = max(math.ceil((when - self._origin) / self.tick), self._current + 1)
+        entry = TimerEntry(self, tick, callback, args)
+        self._insert(entry)
+        return entry
+
+    def call_later(self, delay, callback, *args):
+        """Schedule a callback after a delay
+
+        Parameters
+        ----------
+        delay : `float`
+            seconds from now to run the callback
+        callback : `callable`
+            method to call
+        args : `tuple`
+            arguments for the callback
+
+        Returns
+        -------
+        entry : `TimerEntry`
+            the scheduled callback, which can be cancelled
+        """
+        return self.call_at(self._loop.time() + delay, callback, *args)
+
+    async def sleep(self, delay):
+        """Sleep using the wheel rather than a dedicated event loop timer
+
+        Parameters
+        ----------
+        delay : `float`
+            seconds to sleep
+        """
+        future = self._loop.create_future()
+        entry = self.call_later(delay, self._wake, future)
+        try:
+            await future
+        finally:
+            entry.cancel()
+
+    @staticmethod
+    def _wake(future):
+        if not future.done():
+            future.set_result(None)
+
+    def _insert(self, entry):
+        # an entry goes on the lowest level where its tick and the current
+        # tick agree on all the higher level digits
+        tick = entry.tick
+        current = self._current
+        for level in range(self._levels):
+            shift = self._bits * (level + 1)
+            if (tick >> shift) == (current >> shift):
+                bucket = self._wheel[level][(tick >> (self._bits * level)) & self._mask]
+                break
+        else:
+            bucket = self._overflow
+        bucket.add(entry)
+        entry.bucket = bucket
+        self._count += 1
+
+    def _cascade(self, bucket):
+        entries = list(bucket)
+        bucket.clear()
+        for entry in entries:
+            self._count -= 1
+            self._insert(entry)
+
+    def _step(self):
+        """Advance the wheel by one tick, running the callbacks which are due
+        """
+        self._current += 1
+        current = self._current
+
+        # cascade higher levels whose bucket has just come due, top down
+        if (current & ((1 << (self._bits * self._levels)) - 1)) == 0:
+            self._cascade(self._overflow)
+        for level in range(self._levels - 1, 0, -1):
+            if (current & ((1 << (self._bits * level)) - 1)) == 0:
+                self._cascade(self._wheel[level][(current >> (self._bits * level)) & self._mask])
+
+        bucket = self._wheel[0][current & self._mask]
+        if not bucket:
+            return
+        entries = list(bucket)
+        bucket.clear()
+        self._count -= len(entries)
+        for entry in entries:
+            entry.bucket = None
+            try:
+                entry.callback(*entry.args)
+            except Exception:
+                LOGGER.exception("timer wheel callback failed")
+
+    def _advance(self):
+        now_tick = int((self._loop.time() - self._origin) / self.tick)
+        while self._current < now_tick and self._count:
+            self._step()
+        self._current = max(self._current, now_tick)
+        if self._count:
+            self._handle = self._loop.call_at(self._origin + (self._current + 1) * self.tick, self._advance)
+        else:
+            self._handle = None
+
 
 class Waiter:
     """Waiter is use to briefly pause while other work is going on.  If
@@ -56,6 +306,6 @@ class Waiter:
         report : `str`
             Description of what happened in this fault
         """
-        await asyncio.sleep(self.timeout)
+        await timer_wheel().sleep(self.timeout)
         if self.evt.is_set():
             self.parent.call_fault(code=code, report=report)
@@ -20,16 +20,31 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import asyncio
+import logging
+import redis
+from lsst.dm.csc.base.waiter import wait_for_event
+
+LOGGER = logging.getLogger(__name__)
 
 
 class Watcher:
-    """
+    """Watch the association key a Forwarder keeps alive, and go into fault
+    if it disappears.  If the scoreboard can subscribe to keyspace
+    notifications, the fault is raised as soon as the key expires or is
+    deleted; otherwise the key is polled.
+
     Parameters
     ----------
     evt : `asyncio.Event`
     parent : `lsst.dm.csc.base.archiver_csc`
-    scoreboard : `lsst.dm.csc.base.scoreboard`
+    scoreboard : `lsst.dm.csc.base.async_archiveboard.AsyncArchiveboard`
+        a synchronous scoreboard must be wrapped in a
+        `lsst.dm.csc.base.async_scoreboard.SyncScoreboardAdapter`
     """
+
+    # events on the key which mean the Forwarder is gone
+    GONE_EVENTS = ("expired", "del")
+
     def __init__(self, evt, parent, scoreboard):
         self.evt = evt
         self.evt.clear()
@@ -38,6 +53,69 @@ class Watcher:
 
     async def peek(self, forwarder_key, seconds_until_next_peek):
         """Check to see if a Forwarder is still alive
+        Parameters
+        ----------
+        forwarder_key : `string`
+        seconds_until_next_peek : `int`
+            seconds between polls, when notifications aren't available
+        """
+        subscribe = getattr(self.scoreboard, "subscribe_keyspace", None)
+        pubsub = None
+        if subscribe is not None:
+            # generic (del) and expired events
+            pubsub = await subscribe(forwarder_key, "gx")
+        if pubsub is not None:
+            try:
+                if await self.listen(pubsub, forwarder_key):
+                    return
+            finally:
+                await pubsub.aclose()
+        await self.poll(forwarder_key, seconds_until_next_peek)
+
+    async def listen(self, pubsub, forwarder_key):
+        """Wait for the key to expire or be deleted
+
+        Parameters
+        ----------
+        pubsub : `redis.asyncio.client.PubSub`
+            subscription to the keyspace notifications of the key
+        forwarder_key : `string`
+
+        Returns
+        -------
+        True if done, False if notifications were lost and polling should
+        take over
+        """
+        stop = asyncio.ensure_future(self.evt.wait())
+        try:
+            # the key may have gone before the subscription was made
+            if await self.scoreboard.check_forwarder_presence(forwarder_key) is None:
+                self.fault()
+                return True
+            while not self.evt.is_set():
+                # wait for a message or to be asked to shut down, whichever is first
+                get = asyncio.ensure_future(pubsub.get_message(timeout=1.0))
+                await asyncio.wait({get, stop}, return_when=asyncio.FIRST_COMPLETED)
+                if not get.done():
+                    get.cancel()
+                    return True
+                message = get.result()
+                if message is None or message["data"] not in self.GONE_EVENTS:
+                    continue
+                # the key is deleted when we are asked to shut down, too
+                if not self.evt.is_set():
+                    self.fault()
+                return True
+        except redis.RedisError as e:
+            LOGGER.warning(f"lost keyspace notifications for {forwarder_key}: {e}; polling instead")
+            return False
+        finally:
+            stop.cancel()
+        return True
+
+    async def poll(self, forwarder_key, seconds_until_next_peek):
+        """Check the key every `seconds_until_next_peek`
+
         Parameters
         ----------
         forwarder_key : `string`
@@ -46,9 +124,91 @@ class Watcher:
         while True:
             if self.evt.is_set():  # if this is set, we were asked to shut down.
                 return
-            if self.scoreboard.check_forwarder_presence(forwarder_key) is None:
-                code = 5755
-                report = "Forwarder is does not appear to be alive.  Going into fault state."
-                self.parent.call_fault(code=code, report=report)
+            if await self.scoreboard.check_forwarder_presence(forwarder_key) is None:
+                self.fault()
+                return
+            await wait_for_event(self.evt, seconds_until_next_peek)
+
+    def fault(self):
+        """Go into fault because the Forwarder is gone
+        """
+        code = 5755
+        report = "Forwarder is does not appear to be alive.  Going into fault state."
+        self.parent.call_fault(code=code, report=report)
+
+
+class MultiWatcher:
+    """Watch many association keys, checking all of them with one MGET each
+    peek, and call a callback for each one which disappears
+
+    Parameters
+    ----------
+    evt : `asyncio.Event`
+    parent : `lsst.dm.csc.base.archiver_csc`
+        put into fault for keys added without a callback
+    scoreboard : `lsst.dm.csc.base.async_archiveboard.AsyncArchiveboard`
+    """
+    def __init__(self, evt, parent, scoreboard):
+        self.evt = evt
+        self.evt.clear()
+        self.parent = parent
+        self.scoreboard = scoreboard
+        self.callbacks = {}
+
+    def add(self, forwarder_key, on_gone=None):
+        """Start watching a key
+
+        Parameters
+        ----------
+        forwarder_key : `str`
+            the key
+        on_gone : `callable`
+            called with the key if it disappears; by default the parent goes
+            into fault
+        """
+        self.callbacks[forwarder_key] = on_gone
+
+    def remove(self, forwarder_key):
+        """Stop watching a key
+
+        Parameters
+        ----------
+        forwarder_key : `str`
+            the key
+        """
+        self.callbacks.pop(forwarder_key, None)
+
+    async def peek(self, seconds_until_next_peek):
+        """Check the keys every `seconds_until_next_peek` until asked to shut down.
+        A key which has disappeared is reported once and no longer watched.
+
+        Parameters
+        ----------
+        seconds_until_next_peek : `int`
+        """
+        while True:
+            if self.evt.is_set():  # if this is set, we were asked to shut down.
                 return
-            await asyncio.sleep(seconds_until_next_peek)
+            keys = list(self.callbacks)
+            values = await self.scoreboard.check_forwarders_presence(keys)
+            for key, value in zip(keys, values):
+                if value is None and key in self.callbacks:
+                    self.gone(key, self.callbacks.pop(key))
+            await wait_for_event(self.evt, seconds_until_next_peek)
+
+    def gone(self, forwarder_key, on_gone):
+        """Report a key which has disappeared
+
+        Parameters
+        ----------
+        forwarder_key : `str`
+            the key
+        on_gone : `callable`
+            its callback, or None to go into fault
+        """
+        if on_gone is not None:
+            on_gone(forwarder_key)
+            return
+        code = 5755
+        report = f"Forwarder for {forwarder_key} does not appear to be alive.  Going into fault state."
+        self.parent.call_fault(code=code, report=report)
@@ -0,0 +1,72 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asynctest
+
+from lsst.dm.csc.base.ack_latency import AckTimeoutEstimator, LatencyEstimator
+
+
+class AckLatencyTestCase(asynctest.TestCase):
+
+    def test_latency_estimator(self):
+        estimator = LatencyEstimator(window=100)
+        self.assertIsNone(estimator.percentile(99))
+        for i in range(1, 101):
+            estimator.add(i / 1000)
+        self.assertEqual(estimator.count, 100)
+        self.assertAlmostEqual(estimator.percentile(99), 0.099)
+        self.assertAlmostEqual(estimator.percentile(50), 0.050)
+        self.assertGreater(estimator.average, 0.050)
+
+    def test_static(self):
+        timeouts = AckTimeoutEstimator(10)
+        for i in range(50):
+            timeouts.observe("TYPE", "queue", 0.002)
+        self.assertEqual(timeouts.timeout("TYPE", "queue"), 10)
+        self.assertEqual(timeouts.snapshot()[("TYPE", "queue")]["count"], 50)
+
+    def test_adaptive(self):
+        timeouts = AckTimeoutEstimator(10, adaptive=True, minimum=0.5, maximum=20, min_samples=5)
+        for i in range(4):
+            timeouts.observe("TYPE", "queue", 0.002)
+        self.assertEqual(timeouts.timeout("TYPE", "queue"), 10)
+
+        # fast peer is clamped to the minimum
+        timeouts.observe("TYPE", "queue", 0.002)
+        self.assertEqual(timeouts.timeout("TYPE", "queue"), 0.5)
+
+        # slow but healthy peer gets a longer timeout, up to the maximum
+        for i in range(10):
+            timeouts.observe("TYPE", "slow_queue", 8)
+        self.assertEqual(timeouts.timeout("TYPE", "slow_queue"), 20)
+
+        # unknown message types use the default
+        self.assertEqual(timeouts.timeout("OTHER", "queue"), 10)
+
+    def test_adaptive_maximum(self):
+        # without a maximum, peers slower than the default get a longer timeout
+        timeouts = AckTimeoutEstimator(2, adaptive=True, min_samples=5)
+        for i in range(10):
+            timeouts.observe("TYPE", "slow_queue", 2.5)
+        self.assertEqual(timeouts.timeout("TYPE", "slow_queue"), 8)
+        for i in range(10):
+            timeouts.observe("TYPE", "queue", 1)
+        self.assertGreater(timeouts.timeout("TYPE", "queue"), 2)
+        self.assertLess(timeouts.timeout("TYPE", "queue"), 8)
@@ -0,0 +1,135 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asyncio
+import asynctest
+
+from lsst.dm.csc.base.ack_table import AckTable
+
+
+class AckTableTestCase(asynctest.TestCase):
+
+    async def test_resolve(self):
+        table = AckTable()
+        timed_out = []
+        entry = table.register("id1", 5, timed_out.append)
+        self.assertIn("id1", table)
+
+        rtt = table.resolve("id1", {"ACK_ID": "id1"})
+        self.assertGreaterEqual(rtt, 0)
+        self.assertEqual(await entry.future, {"ACK_ID": "id1"})
+        self.assertTrue(entry.handle.cancelled())
+        self.assertEqual(len(table), 0)
+
+        self.assertIsNone(table.resolve("id1", {}))
+        self.assertIsNone(table.resolve("id1", {}))
+        self.assertEqual(table.stats()["duplicate"], 2)
+        self.assertEqual(table.stats()["unknown"], 0)
+        await asyncio.sleep(0)
+        self.assertEqual(timed_out, [])
+
+    async def test_timeout(self):
+        table = AckTable()
+        timed_out = []
+        entry = table.register("id1", 0.05, timed_out.append)
+        table.register("id2")
+
+        await asyncio.sleep(0.1)
+        self.assertEqual(timed_out, [entry])
+        self.assertNotIn("id1", table)
+        self.assertIn("id2", table)
+        with self.assertRaises(asyncio.TimeoutError):
+            await entry.future
+
+    async def test_retried(self):
+        table = AckTable()
+        timeouts = []
+
+        def resend(entry):
+            # wait for the ack of the resent message once, then give up
+            timeouts.append(entry)
+            if len(timeouts) == 1:
+                table.register(entry.ack_id, 0.05, resend)
+
+        first = table.register("id1", 0.05, resend)
+        await asyncio.sleep(0.1)
+        self.assertIn("id1", table)
+        with self.assertRaises(asyncio.TimeoutError):
+            await first.future
+        stats = table.stats()
+        self.assertEqual((stats["retried"], stats["expired"]), (1, 0))
+
+        await asyncio.sleep(0.1)
+        self.assertEqual(len(timeouts), 2)
+        stats = table.stats()
+        self.assertEqual((stats["retried"], stats["expired"]), (1, 1))
+
+        # an ack which is resolved after a retry isn't late
+        table.register("id2", 0.05, lambda entry: table.register(entry.ack_id, 5))
+        await asyncio.sleep(0.1)
+        self.assertIsNotNone(table.resolve("id2", {}))
+        self.assertEqual(table.stats()["late"], 0)
+
+    async def test_pop(self):
+        table = AckTable()
+        entry = table.register("id1", 5, data="payload")
+        self.assertIs(table.pop("id1"), entry)
+        self.assertEqual(entry.data, "payload")
+        self.assertIsNone(table.pop("id1"))
+
+    async def test_ttl(self):
+        table = AckTable(ttl=0.05)
+        entry = table.register("id1")
+        await asyncio.sleep(0.15)
+        self.assertNotIn("id1", table)
+        with self.assertRaises(asyncio.TimeoutError):
+            await entry.future
+
+        self.assertIsNone(table.resolve("id1", {}))
+        self.assertIsNone(table.resolve("id2", {}))
+        # once a late or unknown ack has arrived, further copies are duplicates
+        self.assertTrue(table.resolved("id1"))
+        self.assertTrue(table.resolved("id2"))
+        self.assertIsNone(table.resolve("id1", {}))
+        self.assertIsNone(table.resolve("id2", {}))
+        stats = table.stats()
+        self.assertEqual(stats["expired"], 1)
+        self.assertEqual(stats["late"], 1)
+        self.assertEqual(stats["unknown"], 1)
+        self.assertEqual(stats["duplicate"], 2)
+        self.assertEqual(stats["outstanding"], 0)
+
+    async def test_max_entries(self):
+        forgotten = []
+        table = AckTable(max_entries=2,
+                         on_forget=lambda entry, reason: forgotten.append((entry.ack_id, reason)))
+        timed_out = []
+        first = table.register("id1", 5, timed_out.append)
+        table.register("id2")
+        table.register("id3")
+        self.assertNotIn("id1", table)
+        self.assertTrue(first.handle.cancelled())
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.stats()["evicted"], 1)
+        self.assertEqual(forgotten, [("id1", "evicted")])
+
+        self.assertIsNone(table.resolve("id1", {}))
+        self.assertEqual(table.stats()["late"], 1)
+        self.assertEqual(timed_out, [])
@@ -18,6 +18,7 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import json
 import asynctest
 
 from lsst.dm.csc.base.archiveboard import Archiveboard
@@ -59,3 +60,21 @@ class ArchiveboardTestCase(asynctest.TestCase):
         self.assertEqual(val, "myhost")
 
         ab.delete_forwarder_association()
+
+    def test_batch_reads(self):
+        ab = Archiveboard("AT", 1, "localhost", cache_ttl=10)
+        info = ForwarderInfo("localhost", "127.0.0.1", "fake_queue")
+        ab.set_paired_forwarder_info(info, 10)
+        ab.set_state("DISABLE")
+        # cached now, but a read in a batch is still queued
+        self.assertEqual(ab.get_paired_forwarder_info(), info)
+
+        with ab.batch() as results:
+            ab.set_state("ENABLE")
+            ab.get_state()
+            ab.get_paired_forwarder_info()
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[1], "ENABLE")
+        self.assertEqual(ab.create_forwarder_info(json.loads(results[2])), info)
+        self.assertEqual(ab.get_state(), "ENABLE")
+        ab.close()
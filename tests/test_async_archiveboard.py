@@ -0,0 +1,133 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import json
+import asynctest
+
+from lsst.dm.csc.base.async_archiveboard import AsyncArchiveboard
+from lsst.dm.csc.base.forwarder_info import ForwarderInfo
+
+
+class AsyncArchiveboardTestCase(asynctest.TestCase):
+
+    async def test_batch_reads(self):
+        ab = await AsyncArchiveboard.create("AT", 1, "localhost", cache_ttl=10)
+        info = ForwarderInfo("localhost", "127.0.0.1", "fake_queue")
+        await ab.set_paired_forwarder_info(info, 10)
+        await ab.set_state("DISABLE")
+        # cached now, but a read in a batch is still queued
+        self.assertEqual(await ab.get_paired_forwarder_info(), info)
+
+        async with ab.batch() as results:
+            await ab.set_state("ENABLE")
+            await ab.get_state()
+            await ab.get_paired_forwarder_info()
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[1], "ENABLE")
+        self.assertEqual(ab.create_forwarder_info(json.loads(results[2])), info)
+        self.assertEqual(await ab.get_state(), "ENABLE")
+        await ab.close()
+
+    async def test_archiveboard(self):
+        ab = await AsyncArchiveboard.create("AT", 1, "localhost", key="AT_association")
+        await ab.conn.delete('forwarder_list')
+
+        await ab.set_jobnum('123')
+        s = await ab.get_jobnum()
+        self.assertEqual(s, '123')
+
+        info1 = ForwarderInfo("localhost", "127.0.0.1", None)
+        await ab.push_forwarder_onto_list(info1)
+        info2 = await ab.pop_forwarder_from_list()
+        self.assertEqual(info1.hostname, info2.hostname)
+        self.assertEqual(info1.ip_address, info2.ip_address)
+        self.assertEqual(info1.consume_queue, info2.consume_queue)
+
+        with self.assertRaises(RuntimeError):
+            await ab.pop_forwarder_from_list()
+
+        await ab.set_paired_forwarder_info(info1, 10)
+        info4 = await ab.get_paired_forwarder_info()
+        self.assertEqual(info1.hostname, info4.hostname)
+        self.assertEqual(info1.ip_address, info4.ip_address)
+        self.assertEqual(info1.consume_queue, info4.consume_queue)
+
+        info5 = ab.create_forwarder_info({})
+        self.assertIsNone(info5)
+
+        await ab.set_forwarder_association("myhost", 10)
+
+        val = await ab.check_forwarder_presence("AT_association")
+        self.assertEqual(val, "myhost")
+
+        await ab.delete_forwarder_association()
+        await ab.close()
+
+    async def test_pair_forwarder(self):
+        ab = await AsyncArchiveboard.create("AT", 1, "localhost", key="AT_association")
+        await ab.conn.delete('forwarder_list', 'AT_association')
+
+        info1 = ForwarderInfo("fwdr1", "127.0.0.1", "q1")
+        info2 = ForwarderInfo("fwdr2", "127.0.0.2", "q2")
+        await ab.push_forwarder_onto_list(info1)
+        await ab.push_forwarder_onto_list(info2)
+
+        info = await ab.pair_forwarder(10)
+        self.assertEqual(info.hostname, "fwdr1")
+        self.assertEqual((await ab.get_paired_forwarder_info()).hostname, "fwdr1")
+        self.assertEqual(await ab.check_forwarder_presence("AT_association"), "fwdr1")
+        self.assertLessEqual(await ab.conn.ttl("AT_association"), 10)
+
+        # without the script, the same is done with separate calls
+        ab._pair_script = None
+        info = await ab.pair_forwarder(10)
+        self.assertEqual(info.hostname, "fwdr2")
+        self.assertEqual((await ab.get_paired_forwarder_info()).hostname, "fwdr2")
+        self.assertEqual(await ab.check_forwarder_presence("AT_association"), "fwdr2")
+
+        with self.assertRaises(RuntimeError):
+            await ab.pair_forwarder(10)
+        await ab.delete_forwarder_association()
+        await ab.close()
+
+    async def test_associations(self):
+        ab = await AsyncArchiveboard.create("AT", 1, "localhost")
+
+        await ab.set_forwarder_associations({"AT_assoc1": ("fwdr1", 10), "AT_assoc2": ("fwdr2", 10)})
+        values = await ab.check_forwarders_presence(["AT_assoc1", "AT_assoc2", "AT_assoc3"])
+        self.assertEqual(values, ["fwdr1", "fwdr2", None])
+        self.assertLessEqual(await ab.conn.ttl("AT_assoc2"), 10)
+
+        await ab.delete_forwarder_associations(["AT_assoc1", "AT_assoc2"])
+        values = await ab.check_forwarders_presence(["AT_assoc1", "AT_assoc2"])
+        self.assertEqual(values, [None, None])
+        await ab.close()
+
+    async def test_refresh_association(self):
+        ab = await AsyncArchiveboard.create("AT", 1, "localhost", key="AT_association")
+
+        await ab.set_forwarder_association("myhost", 10)
+        self.assertTrue(await ab.refresh_forwarder_association(20.5))
+        self.assertGreater(await ab.conn.pttl("AT_association"), 10000)
+        self.assertEqual(await ab.check_forwarder_presence("AT_association"), "myhost")
+
+        await ab.delete_forwarder_association()
+        self.assertFalse(await ab.refresh_forwarder_association(20))
+        await ab.close()
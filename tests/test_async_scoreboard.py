@@ -0,0 +1,76 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asynctest
+
+from lsst.dm.csc.base.async_scoreboard import AsyncScoreboard, SyncScoreboardAdapter
+
+
+class SyncBoard:
+    def __init__(self):
+        self.state = None
+
+    def set_state(self, state):
+        self.state = state
+
+    def get_state(self):
+        return self.state
+
+
+class AsyncScoreboardTestCase(asynctest.TestCase):
+
+    async def test_scoreboard(self):
+        sb = await AsyncScoreboard.create("AT", 1, "localhost")
+
+        await sb.set_session("test_session")
+        s = await sb.get_session()
+        self.assertEqual(s, "test_session")
+
+        await sb.set_state("test_state")
+        s = await sb.get_state()
+        self.assertEqual(s, "test_state")
+        await sb.close()
+
+    async def test_batch(self):
+        sb = await AsyncScoreboard.create("AT", 1, "localhost")
+
+        async with sb.batch() as results:
+            await sb.set_state("batch_state")
+            await sb.set_fields({"session": "batch_session", "jobnum": "7"})
+        self.assertEqual(len(results), 2)
+        fields = await sb.get_fields("state", "session", "jobnum")
+        self.assertEqual(fields, {"state": "batch_state", "session": "batch_session", "jobnum": "7"})
+
+        with self.assertRaises(RuntimeError):
+            async with sb.batch():
+                await sb.set_state("discarded")
+                raise RuntimeError("abandon the batch")
+        self.assertEqual(await sb.get_state(), "batch_state")
+        await sb.close()
+
+    async def test_adapter(self):
+        board = SyncBoard()
+        sb = SyncScoreboardAdapter(board)
+
+        await sb.set_state("test_state")
+        self.assertEqual(board.state, "test_state")
+        s = await sb.get_state()
+        self.assertEqual(s, "test_state")
+        self.assertEqual(sb.state, "test_state")
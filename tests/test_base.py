@@ -18,11 +18,14 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import logging
 import os
+import queue
+import threading
 import asynctest
 
 import lsst.utils.tests
-from lsst.dm.csc.base.base import Base
+from lsst.dm.csc.base.base import Base, DroppingQueueHandler
 
 
 class BaseTestCase(asynctest.TestCase):
@@ -105,3 +108,42 @@ class BaseTestCase(asynctest.TestCase):
         os.environ["IIP_CREDENTIAL_DIR"] = os.path.join(package, "tests", "files")
         with self.assertRaises(FileNotFoundError):
             Base("test", "missing_config.yaml", logname)
+
+    def test_log_queue(self):
+        logname = f"test_{os.getpid()}_log_queue.log"
+        os.environ["IIP_CONFIG_DIR"] = os.path.join(self.loc, "files", "etc", "config")
+        os.environ["IIP_CREDENTIAL_DIR"] = os.path.join(self.loc, "files")
+        os.environ["IIP_LOG_DIR"] = "/tmp"
+        b = Base("test", "config.yaml", logname)
+        logging.getLogger("test_base").warning("queued record")
+        self.assertEqual(b.getDroppedLogCount(), 0)
+        b.shutdown()
+        with open(os.path.join("/tmp", logname)) as f:
+            self.assertIn("queued record", f.read())
+        os.unlink(os.path.join("/tmp", logname))
+
+    def test_dropped_records(self):
+        handler = DroppingQueueHandler(queue.Queue(1))
+        logger = logging.getLogger("test_base.dropped")
+        logger.propagate = False
+        logger.addHandler(handler)
+        for i in range(3):
+            logger.warning("record %d", i)
+        logger.removeHandler(handler)
+        self.assertEqual(handler.dropped, 2)
+
+    def test_dropped_records_threads(self):
+        handler = DroppingQueueHandler(queue.Queue(1))
+        record = logging.makeLogRecord({"msg": "record"})
+        handler.enqueue(record)
+
+        def drop():
+            for i in range(10000):
+                handler.enqueue(record)
+
+        threads = [threading.Thread(target=drop) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(handler.dropped, 40000)
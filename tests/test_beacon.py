@@ -21,18 +21,53 @@
 import asyncio
 import asynctest
 
-from lsst.dm.csc.base.beacon import Beacon
+from lsst.dm.csc.base.beacon import Beacon, MultiBeacon
 from lsst.dm.csc.base.forwarder_info import ForwarderInfo
 
 
 class BeaconScoreboard:
-    def set_forwarder_association(self, hostname, expire):
+    async def set_forwarder_association(self, hostname, expire):
         return
 
-    def delete_forwarder_association(self):
+    async def delete_forwarder_association(self):
         return
 
 
+class SlowBeaconScoreboard:
+    def __init__(self, delay, present=True):
+        self.delay = delay
+        self.present = present
+        self.times = []
+        self.sets = 0
+        self.refreshes = 0
+
+    async def set_forwarder_association(self, hostname, expire):
+        self.times.append(asyncio.get_running_loop().time())
+        self.sets += 1
+        await asyncio.sleep(self.delay)
+
+    async def refresh_forwarder_association(self, expire):
+        self.times.append(asyncio.get_running_loop().time())
+        self.refreshes += 1
+        await asyncio.sleep(self.delay)
+        return self.present
+
+    async def delete_forwarder_association(self):
+        return
+
+
+class MultiBeaconScoreboard:
+    def __init__(self):
+        self.sets = []
+        self.deleted = None
+
+    async def set_forwarder_associations(self, associations):
+        self.sets.append(associations)
+
+    async def delete_forwarder_associations(self, keys):
+        self.deleted = keys
+
+
 class WatcherTestCase(asynctest.TestCase):
 
     async def test_beacon(self):
@@ -47,3 +82,77 @@ class WatcherTestCase(asynctest.TestCase):
     async def pause(self, evt, seconds):
         await asyncio.sleep(seconds)
         evt.set()
+
+    async def test_multi_beacon(self):
+        evt = asyncio.Event()
+        board = MultiBeaconScoreboard()
+
+        beacon = MultiBeacon(evt, board)
+        beacon.add("key1", ForwarderInfo("fwdr1", "127.0.0.1", None), 5)
+        beacon.add("key2", ForwarderInfo("fwdr2", "127.0.0.2", None), 5)
+        beacon.add("key3", ForwarderInfo("fwdr3", "127.0.0.3", None), 5)
+        beacon.remove("key3")
+        asyncio.create_task(self.pause(evt, 0.5))
+        await beacon.ping(0.2)
+
+        self.assertGreaterEqual(len(board.sets), 2)
+        self.assertEqual(board.sets[0], {"key1": ("fwdr1", 5), "key2": ("fwdr2", 5)})
+        self.assertEqual(board.deleted, ["key1", "key2"])
+
+    async def test_beacon_deadlines(self):
+        evt = asyncio.Event()
+        board = SlowBeaconScoreboard(0.05)
+        info = ForwarderInfo("localhost", "127.0.0.1", None)
+
+        beacon = Beacon(evt, board)
+        asyncio.create_task(self.pause(evt, 1.05))
+        await beacon.ping(info, 5, 0.2)
+
+        # the time the update takes doesn't stretch the period
+        self.assertEqual(len(board.times), 6)
+        for i, t in enumerate(board.times):
+            self.assertAlmostEqual(t - board.times[0], i * 0.2, delta=0.05)
+        stats = beacon.jitter_stats()
+        self.assertEqual((stats["updates"], stats["missed"]), (6, 0))
+        self.assertLess(stats["max"], 0.05)
+
+    async def test_beacon_missed(self):
+        evt = asyncio.Event()
+        board = SlowBeaconScoreboard(0.5)
+        info = ForwarderInfo("localhost", "127.0.0.1", None)
+
+        beacon = Beacon(evt, board)
+        asyncio.create_task(self.pause(evt, 1.1))
+        await beacon.ping(info, 5, 0.2)
+        self.assertGreater(beacon.jitter_stats()["missed"], 0)
+
+    async def test_beacon_pexpire(self):
+        evt = asyncio.Event()
+        board = SlowBeaconScoreboard(0)
+        info = ForwarderInfo("localhost", "127.0.0.1", None)
+
+        beacon = Beacon(evt, board, pexpire=True)
+        asyncio.create_task(self.pause(evt, 0.5))
+        await beacon.ping(info, 5, 0.2)
+        self.assertEqual((board.sets, board.refreshes), (1, 2))
+
+        # if the key has gone, it is written again
+        evt = asyncio.Event()
+        board = SlowBeaconScoreboard(0, present=False)
+        beacon = Beacon(evt, board, pexpire=True)
+        asyncio.create_task(self.pause(evt, 0.5))
+        await beacon.ping(info, 5, 0.2)
+        self.assertEqual((board.sets, board.refreshes), (3, 2))
+
+    async def test_beacon_stops_at_once(self):
+        evt = asyncio.Event()
+        board = SlowBeaconScoreboard(0)
+        info = ForwarderInfo("localhost", "127.0.0.1", None)
+
+        beacon = Beacon(evt, board)
+        asyncio.create_task(self.pause(evt, 0.1))
+        await asyncio.wait_for(beacon.ping(info, 300, 100), 1)
+
+        beacon = MultiBeacon(evt, MultiBeaconScoreboard())
+        asyncio.create_task(self.pause(evt, 0.1))
+        await asyncio.wait_for(beacon.ping(100), 1)
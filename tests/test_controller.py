@@ -25,6 +25,7 @@ import shutil
 import tempfile
 
 from lsst.dm.csc.base.archive_controller import ArchiveController
+from lsst.dm.csc.base.tracer import Tracer
 
 
 class ControllerTestChannel:
@@ -37,6 +38,17 @@ class ControllerMethod:
         self.delivery_tag = 1
 
 
+class Publisher:
+    def __init__(self):
+        self.published = []
+
+    async def publish_message(self, queue, msg, headers=None):
+        self.published.append((queue, msg, headers))
+
+    async def stop(self):
+        pass
+
+
 class ControllerTestCase(asynctest.TestCase):
 
     def setUp(self):
@@ -117,6 +129,29 @@ class ControllerTestCase(asynctest.TestCase):
 
         await self.controller.stop_connections()
 
+    async def test_trace(self):
+        await self.controller.configure()
+        self.controller.publisher = Publisher()
+        tmpdir = tempfile.mkdtemp()
+        self.controller.trace_file = os.path.join(tmpdir, "trace.json")
+
+        msg = {'OBSID': 'AT_O_1', 'FILENAME': os.path.join(tmpdir, 'missing.fits'), 'JOB_NUM': 1,
+               'SESSION_ID': 'today', 'RAFT': '00', 'SENSOR': '00', 'REPLY_QUEUE': 'reply'}
+        await self.controller.process_file_transfer_completed(msg)
+        await asyncio.sleep(0)
+
+        # the ack and the failure message both carry the image's trace context
+        published = self.controller.publisher.published
+        self.assertEqual(len(published), 2)
+        for queue, sent, headers in published:
+            self.assertEqual(headers[Tracer.TRACE_ID], 'AT_O_1')
+
+        # spans are written out when connections stop
+        await self.controller.stop_connections()
+        self.assertTrue(os.path.exists(self.controller.trace_file))
+        shutil.rmtree(tmpdir)
+        os.unlink(os.path.join("/tmp", self.logname))
+
     async def test_target_dir(self):
         await self.controller.configure()
         target = self.controller.construct_send_target_dir("/tmp")
@@ -64,6 +64,27 @@ class DirectorTestCase(asynctest.TestCase):
 
         val = await d.get_next_ack_id()
         self.assertEqual(val, f"{session_id}_2")
+
+        val = d.next_ack_id()
+        self.assertEqual(val, f"{session_id}_3")
+        os.unlink(os.path.join("/tmp", logname))
+
+    async def test_register_ack(self):
+        logname = f"test_{os.getpid()}_register_ack.log"
+        package = lsst.utils.getPackageDir("dm_csc_base")
+        os.environ["IIP_CONFIG_DIR"] = os.path.join(package, "tests", "files", "etc", "config")
+        os.environ["IIP_CREDENTIAL_DIR"] = os.path.join(package, "tests", "files")
+        d = Director("test", "config.yaml", logname)
+
+        future = d.register_ack("id1")
+        self.assertFalse(future.done())
+
+        msg = {"ACK_ID": "id1"}
+        self.assertTrue(d.resolve_ack("id1", msg))
+        self.assertEqual(await future, msg)
+
+        self.assertFalse(d.resolve_ack("id1", msg))
+        self.assertFalse(d.resolve_ack("id2", msg))
         os.unlink(os.path.join("/tmp", logname))
 
     def test_jobnum(self):
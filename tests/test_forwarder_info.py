@@ -34,3 +34,43 @@ class ForwarderInfoTestCase(asynctest.TestCase):
         self.assertEqual(hostname, f.hostname)
         self.assertEqual(ip_address, f.ip_address)
         self.assertEqual(consume_queue, f.consume_queue)
+
+    def test_immutable(self):
+        f1 = ForwarderInfo("localhost", "127.0.0.1", "fake_queue")
+        f2 = ForwarderInfo("local" + "host", "127.0.0.1", "fake_queue")
+        with self.assertRaises(AttributeError):
+            f1.hostname = "otherhost"
+        with self.assertRaises(AttributeError):
+            f1.extra = 1
+        self.assertEqual(f1, f2)
+        self.assertEqual(len({f1, f2}), 1)
+        self.assertIs(f1.hostname, f2.hostname)
+        self.assertNotEqual(f1, ForwarderInfo("localhost", "127.0.0.1", None))
+
+        # fields which aren't strings are kept, not rejected
+        f3 = ForwarderInfo.from_dict({"hostname": "localhost", "ip_address": 2130706433,
+                                      "consume_queue": "fake_queue"})
+        self.assertEqual(f3.ip_address, 2130706433)
+
+    def test_codecs(self):
+        for f in (ForwarderInfo("localhost", "127.0.0.1", "fake_queue"),
+                  ForwarderInfo("localhost", "127.0.0.1", None),
+                  ForwarderInfo("", "::1", "qé")):
+            self.assertEqual(ForwarderInfo.from_bytes(f.to_bytes()), f)
+            self.assertEqual(ForwarderInfo.from_dict(f.to_dict()), f)
+        self.assertEqual(ForwarderInfo("localhost", "127.0.0.1", None).to_dict(),
+                         {"hostname": "localhost", "ip_address": "127.0.0.1", "consume_queue": None})
+
+    def test_bytes_limits(self):
+        # a field of the longest length isn't taken for None
+        f = ForwarderInfo("h" * 0xFFFF, None, "")
+        self.assertEqual(ForwarderInfo.from_bytes(f.to_bytes()), f)
+        with self.assertRaises(ValueError):
+            ForwarderInfo("h" * 0x10000, "127.0.0.1", "q").to_bytes()
+
+        data = ForwarderInfo("localhost", "127.0.0.1", "fake_queue").to_bytes()
+        for short in (data[:3], data[:-1]):
+            with self.assertRaises(ValueError):
+                ForwarderInfo.from_bytes(short)
+        with self.assertRaises(ValueError):
+            ForwarderInfo.from_bytes(data + b"x")
@@ -0,0 +1,106 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asynctest
+
+from lsst.dm.csc.base.async_archiveboard import AsyncArchiveboard
+from lsst.dm.csc.base.forwarder_info import ForwarderInfo
+from lsst.dm.csc.base.forwarder_scheduler import (AffinityPolicy, ForwarderScheduler, LeastLoadedPolicy,
+                                                  RoundRobinPolicy, make_policy, pick)
+from lsst.dm.csc.base.local_redis import reset_servers
+from lsst.dm.csc.base.scoreboard_backend import LocalBackend
+
+
+class ForwarderSchedulerTestCase(asynctest.TestCase):
+
+    def test_pick(self):
+        pool = {"fwdr1": 3.0, "fwdr2": 1.0, "fwdr3": 2.0}
+        self.assertEqual(pick(pool, {"fwdr1", "fwdr2", "fwdr3"}), "fwdr2")
+        self.assertEqual(pick(pool, {"fwdr1", "fwdr3"}), "fwdr3")
+        self.assertEqual(pick(pool, {"fwdr1", "fwdr3"}, preferred="fwdr1"), "fwdr1")
+        self.assertEqual(pick(pool, {"fwdr3"}, preferred="fwdr1"), "fwdr3")
+        self.assertIsNone(pick(pool, set()))
+
+    def test_policies(self):
+        self.assertIsNone(LeastLoadedPolicy().preferred(None))
+
+        policy = RoundRobinPolicy()
+        members = ["fwdr2", "fwdr3", "fwdr1"]
+        chosen = []
+        for i in range(4):
+            member = policy.preferred(members)
+            policy.paired(member)
+            chosen.append(member)
+        self.assertEqual(chosen, ["fwdr1", "fwdr2", "fwdr3", "fwdr1"])
+
+        policy = AffinityPolicy()
+        self.assertIsNone(policy.preferred(None))
+        policy.paired("fwdr2")
+        self.assertEqual(policy.preferred(None), "fwdr2")
+
+        self.assertIsInstance(make_policy("affinity"), AffinityPolicy)
+        with self.assertRaises(ValueError):
+            make_policy("random")
+
+    async def test_scheduler(self):
+        ab = await AsyncArchiveboard.create("AT", 1, "localhost")
+        await ab.conn.delete("test_pool", "test_pool_info")
+        scheduler = ForwarderScheduler(ab, pool_key="test_pool", alive_prefix="test_alive:")
+
+        await scheduler.publish(ForwarderInfo("fwdr1", "127.0.0.1", "q1"), 2.0, 10)
+        await scheduler.publish(ForwarderInfo("fwdr2", "127.0.0.2", "q2"), 1.0, 10)
+        await scheduler.publish(ForwarderInfo("fwdr3", "127.0.0.3", "q3"), 0.5, 10)
+        await ab.conn.delete("test_alive:fwdr3")
+
+        info = await scheduler.pair()
+        self.assertEqual(info.hostname, "fwdr2")
+        self.assertEqual(info.consume_queue, "q2")
+        # the unhealthy Forwarder was dropped from the pool
+        self.assertEqual(await scheduler.loads(), [("fwdr1", 2.0)])
+
+        info = await scheduler.pair()
+        self.assertEqual(info.hostname, "fwdr1")
+        with self.assertRaises(RuntimeError):
+            await scheduler.pair()
+        await ab.close()
+
+    async def test_scheduler_unscripted(self):
+        # the local backend can't run scripts, so the pick is made with separate calls
+        ab = await AsyncArchiveboard.create("AT", 1, "localhost", backend=LocalBackend())
+        scheduler = ForwarderScheduler(ab, policy=AffinityPolicy(), alive_prefix="test_alive:")
+
+        await scheduler.publish(ForwarderInfo("fwdr1", "127.0.0.1", "q1"), 2.0, 10)
+        await scheduler.publish(ForwarderInfo("fwdr2", "127.0.0.2", "q2"), 1.0, 10)
+        await scheduler.publish(ForwarderInfo("fwdr3", "127.0.0.3", "q3"), 0.5, 10)
+        await ab.conn.delete("test_alive:fwdr3")
+
+        info = await scheduler.pair()
+        self.assertEqual(info.hostname, "fwdr2")
+        self.assertEqual(await scheduler.loads(), [("fwdr1", 2.0)])
+
+        # the Forwarder paired with last time is preferred while it is in the pool
+        await scheduler.publish(ForwarderInfo("fwdr2", "127.0.0.2", "q2"), 3.0, 10)
+        info = await scheduler.pair()
+        self.assertEqual(info.hostname, "fwdr2")
+        self.assertEqual((await scheduler.pair()).hostname, "fwdr1")
+        with self.assertRaises(RuntimeError):
+            await scheduler.pair()
+        await ab.close()
+        reset_servers()
@@ -0,0 +1,128 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asyncio
+import os
+import tempfile
+
+import asynctest
+
+from lsst.dm.csc.base.journal import Journal
+
+
+class JournalTestCase(asynctest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "director.journal")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    async def test_replay(self):
+        journal = Journal(self.filename, sync_batch=2)
+        state = journal.open()
+        self.assertEqual(state.jobnum, 0)
+        self.assertEqual(state.images(), [])
+
+        journal.session("session_1")
+        journal.job(1)
+        journal.sent({"ACK_ID": "a1", "MSG_TYPE": "NEW_ITEM", "IMAGE_ID": "IMG_1", "JOB_NUM": 1})
+        journal.job(2)
+        journal.sent({"ACK_ID": "a2", "MSG_TYPE": "NEW_ITEM", "IMAGE_ID": "IMG_2", "JOB_NUM": 2})
+        journal.acked("a1")
+        await journal.synced()
+        self.assertGreater(journal.syncs, 0)
+        journal.close()
+
+        # a record cut short by a crash is skipped
+        with open(self.filename, "a") as f:
+            f.write('{"t":"ack","ack_')
+
+        journal = Journal(self.filename)
+        state = journal.open()
+        self.assertEqual(state.jobnum, 2)
+        self.assertEqual(state.session_id, "session_1")
+        self.assertEqual(list(state.outstanding), ["a2"])
+        self.assertEqual(state.images(), ["IMG_2"])
+        journal.close()
+
+        # the journal was compacted to the outstanding state
+        with open(self.filename) as f:
+            self.assertEqual(len(f.readlines()), 3)
+        state = Journal.replay(self.filename)
+        self.assertEqual(state.jobnum, 2)
+        self.assertEqual(state.images(), ["IMG_2"])
+
+    async def test_batched_sync(self):
+        journal = Journal(self.filename, sync_interval=60, sync_batch=100)
+        journal.open()
+        for i in range(10):
+            journal.job(i + 1)
+        self.assertEqual(journal.syncs, 0)
+        journal.sync()
+        await journal.synced()
+        self.assertEqual(journal.syncs, 1)
+
+        # records flushed while an fsync runs are synced by another one
+        journal.job(11)
+        journal.sync()
+        journal.job(12)
+        journal.sync()
+        await journal.synced()
+        self.assertEqual(journal.syncs, 3)
+        journal.close()
+        self.assertEqual(Journal.replay(self.filename).jobnum, 12)
+
+    async def test_cancelled_sync(self):
+        journal = Journal(self.filename, sync_interval=60, sync_batch=100)
+        journal.open()
+        journal.job(1)
+        journal.sync()
+        # as at loop shutdown; the records are synced by another fsync
+        journal._syncing.cancel()
+        await asyncio.sleep(0)
+        await journal.synced()
+        self.assertEqual(journal.syncs, 1)
+        journal.close()
+        self.assertEqual(Journal.replay(self.filename).jobnum, 1)
+
+    async def test_forgotten(self):
+        journal = Journal(self.filename)
+        journal.open()
+        journal.session("session_1")
+        journal.sent({"ACK_ID": "a1", "MSG_TYPE": "NEW_ITEM", "IMAGE_ID": "IMG_1", "JOB_NUM": 1})
+        journal.sent({"ACK_ID": "a2", "MSG_TYPE": "NEW_ITEM", "IMAGE_ID": "IMG_2", "JOB_NUM": 2})
+        journal.gone("a1", "expired")
+        journal.close()
+
+        # an ack which is no longer waited for isn't mid-flight
+        journal = Journal(self.filename)
+        state = journal.open()
+        self.assertEqual(state.images(), ["IMG_2"])
+
+        # messages of an earlier session are reported once, not after every restart
+        journal.session("session_2")
+        journal.close()
+        journal = Journal(self.filename)
+        state = journal.open()
+        self.assertEqual(state.session_id, "session_2")
+        self.assertEqual(state.images(), [])
+        journal.close()
@@ -0,0 +1,153 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asyncio
+import asynctest
+import redis
+
+from lsst.dm.csc.base.async_archiveboard import AsyncArchiveboard
+from lsst.dm.csc.base.forwarder_info import ForwarderInfo
+from lsst.dm.csc.base.local_redis import LocalRedis, LocalServer, reset_servers
+from lsst.dm.csc.base.scoreboard_backend import LocalBackend, make_backend
+from lsst.dm.csc.base.scoreboard_cache import keyspace_channel
+from lsst.dm.csc.base.watcher import Watcher
+
+
+class FaultCounter:
+    def __init__(self):
+        self.faults = 0
+
+    def call_fault(self, code, report):
+        self.faults += 1
+
+
+class LocalRedisTestCase(asynctest.TestCase):
+
+    def setUp(self):
+        self.conn = LocalRedis(LocalServer(), 1)
+
+    def tearDown(self):
+        reset_servers()
+
+    async def test_strings(self):
+        conn = self.conn
+        self.assertTrue(await conn.set("key1", 1))
+        self.assertEqual(await conn.get("key1"), "1")
+        self.assertIsNone(await conn.set("key1", 2, nx=True))
+        self.assertEqual(await conn.mget(["key1", "key2"]), ["1", None])
+        self.assertEqual(await conn.exists("key1", "key2"), 1)
+        self.assertEqual(await conn.ttl("key1"), -1)
+        self.assertEqual(await conn.delete("key1", "key2"), 1)
+        self.assertEqual(await conn.ttl("key1"), -2)
+
+        # other databases of the server are separate
+        other = LocalRedis(conn.server, 2)
+        await other.set("key1", "x")
+        self.assertIsNone(await conn.get("key1"))
+
+    async def test_expiry(self):
+        conn = self.conn
+        pubsub = conn.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(keyspace_channel(1, "key1"))
+
+        await conn.set("key1", "fwdr1", px=100)
+        self.assertGreater(await conn.pttl("key1"), 0)
+        self.assertEqual((await pubsub.get_message(timeout=1))["data"], "set")
+        # expiry events are sent when the key expires, without it being read
+        self.assertEqual((await pubsub.get_message(timeout=1))["data"], "expired")
+        self.assertIsNone(await conn.get("key1"))
+
+        # a new ttl replaces the old one
+        await conn.set("key1", "fwdr1", ex=0.1)
+        self.assertTrue(await conn.pexpire("key1", 10000))
+        await asyncio.sleep(0.2)
+        self.assertEqual(await conn.get("key1"), "fwdr1")
+        self.assertFalse(await conn.pexpire("key2", 10000))
+
+        await pubsub.aclose()
+        self.assertEqual(await conn.config_get("notify-keyspace-events"), {"notify-keyspace-events": "KA"})
+
+    async def test_hashes(self):
+        conn = self.conn
+        self.assertEqual(await conn.hset("ARCHIVER", "state", "ENABLE"), 1)
+        self.assertEqual(await conn.hset("ARCHIVER", mapping={"state": "DISABLE", "jobnum": 3}), 1)
+        self.assertEqual(await conn.hget("ARCHIVER", "jobnum"), "3")
+        self.assertEqual(await conn.hmget("ARCHIVER", ["state", "session"]), ["DISABLE", None])
+        self.assertEqual(await conn.hgetall("ARCHIVER"), {"state": "DISABLE", "jobnum": "3"})
+        with self.assertRaises(redis.ResponseError):
+            await conn.get("ARCHIVER")
+
+    async def test_lists(self):
+        conn = self.conn
+        await conn.lpush("forwarder_list", "fwdr1", "fwdr2")
+        self.assertEqual(await conn.lrange("forwarder_list", 0, -1), ["fwdr2", "fwdr1"])
+        self.assertEqual(await conn.brpop("forwarder_list", 1), ("forwarder_list", "fwdr1"))
+        self.assertEqual(await conn.rpop("forwarder_list"), "fwdr2")
+        self.assertEqual(await conn.exists("forwarder_list"), 0)
+
+        # a blocked pop wakes when something is pushed
+        pop = asyncio.create_task(conn.brpop(["forwarder_list"], 5))
+        await asyncio.sleep(0.05)
+        self.assertFalse(pop.done())
+        await conn.lpush("forwarder_list", "fwdr3")
+        self.assertEqual(await asyncio.wait_for(pop, 1), ("forwarder_list", "fwdr3"))
+        self.assertIsNone(await conn.brpop("forwarder_list", 0.05))
+
+    async def test_pipeline(self):
+        conn = self.conn
+        pipeline = conn.pipeline()
+        await pipeline.hset("ARCHIVER", "state", "ENABLE")
+        await pipeline.set("key1", "fwdr1", ex=10)
+        await pipeline.get("key1")
+        self.assertEqual(len(pipeline), 3)
+        self.assertIsNone(await conn.get("key1"))
+        self.assertEqual(await pipeline.execute(), [1, True, "fwdr1"])
+
+        pipeline.get("ARCHIVER")
+        with self.assertRaises(redis.ResponseError):
+            await pipeline.execute()
+
+    async def test_backend(self):
+        with self.assertRaises(ValueError):
+            make_backend("memcached")
+        backend = make_backend("local")
+        ab = await AsyncArchiveboard.create("AT", 1, "localhost", key="AT_association", backend=backend)
+        # boards of the same host and port share data
+        other = await AsyncArchiveboard.create("AT", 1, "localhost", backend=LocalBackend())
+        await other.push_forwarder_onto_list(ForwarderInfo("fwdr1", "127.0.0.1", "q1"))
+
+        # without scripts, pairing is done with separate calls
+        info = await ab.pair_forwarder(10)
+        self.assertEqual(info.hostname, "fwdr1")
+        self.assertEqual((await other.get_paired_forwarder_info()).hostname, "fwdr1")
+        self.assertEqual(await other.check_forwarder_presence("AT_association"), "fwdr1")
+        await ab.close()
+        await other.close()
+
+    async def test_watcher(self):
+        # the watcher faults as soon as the association expires
+        ab = await AsyncArchiveboard.create("AT", 1, "localhost", key="AT_association",
+                                            backend=LocalBackend())
+        await ab.set_forwarder_association("fwdr1", 0.2)
+        parent = FaultCounter()
+        w = Watcher(asyncio.Event(), parent, ab)
+        await asyncio.wait_for(w.peek("AT_association", 100), 1)
+        self.assertEqual(parent.faults, 1)
+        await ab.close()
@@ -19,11 +19,19 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asyncio
 import os
+import tempfile
+import unittest.mock
 import asynctest
+import redis
 
 import lsst.utils.tests
+from lsst.dm.csc.base.async_archiveboard import AsyncArchiveboard
+from lsst.dm.csc.base.local_redis import reset_servers
 from lsst.dm.csc.base.message_director import MessageDirector
+from lsst.dm.csc.base.scoreboard_backend import LocalBackend
+from lsst.dm.csc.base.tracer import Tracer
 
 
 class Parent:
@@ -31,13 +39,111 @@ class Parent:
         pass
 
 
+class Faults:
+    def __init__(self):
+        self.faults = []
+
+    def call_fault(self, code, msg):
+        self.faults.append((code, msg))
+
+
 class Failure:
     def call_fault(self, code, msg):
         raise Exception("fail")
 
 
+class Publisher:
+    def __init__(self):
+        self.published = []
+        self.headers = []
+
+    async def publish_message(self, queue, msg, headers=None):
+        self.published.append((queue, msg))
+        self.headers.append(headers)
+
+
+class StartIntegration:
+    imageName = "AT_O_1"
+    imageIndex = 0
+    imagesInSequence = 1
+    imageDate = "2020-01-01"
+    exposureTime = 1.0
+
+
 class MessageDirectorTestCase(asynctest.TestCase):
 
+    def make_director(self, parent, logname):
+        package = lsst.utils.getPackageDir("dm_csc_base")
+        os.environ["IIP_CONFIG_DIR"] = os.path.join(package, "tests", "files", "etc", "config")
+        os.environ["IIP_CREDENTIAL_DIR"] = os.path.join(package, "tests", "files")
+        md = MessageDirector(parent, "test", "config.yaml", logname)
+        md.configure()
+        md.initialize_session()
+        md.forwarder_host = "fwdr1"
+        md.forwarder_consume_queue = "fwdr1_consume"
+        md.publisher = Publisher()
+        return md
+
+    async def test_duplicate_new_item_ack(self):
+        logname = f"test_{os.getpid()}_dup.log"
+        md = self.make_director(Parent(), logname)
+
+        md.register_ack("ack1", 5)
+        ack = {"ACK_ID": "ack1", "IMAGE_ID": "AT_O_1", "TARGET_DIR": "/data/2020-01-01"}
+        await md.process_new_item_ack(ack)
+        # the controller acks a resent NEW_ARCHIVE_ITEM with the same ACK_ID
+        await md.process_new_item_ack(dict(ack))
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(len(md.publisher.published), 1)
+        queue, msg = md.publisher.published[0]
+        self.assertEqual(queue, "fwdr1_consume")
+        self.assertEqual(msg["MSG_TYPE"], md.FWDR_XFER_PARAMS)
+        self.assertEqual(md.get_ack_stats()["duplicate"], 1)
+        os.unlink(os.path.join("/tmp", logname))
+
+    async def test_late_new_item_ack(self):
+        logname = f"test_{os.getpid()}_late.log"
+        md = self.make_director(Parent(), logname)
+
+        md.register_ack("ack1", 0.05)
+        await asyncio.sleep(0.1)
+        self.assertFalse(md.ack_outstanding("ack1"))
+        # the first ack arrives after its entry expired; the Forwarder still needs it
+        ack = {"ACK_ID": "ack1", "IMAGE_ID": "AT_O_1", "TARGET_DIR": "/data/2020-01-01"}
+        await md.process_new_item_ack(ack)
+        await md.process_new_item_ack(dict(ack))
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(len(md.publisher.published), 1)
+        queue, msg = md.publisher.published[0]
+        self.assertEqual(queue, "fwdr1_consume")
+        self.assertEqual(msg["MSG_TYPE"], md.FWDR_XFER_PARAMS)
+        stats = md.get_ack_stats()
+        self.assertEqual(stats["late"], 1)
+        self.assertEqual(stats["duplicate"], 1)
+        os.unlink(os.path.join("/tmp", logname))
+
+    async def test_duplicate_new_item_ack_pipelined(self):
+        logname = f"test_{os.getpid()}_dup_pipelined.log"
+        md = self.make_director(Parent(), logname)
+        md.pipeline_start_integration = True
+        md.target_dir_cache.update("/data/2020-01-01")
+
+        # the controller and the Forwarder are sent their messages together
+        await md.transmit_startIntegration(StartIntegration())
+        self.assertEqual(len(md.publisher.published), 2)
+        ack_id = md.publisher.published[0][1]["ACK_ID"]
+
+        ack = {"ACK_ID": ack_id, "IMAGE_ID": "AT_O_1", "TARGET_DIR": "/data/2020-01-01"}
+        await md.process_new_item_ack(ack)
+        await md.process_new_item_ack(dict(ack))
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(len(md.publisher.published), 2)
+        self.assertEqual(len(md._speculative_dirs), 0)
+        os.unlink(os.path.join("/tmp", logname))
+
     def test_config_values(self):
         parent = Parent()
         logname = f"test_{os.getpid()}_event.log"
@@ -69,6 +175,49 @@ class MessageDirectorTestCase(asynctest.TestCase):
         self.assertIsNone(val)
         os.unlink(os.path.join("/tmp", logname))
 
+    async def test_trace(self):
+        logname = f"test_{os.getpid()}_trace.log"
+        md = self.make_director(Parent(), logname)
+        tmpdir = tempfile.TemporaryDirectory()
+        md.trace_file = os.path.join(tmpdir.name, "trace.json")
+
+        # messages about an image carry its trace context unless given headers
+        with md.tracer.span("transmit_endReadout", "AT_O_1"):
+            await md.publish_message("q", {"MSG_TYPE": "X", "IMAGE_ID": "AT_O_1"})
+        await md.publish_message("q", {"MSG_TYPE": "X", "OBSID": "AT_O_2"})
+        await md.publish_message("q", {"MSG_TYPE": "X"})
+        await md.publish_message("q", {"MSG_TYPE": "X", "IMAGE_ID": "AT_O_1"}, {"other": "header"})
+        headers = md.publisher.headers
+        self.assertEqual(headers[0][Tracer.TRACE_ID], "AT_O_1")
+        self.assertIsNotNone(headers[0][Tracer.SPAN_ID])
+        self.assertEqual(headers[1][Tracer.TRACE_ID], "AT_O_2")
+        self.assertIsNone(headers[2])
+        self.assertEqual(headers[3], {"other": "header"})
+
+        # spans are written out when services stop
+        await md.stop_services()
+        self.assertTrue(os.path.exists(md.trace_file))
+        tmpdir.cleanup()
+        os.unlink(os.path.join("/tmp", logname))
+
+    async def test_redis_down_while_pairing(self):
+        logname = f"test_{os.getpid()}_redis_down.log"
+        parent = Faults()
+        md = self.make_director(parent, logname)
+        md.scoreboard_backend = LocalBackend()
+
+        with unittest.mock.patch.object(AsyncArchiveboard, "pair_forwarder",
+                                        side_effect=redis.ConnectionError("connection refused")):
+            await md.start_services()
+        self.assertEqual(len(parent.faults), 1)
+        code, msg = parent.faults[0]
+        self.assertEqual(code, 5701)
+        self.assertIn("unavailable", msg)
+        self.assertNotIn("forwarder_list", msg)
+        await md.scoreboard.close()
+        reset_servers()
+        os.unlink(os.path.join("/tmp", logname))
+
     async def test_bad_connection(self):
         failure = Failure()
         logname = f"test_{os.getpid()}_bad.log"
@@ -0,0 +1,71 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import logging
+import asynctest
+
+from lsst.dm.csc.base.message_log import MessageLogger, MessageSummary
+
+
+class CountingDict(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = 0
+
+    def __getitem__(self, key):
+        self.reads += 1
+        return super().__getitem__(key)
+
+
+class MessageLogTestCase(asynctest.TestCase):
+
+    def test_summary(self):
+        msg = {'MSG_TYPE': 'NEW_TS_ARCHIVE_ITEM', 'ACK_ID': 'abc_1', 'imageDate': 'ignored'}
+        s = MessageSummary(msg, {'queue': 'q1'})
+        self.assertEqual(str(s), "queue=q1 MSG_TYPE=NEW_TS_ARCHIVE_ITEM ACK_ID=abc_1")
+        self.assertEqual(str(MessageSummary("plain")), "plain")
+
+    def test_level_gated(self):
+        logger = logging.getLogger("test_message_log.gated")
+        logger.setLevel(logging.WARNING)
+        msg_log = MessageLogger(logger)
+        msg = CountingDict({'MSG_TYPE': 'test'})
+        msg_log.received(msg)
+        msg_log.sent("queue", msg)
+        self.assertEqual(msg.reads, 0)
+
+    def test_enabled(self):
+        logger = logging.getLogger("test_message_log.enabled")
+        logger.setLevel(logging.INFO)
+        msg_log = MessageLogger(logger)
+        with self.assertLogs(logger, logging.INFO) as cm:
+            msg_log.sent("queue", {'MSG_TYPE': 'test', 'ACK_ID': 'a_1'})
+        self.assertEqual(cm.records[0].getMessage(), "sent queue=queue MSG_TYPE=test ACK_ID=a_1")
+        self.assertEqual(cm.records[0].funcName, "test_enabled")
+
+    def test_debug_sample(self):
+        logger = logging.getLogger("test_message_log.sample")
+        logger.setLevel(logging.DEBUG)
+        msg_log = MessageLogger(logger, debug_sample=3)
+        with self.assertLogs(logger, logging.DEBUG) as cm:
+            for i in range(6):
+                msg_log.received({'MSG_TYPE': 'test', 'ACK_ID': i})
+        bodies = [r for r in cm.records if r.levelno == logging.DEBUG]
+        self.assertEqual(len(bodies), 2)
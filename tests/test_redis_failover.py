@@ -0,0 +1,203 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asynctest
+import redis
+
+from lsst.dm.csc.base.async_archiveboard import AsyncArchiveboard
+from lsst.dm.csc.base.local_redis import get_server, reset_servers
+from lsst.dm.csc.base.redis_failover import Failover, FailoverRedis, parse_endpoint
+from lsst.dm.csc.base.retry import RetryPolicy
+from lsst.dm.csc.base.scoreboard_backend import LocalBackend
+
+
+class FlakyClient:
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.up = True
+        self.values = {}
+
+    def check(self):
+        if not self.up:
+            raise redis.ConnectionError(f"{self.endpoint} is down")
+
+    def ping(self):
+        self.check()
+        return True
+
+    def set(self, name, value):
+        self.check()
+        self.values[name] = value
+        return True
+
+    def lpush(self, name, value):
+        self.check()
+        self.values.setdefault(name, []).insert(0, value)
+        return len(self.values[name])
+
+    def pipeline(self, transaction=True):
+        return FlakyPipeline(self)
+
+
+class FlakyPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def set(self, name, value):
+        self.commands.append(("set", name, value))
+        return self
+
+    def lpush(self, name, value):
+        self.commands.append(("lpush", name, value))
+        return self
+
+    def execute(self, raise_on_error=True):
+        return [getattr(self.client, command)(name, value) for command, name, value in self.commands]
+
+
+class RedisFailoverTestCase(asynctest.TestCase):
+
+    def setUp(self):
+        self.endpoints = [("redis1", 6379), ("redis2", 6379)]
+
+    def tearDown(self):
+        reset_servers()
+
+    def test_config(self):
+        self.assertIsNone(Failover.from_config(None))
+        self.assertEqual(parse_endpoint("redis1"), ("redis1", 6379))
+        self.assertEqual(parse_endpoint(["redis1", "6380"]), ("redis1", 6380))
+
+        failover = Failover.from_config({"ENDPOINTS": ["redis1:6379", "redis2:6379", "redis3:6379"],
+                                         "RETRY": {"COUNT": 5, "BACKOFF": 0.5}})
+        self.assertEqual(failover.retry.count, 5)
+        self.assertEqual(failover.retry.delay(2), 1.0)
+        self.assertEqual(failover.candidates(("redis2", 6379)),
+                         [("redis3", 6379), ("redis1", 6379), ("redis2", 6379)])
+        self.assertEqual(failover.candidates(("redis0", 6379)),
+                         [("redis1", 6379), ("redis2", 6379), ("redis3", 6379), ("redis0", 6379)])
+
+        with self.assertRaises(ValueError):
+            Failover.from_config({"SENTINELS": ["sentinel1:26379"]})
+
+    def test_sync_failover(self):
+        clients = {endpoint: FlakyClient(endpoint) for endpoint in self.endpoints}
+        failover = Failover(self.endpoints, retry=RetryPolicy(2, 0.001))
+        conn = FailoverRedis(failover, "redis1", 6379, lambda host, port: clients[(host, port)])
+
+        self.assertTrue(conn.set("key1", "a"))
+        clients[("redis1", 6379)].up = False
+        self.assertTrue(conn.set("key1", "b"))
+        self.assertEqual(clients[("redis2", 6379)].values, {"key1": "b"})
+
+        # a pipeline is sent again in full to the next server
+        clients[("redis1", 6379)].up = True
+        clients[("redis2", 6379)].up = False
+        pipeline = conn.pipeline()
+        pipeline.set("key1", "c").set("key2", "d")
+        self.assertEqual(pipeline.execute(), [True, True])
+        self.assertEqual(clients[("redis1", 6379)].values, {"key1": "c", "key2": "d"})
+
+        stats = failover.snapshot()
+        self.assertEqual((stats["errors"], stats["retries"], stats["failovers"]), (2, 2, 2))
+        self.assertEqual([(h["from"], h["to"]) for h in stats["history"]],
+                         [("redis1:6379", "redis2:6379"), ("redis2:6379", "redis1:6379")])
+
+        # when no server answers, the error is raised after the retries
+        clients[("redis1", 6379)].up = False
+        with self.assertRaises(redis.ConnectionError):
+            conn.set("key1", "e")
+        self.assertEqual(failover.errors, 5)
+
+    def test_not_retried(self):
+        clients = {endpoint: FlakyClient(endpoint) for endpoint in self.endpoints}
+        failover = Failover(self.endpoints, retry=RetryPolicy(2, 0.001))
+        conn = FailoverRedis(failover, "redis1", 6379, lambda host, port: clients[(host, port)])
+
+        # an LPUSH whose reply was lost may have been applied, so its error
+        # is raised, but the next command goes to the other server
+        clients[("redis1", 6379)].up = False
+        with self.assertRaises(redis.ConnectionError):
+            conn.lpush("list1", "a")
+        self.assertEqual(conn.endpoint, ("redis2", 6379))
+        self.assertEqual(conn.lpush("list1", "a"), 1)
+
+        # and so is a pipeline which holds one
+        clients[("redis2", 6379)].up = False
+        pipeline = conn.pipeline()
+        pipeline.set("key1", "b").lpush("list1", "c")
+        with self.assertRaises(redis.ConnectionError):
+            pipeline.execute()
+        self.assertEqual(clients[("redis1", 6379)].values, {})
+        self.assertEqual(failover.retries, 0)
+
+    async def test_no_backoff_on_loop(self):
+        clients = {endpoint: FlakyClient(endpoint) for endpoint in self.endpoints}
+        failover = Failover(self.endpoints, retry=RetryPolicy(2, 60))
+        conn = FailoverRedis(failover, "redis1", 6379, lambda host, port: clients[(host, port)])
+
+        # the sync client doesn't sleep out the backoff on the event loop thread
+        clients[("redis1", 6379)].up = False
+        self.assertTrue(conn.set("key1", "a"))
+        self.assertEqual(clients[("redis2", 6379)].values, {"key1": "a"})
+
+    async def test_failover(self):
+        redis1 = get_server("redis1", 6379)
+        redis2 = get_server("redis2", 6379)
+        failover = Failover(self.endpoints, retry=RetryPolicy(3, 0.01))
+        ab = await AsyncArchiveboard.create("AT", 1, "redis1", key="AT_association",
+                                            backend=LocalBackend(failover))
+
+        await ab.set_forwarder_association("fwdr1", 10)
+        self.assertIn("AT_association", redis1.keys(1))
+
+        # the Beacon's next write goes to the other server
+        redis1.stop()
+        await ab.set_forwarder_association("fwdr1", 10)
+        self.assertIn("AT_association", redis2.keys(1))
+        self.assertEqual(await ab.check_forwarder_presence("AT_association"), "fwdr1")
+
+        # and batches are sent again in full
+        redis1.start()
+        redis2.stop()
+        async with ab.batch():
+            await ab.set_state("ENABLE")
+            await ab.set_session("session1")
+        self.assertEqual(redis1.keys(1)["AT"], {"state": "ENABLE", "session": "session1"})
+
+        stats = ab.failover_stats()
+        self.assertEqual((stats["errors"], stats["retries"], stats["failovers"]), (2, 2, 2))
+        await ab.close()
+
+    async def test_sentinel(self):
+        failover = Failover(sentinels=[("sentinel1", 26379)], service="archiver",
+                            retry=RetryPolicy(1, 0.01))
+
+        async def discover():
+            return ("redis2", 6379)
+        failover.async_discover = discover
+
+        get_server("redis1", 6379).stop()
+        ab = await AsyncArchiveboard.create("AT", 1, "redis1", backend=LocalBackend(failover))
+        await ab.set_jobnum(7)
+        self.assertEqual(get_server("redis2", 6379).keys(1)["AT"], {"jobnum": "7"})
+        self.assertEqual(failover.failovers, 1)
+        await ab.close()
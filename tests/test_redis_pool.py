@@ -0,0 +1,70 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asynctest
+
+from lsst.dm.csc.base import redis_pool
+
+
+class PingCounter:
+    def __init__(self, pool):
+        self.connection_pool = pool
+        self.pings = 0
+
+    def ping(self):
+        self.pings += 1
+
+
+class AsyncPingCounter(PingCounter):
+    async def ping(self):
+        self.pings += 1
+
+
+class RedisPoolTestCase(asynctest.TestCase):
+
+    def tearDown(self):
+        redis_pool.reset_pools()
+        redis_pool.configure_pools()
+
+    def test_pool(self):
+        redis_pool.configure_pools(max_connections=4, health_check_interval=10)
+        pool = redis_pool.get_pool("localhost", 6379, 1)
+        self.assertIs(redis_pool.get_pool("localhost", 6379, 1), pool)
+        self.assertIsNot(redis_pool.get_pool("localhost", 6379, 2), pool)
+        self.assertEqual(pool.max_connections, 4)
+        self.assertEqual(pool.connection_kwargs["health_check_interval"], 10)
+        self.assertTrue(pool.connection_kwargs["socket_keepalive"])
+
+        conn1 = PingCounter(pool)
+        conn2 = PingCounter(pool)
+        redis_pool.ping_once(conn1)
+        redis_pool.ping_once(conn2)
+        self.assertEqual(conn1.pings + conn2.pings, 1)
+
+    async def test_async_pool(self):
+        pool = redis_pool.get_async_pool("localhost", 6379, 1)
+        self.assertIs(redis_pool.get_async_pool("localhost", 6379, 1), pool)
+        self.assertIsNot(redis_pool.get_pool("localhost", 6379, 1), pool)
+
+        conn1 = AsyncPingCounter(pool)
+        conn2 = AsyncPingCounter(pool)
+        await redis_pool.async_ping_once(conn1)
+        await redis_pool.async_ping_once(conn2)
+        self.assertEqual(conn1.pings + conn2.pings, 1)
@@ -0,0 +1,110 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asynctest
+import redis
+
+from lsst.dm.csc.base.redis_timing import AsyncTimedRedis, CommandHistogram, CommandTimings, TimedRedis
+
+
+class RedisTimingTestCase(asynctest.TestCase):
+
+    def test_histogram(self):
+        histogram = CommandHistogram()
+        self.assertIsNone(histogram.percentile(50))
+        for i in range(99):
+            histogram.add(0.0001)
+        histogram.add(0.5)
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.max, 0.5)
+        # samples are in buckets bounded by powers of two microseconds
+        self.assertEqual(histogram.percentile(50), 128e-6)
+        self.assertEqual(histogram.percentile(99), 128e-6)
+        self.assertEqual(histogram.percentile(100), 0.5)
+
+        histogram.add(100)
+        self.assertEqual(histogram.percentile(100), 100)
+
+    def test_slow_log(self):
+        timings = CommandTimings(slow_threshold=0.01, slow_log_size=2)
+        timings.record("HGET", "ARCHIVER", 0.001)
+        timings.record("HSET", "ARCHIVER", 0.02)
+        timings.record("SET", "association", 0.03)
+        timings.record("PIPELINE", "2 commands", 0.04)
+
+        snapshot = timings.snapshot()
+        self.assertEqual(set(snapshot["commands"]), {"HGET", "HSET", "SET", "PIPELINE"})
+        hget = snapshot["commands"]["HGET"]
+        self.assertEqual(hget["count"], 1)
+        self.assertEqual(hget["mean"], 0.001)
+        self.assertEqual(hget["buckets"], {1024e-6: 1})
+        # only the most recent slow commands are kept
+        self.assertEqual([(s["command"], s["key"]) for s in snapshot["slow"]],
+                         [("SET", "association"), ("PIPELINE", "2 commands")])
+
+        timings.configure(slow_threshold=1, slow_log_size=2)
+        timings.record("HSET", "ARCHIVER", 0.5)
+        self.assertEqual(len(timings.snapshot()["slow"]), 2)
+        timings.configure(slow_threshold=1, slow_log_size=4)
+        self.assertEqual(timings.snapshot()["slow"], [])
+
+        timings.reset()
+        self.assertEqual(timings.snapshot(), {"commands": {}, "slow": []})
+
+    def test_blocking_commands(self):
+        # a BRPOP which waits for a push is timed, but isn't slow
+        timings = CommandTimings(slow_threshold=0.01)
+        timings.record("BRPOP", "forwarder_list", 1.0)
+        timings.record("HGET", "ARCHIVER", 0.001)
+        snapshot = timings.snapshot()
+        self.assertEqual(snapshot["commands"]["BRPOP"]["count"], 1)
+        self.assertEqual(snapshot["commands"]["HGET"]["max"], 0.001)
+        self.assertEqual(snapshot["slow"], [])
+
+    def test_timed_redis(self):
+        # nothing listens on port 1, but failed commands are timed too
+        timings = CommandTimings(slow_threshold=0)
+        conn = TimedRedis(host="localhost", port=1, timings=timings, retry=None)
+        with self.assertRaises(redis.ConnectionError):
+            conn.hget("ARCHIVER", "state")
+        with self.assertRaises(redis.ConnectionError):
+            with conn.pipeline() as pipeline:
+                pipeline.hset("ARCHIVER", "state", "ENABLE")
+                pipeline.hset("ARCHIVER", "session", "session1")
+                pipeline.execute()
+        snapshot = timings.snapshot()
+        self.assertEqual(snapshot["commands"]["HGET"]["count"], 1)
+        self.assertEqual(snapshot["commands"]["PIPELINE"]["count"], 1)
+        self.assertNotIn("HSET", snapshot["commands"])
+        self.assertEqual([(s["command"], s["key"]) for s in snapshot["slow"]],
+                         [("HGET", "ARCHIVER"), ("PIPELINE", "2 commands")])
+
+    async def test_async_timed_redis(self):
+        timings = CommandTimings()
+        conn = AsyncTimedRedis(host="localhost", port=1, timings=timings, retry=None)
+        with self.assertRaises(redis.ConnectionError):
+            await conn.set("association", "fwdr1", ex=3)
+        with self.assertRaises(redis.ConnectionError):
+            async with conn.pipeline() as pipeline:
+                pipeline.hset("ARCHIVER", "state", "ENABLE")
+                await pipeline.execute()
+        await conn.aclose()
+        self.assertEqual(timings.snapshot()["commands"]["SET"]["count"], 1)
+        self.assertEqual(timings.snapshot()["commands"]["PIPELINE"]["count"], 1)
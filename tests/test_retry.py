@@ -0,0 +1,57 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asynctest
+
+from lsst.dm.csc.base.retry import RetryPolicies, RetryPolicy
+
+
+class RetryTestCase(asynctest.TestCase):
+
+    def test_delay(self):
+        policy = RetryPolicy(count=4, backoff=0.5, multiplier=2, max_backoff=1.5)
+        self.assertEqual(policy.delay(1), 0.5)
+        self.assertEqual(policy.delay(2), 1.0)
+        self.assertEqual(policy.delay(3), 1.5)
+        self.assertEqual(policy.delay(4), 1.5)
+
+    def test_policies(self):
+        retries = RetryPolicies()
+        self.assertEqual(retries.get("TYPE").count, 0)
+
+        retries = RetryPolicies({"DEFAULT": {"COUNT": 1}, "TYPE": {"COUNT": 3, "BACKOFF": 0.25}})
+        self.assertEqual(retries.get("TYPE").count, 3)
+        self.assertEqual(retries.get("TYPE").delay(1), 0.25)
+        self.assertEqual(retries.get("OTHER").count, 1)
+
+    def test_stats(self):
+        retries = RetryPolicies({"TYPE": {"COUNT": 2}})
+        self.assertFalse(retries.resolved("ack_1"))
+
+        retries.retried("TYPE", "ack_1")
+        retries.retried("TYPE", "ack_1")
+        self.assertTrue(retries.resolved("ack_1"))
+        self.assertFalse(retries.resolved("ack_1"))
+
+        retries.retried("TYPE", "ack_2")
+        retries.exhausted("TYPE", "ack_2")
+        self.assertFalse(retries.resolved("ack_2"))
+
+        self.assertEqual(retries.stats(), {"TYPE": {"retries": 3, "recovered": 1, "exhausted": 1}})
@@ -35,3 +35,19 @@ class ScoreboardTestCase(asynctest.TestCase):
         sb.set_state("test_state")
         s = sb.get_state()
         self.assertEqual(s, "test_state")
+
+    def test_batch(self):
+        sb = Scoreboard("AT", 1, "localhost")
+
+        with sb.batch() as results:
+            sb.set_state("batch_state")
+            sb.set_fields({"session": "batch_session", "jobnum": "7"})
+        self.assertEqual(len(results), 2)
+        self.assertEqual(sb.get_fields("state", "session", "jobnum"),
+                         {"state": "batch_state", "session": "batch_session", "jobnum": "7"})
+
+        with self.assertRaises(RuntimeError):
+            with sb.batch():
+                sb.set_state("discarded")
+                raise RuntimeError("abandon the batch")
+        self.assertEqual(sb.get_state(), "batch_state")
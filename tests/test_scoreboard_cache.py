@@ -0,0 +1,87 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import threading
+import asynctest
+
+from lsst.dm.csc.base.scoreboard_cache import ReadCache, keyspace_channel, notifications_enabled
+
+
+class ScoreboardCacheTestCase(asynctest.TestCase):
+
+    def test_cache(self):
+        now = [0.0]
+        cache = ReadCache(ttl=10, clock=lambda: now[0])
+        self.assertEqual(cache.get("AT", "state"), (False, None))
+
+        cache.put("AT", "state", "ENABLE", cache.generation("AT"))
+        cache.put("AT", "session", None, cache.generation("AT"))
+        self.assertEqual(cache.get("AT", "state"), (True, "ENABLE"))
+        self.assertEqual(cache.get("AT", "session"), (True, None))
+
+        # entries expire after the ttl
+        now[0] = 11.0
+        self.assertEqual(cache.get("AT", "state"), (False, None))
+
+        # a value read before an invalidation isn't cached
+        generation = cache.generation("AT")
+        cache.invalidate("AT")
+        cache.put("AT", "state", "STALE", generation)
+        self.assertEqual(cache.get("AT", "state"), (False, None))
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["invalidations"]), (2, 3, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 0.4)
+
+    def test_disabled(self):
+        cache = ReadCache()
+        cache.put("AT", "state", "ENABLE", cache.generation("AT"))
+        self.assertEqual(cache.get("AT", "state"), (False, None))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_threads(self):
+        # the synchronous scoreboard invalidates from its pubsub thread
+        cache = ReadCache(ttl=10)
+        done = threading.Event()
+
+        def invalidate():
+            while not done.is_set():
+                cache.clear()
+
+        thread = threading.Thread(target=invalidate)
+        thread.start()
+        try:
+            for i in range(20000):
+                key = f"AT{i % 100}"
+                cache.put(key, "state", i, cache.generation(key))
+                cache.get(key, "state")
+                cache.stats()
+        finally:
+            done.set()
+            thread.join()
+        stats = cache.stats()
+        self.assertEqual(stats["hits"] + stats["misses"], 20000)
+
+    def test_notifications(self):
+        self.assertEqual(keyspace_channel(1, "AT"), "__keyspace@1__:AT")
+        self.assertTrue(notifications_enabled({"notify-keyspace-events": "KA"}))
+        self.assertTrue(notifications_enabled({"notify-keyspace-events": "Kgh"}))
+        self.assertFalse(notifications_enabled({"notify-keyspace-events": "Eh"}))
+        self.assertFalse(notifications_enabled({"notify-keyspace-events": ""}))
@@ -0,0 +1,54 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import datetime
+
+import asynctest
+
+from lsst.dm.csc.base.target_dir import TargetDirCache, observing_day
+
+
+class TargetDirTestCase(asynctest.TestCase):
+
+    def test_observing_day(self):
+        utc = datetime.timezone.utc
+        self.assertEqual(observing_day(datetime.datetime(2020, 3, 2, 11, 59, tzinfo=utc)),
+                         datetime.date(2020, 3, 1))
+        self.assertEqual(observing_day(datetime.datetime(2020, 3, 2, 12, 0, tzinfo=utc)),
+                         datetime.date(2020, 3, 2))
+
+    def test_cache(self):
+        today = [datetime.date(2020, 3, 1)]
+        cache = TargetDirCache(clock=lambda: today[0])
+        self.assertIsNone(cache.get())
+
+        cache.update("/tmp/forwarder/2020-03-01/")
+        self.assertEqual(cache.get(), "/tmp/forwarder/2020-03-01/")
+        self.assertEqual(cache.get(), "/tmp/forwarder/2020-03-01/")
+
+        # the cached directory isn't used after the day rolls over
+        today[0] = datetime.date(2020, 3, 2)
+        self.assertIsNone(cache.get())
+        self.assertIsNone(cache.get())
+        self.assertEqual((cache.hits, cache.misses), (2, 3))
+
+        cache.update("/tmp/forwarder/2020-03-02/")
+        cache.invalidate()
+        self.assertIsNone(cache.get())
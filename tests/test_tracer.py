@@ -0,0 +1,84 @@
+# This file is part of dm_csc_base
+#
+# Developed for the LSST Telescope and Site Systems.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import json
+import os
+import tempfile
+import asynctest
+
+from lsst.dm.csc.base.tracer import Tracer
+
+
+class TracerTestCase(asynctest.TestCase):
+
+    def test_span_chain(self):
+        tracer = Tracer()
+        with tracer.span("transmit_startIntegration", "AT_O_1") as s1:
+            headers = tracer.inject("AT_O_1")
+        with tracer.span("process_new_item_ack", "AT_O_1") as s2:
+            pass
+        with tracer.span("transmit_startIntegration", "AT_O_2") as s3:
+            pass
+
+        self.assertEqual(headers, {Tracer.TRACE_ID: "AT_O_1", Tracer.SPAN_ID: s1.span_id})
+        self.assertIsNone(s1.parent_id)
+        self.assertEqual(s2.parent_id, s1.span_id)
+        self.assertIsNone(s3.parent_id)
+        self.assertEqual(len(tracer.spans("AT_O_1")), 2)
+        self.assertIsNotNone(s1.duration_us)
+
+    def test_extract(self):
+        tracer = Tracer()
+        tracer.extract(None)
+        tracer.extract({"other": "header"})
+        tracer.extract({Tracer.TRACE_ID: "AT_O_1", Tracer.SPAN_ID: "remote.7"})
+        with tracer.span("process_image_in_oods", "AT_O_1") as s:
+            pass
+        self.assertEqual(s.parent_id, "remote.7")
+
+    def test_ring_buffer(self):
+        tracer = Tracer(size=3)
+        for i in range(5):
+            with tracer.span("hop", f"AT_O_{i}"):
+                pass
+        spans = tracer.spans()
+        self.assertEqual(len(spans), 3)
+        self.assertEqual(spans[0].image_id, "AT_O_2")
+
+    def test_chrome_trace(self):
+        tracer = Tracer()
+        with tracer.span("transmit_endReadout", "AT_O_1"):
+            pass
+        with tracer.span("transmit_endReadout", "AT_O_2"):
+            pass
+
+        trace = tracer.to_chrome_trace()
+        complete = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+        self.assertEqual(len(complete), 2)
+        self.assertNotEqual(complete[0]["tid"], complete[1]["tid"])
+
+        fd, filename = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
+            tracer.dump(filename)
+            with open(filename) as f:
+                self.assertEqual(json.load(f), trace)
+        finally:
+            os.unlink(filename)
@@ -21,7 +21,7 @@
 import asyncio
 import asynctest
 
-from lsst.dm.csc.base.waiter import Waiter
+from lsst.dm.csc.base.waiter import TimerWheel, Waiter, timer_wheel
 
 
 class Parent:
@@ -44,3 +44,31 @@ class WaiterTestCase(asynctest.TestCase):
         w = Waiter(evt, parent, 2)
         evt.clear()
         await w.pause(1, "report placeholder")
+
+    async def test_timer_wheel(self):
+        loop = asyncio.get_running_loop()
+        # small wheel, so deadlines cascade between levels and overflow
+        wheel = TimerWheel(loop, tick=0.01, slots=4, levels=2)
+        fired = []
+        start = loop.time()
+        for delay in [0.3, 0.05, 0.12, 0.02]:
+            wheel.call_later(delay, lambda d: fired.append((d, loop.time() - start)), delay)
+        cancelled = wheel.call_later(0.07, fired.append, "cancelled")
+        cancelled.cancel()
+        self.assertTrue(cancelled.cancelled())
+        self.assertEqual(len(wheel), 4)
+
+        await asyncio.sleep(0.4)
+        self.assertEqual([d for d, t in fired], [0.02, 0.05, 0.12, 0.3])
+        for delay, elapsed in fired:
+            self.assertGreaterEqual(elapsed, delay)
+        self.assertEqual(len(wheel), 0)
+
+    async def test_timer_wheel_sleep(self):
+        wheel = timer_wheel()
+        self.assertIs(wheel, timer_wheel())
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await wheel.sleep(0.1)
+        self.assertGreaterEqual(loop.time() - start, 0.1)
+        self.assertEqual(len(wheel), 0)
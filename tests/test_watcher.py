@@ -21,7 +21,7 @@
 import asyncio
 import asynctest
 
-from lsst.dm.csc.base.watcher import Watcher
+from lsst.dm.csc.base.watcher import MultiWatcher, Watcher
 
 
 class WatcherParent:
@@ -35,15 +35,56 @@ class WatcherParent2:
 
 
 class WatcherScoreboard1:
-    def check_forwarder_presence(self, key):
+    async def check_forwarder_presence(self, key):
         return self
 
 
 class WatcherScoreboard2:
-    def check_forwarder_presence(self, key):
+    async def check_forwarder_presence(self, key):
         return None
 
 
+class FakePubSub:
+    def __init__(self, events):
+        self.events = list(events)
+        self.closed = False
+
+    async def get_message(self, timeout):
+        if not self.events:
+            await asyncio.sleep(timeout)
+            return None
+        return {"type": "message", "data": self.events.pop(0)}
+
+    async def aclose(self):
+        self.closed = True
+
+
+class NotifyingScoreboard(WatcherScoreboard1):
+    def __init__(self, events):
+        self.pubsub = FakePubSub(events)
+
+    async def subscribe_keyspace(self, key, classes):
+        return self.pubsub
+
+
+class MultiWatcherScoreboard:
+    def __init__(self):
+        self.present = {"key1": "fwdr1", "key2": "fwdr2", "key3": "fwdr3"}
+        self.calls = 0
+
+    async def check_forwarders_presence(self, keys):
+        self.calls += 1
+        return [self.present.get(key) for key in keys]
+
+
+class FaultCounter:
+    def __init__(self):
+        self.faults = 0
+
+    def call_fault(self, code, report):
+        self.faults += 1
+
+
 class WatcherTestCase(asynctest.TestCase):
 
     async def test_watcher(self):
@@ -75,3 +116,63 @@ class WatcherTestCase(asynctest.TestCase):
 
         w = Watcher(evt, parent, board)
         await w.peek(None, 1)
+
+    async def test_watcher_notified(self):
+        evt = asyncio.Event()
+        parent = FaultCounter()
+        board = NotifyingScoreboard(["set", "expire", "expired"])
+
+        w = Watcher(evt, parent, board)
+        await asyncio.wait_for(w.peek(None, 100), 5)
+        self.assertEqual(parent.faults, 1)
+        self.assertTrue(board.pubsub.closed)
+
+    async def test_watcher_notified_stopped(self):
+        evt = asyncio.Event()
+        parent = FaultCounter()
+        board = NotifyingScoreboard(["set"])
+
+        w = Watcher(evt, parent, board)
+        asyncio.create_task(self.pause(evt, 1))
+        await asyncio.wait_for(w.peek(None, 100), 5)
+        self.assertEqual(parent.faults, 0)
+
+    async def test_multi_watcher(self):
+        evt = asyncio.Event()
+        parent = FaultCounter()
+        board = MultiWatcherScoreboard()
+        gone = []
+
+        w = MultiWatcher(evt, parent, board)
+        w.add("key1", gone.append)
+        w.add("key2", gone.append)
+        w.add("key3")
+
+        async def expire():
+            await asyncio.sleep(0.3)
+            del board.present["key2"]
+            del board.present["key3"]
+            await asyncio.sleep(0.5)
+            evt.set()
+        asyncio.create_task(expire())
+        await asyncio.wait_for(w.peek(0.1), 5)
+
+        self.assertEqual(gone, ["key2"])
+        self.assertEqual(parent.faults, 1)
+        self.assertEqual(list(w.callbacks), ["key1"])
+        self.assertGreater(board.calls, 3)
+
+    async def test_watcher_stops_at_once(self):
+        evt = asyncio.Event()
+        w = Watcher(evt, WatcherParent(), WatcherScoreboard1())
+        asyncio.create_task(self.pause(evt, 0.1))
+        await asyncio.wait_for(w.peek(None, 100), 1)
+
+        w = Watcher(evt, WatcherParent(), NotifyingScoreboard([]))
+        asyncio.create_task(self.pause(evt, 0.1))
+        await asyncio.wait_for(w.peek(None, 100), 0.5)
+
+        w = MultiWatcher(evt, WatcherParent(), MultiWatcherScoreboard())
+        w.add("key1")
+        asyncio.create_task(self.pause(evt, 0.1))
+        await asyncio.wait_for(w.peek(100), 1)